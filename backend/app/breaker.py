@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger("speedscale.breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails calls to an unavailable backend fast instead of per request.
+
+    ``failure_threshold`` consecutive availability errors (instances of
+    ``trip_on``; anything else, e.g. a bad query, is not the backend's fault)
+    open the breaker. While open, ``allow()`` is False and callers go straight
+    to their fallback. Requests never probe: ``run`` waits out the open
+    period, moves to half-open, and calls ``probe`` once; success closes the
+    breaker, failure reopens it with a doubled (jittered, capped) delay.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        probe: Callable[[], Awaitable[Any]],
+        trip_on: Tuple[Type[BaseException], ...] = (Exception,),
+        failure_threshold: int = 3,
+        open_seconds: float = 2.0,
+        max_open_seconds: float = 30.0,
+        probe_timeout: float = 1.0,
+        on_change: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        self.name = name
+        self.probe = probe
+        self.trip_on = trip_on
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max(max_open_seconds, open_seconds)
+        self.probe_timeout = probe_timeout
+        self.on_change = on_change
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.changed_at = time.time()
+        self.last_error: Optional[str] = None
+        self._delay = open_seconds
+        self._opened = asyncio.Event()
+
+        self.trips = 0
+        self.rejected = 0
+        self.probes = 0
+        self.probe_failures = 0
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        self.rejected += 1
+        return False
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        self.changed_at = time.time()
+        logger.info("%s circuit %s -> %s", self.name, previous, state)
+        if self.on_change is not None:
+            self.on_change(self.name, state)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+
+    def record_failure(self, exc: BaseException) -> bool:
+        """Counts ``exc`` if it signals an outage; returns True if it opened the breaker."""
+        if not isinstance(exc, self.trip_on):
+            return False
+        self.consecutive_failures += 1
+        self.last_error = f"{type(exc).__name__}: {exc}"[:200]
+        if self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self.trip()
+            return True
+        return False
+
+    def trip(self, exc: Optional[BaseException] = None) -> None:
+        if exc is not None:
+            self.last_error = f"{type(exc).__name__}: {exc}"[:200]
+        if self.state != OPEN:
+            self.trips += 1
+        self._set_state(OPEN)
+        self._opened.set()
+
+    async def probe_once(self) -> bool:
+        self._set_state(HALF_OPEN)
+        self.probes += 1
+        try:
+            await asyncio.wait_for(self.probe(), timeout=self.probe_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.probe_failures += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"[:200]
+            self._delay = min(self._delay * 2, self.max_open_seconds)
+            self._set_state(OPEN)
+            return False
+        self._delay = self.open_seconds
+        self.consecutive_failures = 0
+        self._set_state(CLOSED)
+        self._opened.clear()
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await self._opened.wait()
+            # Jitter keeps workers that tripped together from probing in lockstep.
+            await asyncio.sleep(self._delay * random.uniform(0.8, 1.2))
+            if self.state != CLOSED:
+                await self.probe_once()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "since": round(self.changed_at, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "next_probe_seconds": round(self._delay, 3) if self.state != CLOSED else None,
+            "last_error": self.last_error,
+        }
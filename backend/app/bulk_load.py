@@ -0,0 +1,352 @@
+"""Bulk product loader: synthetic catalogs or NDJSON/CSV imports.
+
+    python -m backend.app.bulk_load generate --total 3000000 --workers 8 --concurrency 8
+    python -m backend.app.bulk_load import products.ndjson
+    python -m backend.app.bulk_load import products.csv --drop
+
+Documents are produced in batches (generated on a process pool, or parsed
+from a file on a worker thread) while up to ``concurrency`` unordered
+``insert_many`` calls are in flight, so generation, parsing and the
+network round trips overlap. Secondary indexes are built once the load
+has finished instead of being maintained document by document.
+
+Imported files keep their ObjectIds, so running gateways cannot tell the
+products are new; once the load is done they are told over Redis to
+rebuild their existence filters, and stale "not found" markers are dropped.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from bson import json_util
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError
+from redis.asyncio import Redis
+
+logger = logging.getLogger("speedscale.bulk_load")
+
+CATEGORIES = ["Electronics", "Computers", "Accessories", "Home Office", "Audio", "Gaming"]
+SECONDARY_INDEXES = ("name", "category", "brand")
+DUPLICATE_KEY = 11000
+POOL_SIZE = 5000
+# Published on the catalog changes channel in place of a product id.
+CATALOG_RELOAD = "*"
+NEGATIVE_CACHE_PATTERN = "missing:product:*"
+
+_pools: Dict[int, Dict[str, List[str]]] = {}
+
+Batch = List[Dict[str, Any]]
+
+
+def _faker_pools(seed: int) -> Dict[str, List[str]]:
+    # Faker costs tens of microseconds per call; sample from pre-built pools instead.
+    pools = _pools.get(seed)
+    if pools is None:
+        from faker import Faker
+
+        fake = Faker()
+        fake.seed_instance(seed)
+        pools = _pools[seed] = {
+            "names": [fake.catch_phrase() for _ in range(POOL_SIZE)],
+            "sentences": [fake.sentence() for _ in range(POOL_SIZE)],
+            "brands": [fake.company() for _ in range(POOL_SIZE // 5)],
+        }
+    return pools
+
+
+def generate_products(count: int, seed: Optional[int] = None, pool_seed: int = 0) -> Batch:
+    rng = random.Random(seed)
+    pools = _faker_pools(pool_seed)
+    names, sentences, brands = pools["names"], pools["sentences"], pools["brands"]
+    created_at = datetime.utcnow()
+    return [
+        {
+            "name": rng.choice(names),
+            "price": round(rng.uniform(15, 2500), 2),
+            "description": " ".join(rng.choices(sentences, k=3)),
+            "category": rng.choice(CATEGORIES),
+            "brand": rng.choice(brands),
+            "inStock": rng.random() < 0.5,
+            "rating": round(rng.uniform(1.0, 5.0), 1),
+            "imageUrl": f"https://picsum.photos/seed/{rng.randint(0, 9999)}/400/300",
+            "createdAt": created_at,
+        }
+        for _ in range(count)
+    ]
+
+
+async def generated_batches(
+    total: int, batch_size: int, executor: Optional[Executor] = None, window: int = 4, seed: Optional[int] = None
+) -> AsyncIterator[Batch]:
+    loop = asyncio.get_running_loop()
+    base_seed = random.randrange(1 << 30) if seed is None else seed
+    pending: List[asyncio.Future] = []
+    scheduled = 0
+    batch_number = 0
+    while scheduled < total or pending:
+        while scheduled < total and len(pending) < window:
+            count = min(batch_size, total - scheduled)
+            pending.append(loop.run_in_executor(executor, generate_products, count, base_seed + batch_number))
+            scheduled += count
+            batch_number += 1
+        yield await pending.pop(0)
+
+
+def _parse_datetime(value: Any) -> Any:
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    return value
+
+
+def _coerce_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    doc: Dict[str, Any] = {}
+    for field, value in row.items():
+        if field is None or value is None or value == "":
+            continue
+        if field in {"price", "rating"}:
+            doc[field] = float(value)
+        elif field == "inStock":
+            doc[field] = value.strip().lower() in {"1", "true", "yes", "y"}
+        elif field == "createdAt":
+            doc[field] = _parse_datetime(value)
+        else:
+            doc[field] = value
+    return doc
+
+
+def iter_file_batches(path: str, batch_size: int, file_format: Optional[str] = None) -> Iterator[Batch]:
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    with open(path, newline="" if file_format == "csv" else None, encoding="utf-8") as f:
+        if file_format == "csv":
+            rows: Iterator[Dict[str, Any]] = (_coerce_csv_row(row) for row in csv.DictReader(f))
+        else:
+            # Extended JSON, so `mongoexport` output round-trips ObjectIds and dates.
+            rows = (json_util.loads(line) for line in f if line.strip())
+
+        batch: Batch = []
+        for doc in rows:
+            if "createdAt" in doc:
+                doc["createdAt"] = _parse_datetime(doc["createdAt"])
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+async def threaded_batches(batches: Iterator[Batch]) -> AsyncIterator[Batch]:
+    # File parsing runs on a worker thread so inserts keep flowing meanwhile.
+    done = object()
+    while True:
+        batch = await asyncio.to_thread(next, batches, done)
+        if batch is done:
+            return
+        yield batch
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        concurrency: int = 4,
+        progress_seconds: float = 5.0,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.collection = collection
+        self.concurrency = max(1, concurrency)
+        self.progress_seconds = progress_seconds
+        self.on_progress = on_progress
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.batches = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self.started_at is not None and self.finished_at is None
+
+    async def _insert(self, batch: Batch) -> None:
+        try:
+            result = await self.collection.insert_many(batch, ordered=False)
+            self.inserted += len(result.inserted_ids)
+        except BulkWriteError as exc:
+            details = exc.details or {}
+            self.inserted += details.get("nInserted", 0)
+            for error in details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY:
+                    self.duplicates += 1
+                else:
+                    self.failed += 1
+        self.batches += 1
+
+    async def load(self, batches: AsyncIterator[Batch]) -> Dict[str, Any]:
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        in_flight: "set[asyncio.Task]" = set()
+        next_report = self.started_at + self.progress_seconds
+        try:
+            async for batch in batches:
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.create_task(self._insert(batch)))
+                if self.on_progress and time.perf_counter() >= next_report:
+                    self.on_progress(self.snapshot())
+                    next_report = time.perf_counter() + self.progress_seconds
+            if in_flight:
+                for task in (await asyncio.wait(in_flight))[0]:
+                    task.result()
+        finally:
+            for task in in_flight:
+                task.cancel()
+            self.finished_at = time.perf_counter()
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.started_at is None:
+            return {"inserted": 0, "docs_per_sec": 0.0}
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "batches": self.batches,
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": round(self.inserted / elapsed, 1) if elapsed > 0 else 0.0,
+            "running": self.running,
+        }
+
+
+def _index_models() -> List[IndexModel]:
+    return [IndexModel([(field, ASCENDING)], name=f"{field}_1") for field in SECONDARY_INDEXES]
+
+
+async def drop_secondary_indexes(collection: AsyncIOMotorCollection) -> List[str]:
+    # Only the indexes rebuilt below; _id, shard key and text indexes stay.
+    names = {model.document["name"] for model in _index_models()}
+    dropped = []
+    async for index in collection.list_indexes():
+        if index["name"] in names:
+            await collection.drop_index(index["name"])
+            dropped.append(index["name"])
+    return dropped
+
+
+async def build_indexes(collection: AsyncIOMotorCollection) -> None:
+    # One createIndexes command builds them in a single collection scan.
+    await collection.create_indexes(_index_models())
+
+
+def print_progress(stats: Dict[str, Any]) -> None:
+    print(f"📦 {stats['inserted']:,} docs in {stats['seconds']}s ({stats['docs_per_sec']:,.0f} docs/s)")
+
+
+async def notify_catalog_reload(client: Redis, channel: str, origin: str = "bulk_load") -> int:
+    """Tells running gateways the whole catalog changed; returns the negative markers dropped."""
+    dropped = 0
+    async for key in client.scan_iter(match=NEGATIVE_CACHE_PATTERN, count=1000):
+        dropped += await client.delete(key)
+    await client.publish(channel, f"{origin}|{CATALOG_RELOAD}")
+    return dropped
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    client = AsyncIOMotorClient(args.mongo_uri, serverSelectionTimeoutMS=5000, maxPoolSize=max(args.concurrency * 2, 10))
+    collection = client[args.db][args.collection]
+    await client.admin.command("ping")
+    executor: Optional[Executor] = None
+    try:
+        if args.drop:
+            print("🧹 Clearing previous data...")
+            await collection.delete_many({})
+        if args.defer_indexes:
+            dropped = await drop_secondary_indexes(collection)
+            if dropped:
+                print(f"⏸️  Dropped {len(dropped)} secondary indexes until the load finishes")
+
+        if args.command == "generate":
+            executor = ProcessPoolExecutor(max_workers=args.workers or os.cpu_count())
+            batches = generated_batches(args.total, args.batch_size, executor, window=args.concurrency * 2, seed=args.seed)
+        else:
+            batches = threaded_batches(iter_file_batches(args.path, args.batch_size, args.format))
+
+        loader = BulkLoader(collection, concurrency=args.concurrency, on_progress=print_progress)
+        stats = await loader.load(batches)
+        print_progress(stats)
+
+        print("⚡ Building indexes...")
+        started = time.perf_counter()
+        await build_indexes(collection)
+        stats["index_seconds"] = round(time.perf_counter() - started, 3)
+
+        if args.notify:
+            redis = Redis.from_url(args.redis_url, socket_timeout=5)
+            try:
+                dropped = await notify_catalog_reload(redis, args.catalog_channel)
+                print(f"📣 Notified gateways; dropped {dropped:,} negative cache entries")
+            except Exception as exc:
+                # Gateways still catch up on their next periodic rebuild.
+                logger.warning("Could not notify gateways of the load: %s", exc)
+            finally:
+                await redis.aclose()
+        return stats
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        client.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["generate", "import"])
+    parser.add_argument("path", nargs="?", help="NDJSON or CSV file for `import`")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    parser.add_argument("--total", type=int, default=int(os.getenv("SEED_TOTAL", "2000")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("SEED_BATCH_SIZE", "2000")))
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many calls in flight")
+    parser.add_argument("--workers", type=int, default=0, help="generator processes (0 = one per CPU)")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible catalogs")
+    parser.add_argument("--drop", action="store_true", help="delete existing products first")
+    parser.add_argument("--no-defer-indexes", dest="defer_indexes", action="store_false")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/speedscale"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "speedscale"))
+    parser.add_argument("--collection", default=os.getenv("MONGO_COLLECTION", "products"))
+    parser.add_argument("--report", help="write the final stats to this JSON file")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://127.0.0.1:6379"))
+    parser.add_argument("--catalog-channel", default=os.getenv("CATALOG_CHANGES_CHANNEL", "catalog:changes"))
+    parser.add_argument("--no-notify", dest="notify", action="store_false", help="don't tell running gateways")
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.command == "import" and not args.path:
+        parser.error("import needs a file path")
+
+    stats = asyncio.run(run(args))
+    print(f"✅ Loaded {stats['inserted']:,} products at {stats['docs_per_sec']:,.0f} docs/s")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
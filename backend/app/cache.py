@@ -0,0 +1,96 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "evictions", "expirations", "invalidations", "errors")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {name: getattr(self, name) for name in self.__slots__}
+        data["hit_ratio"] = self.hit_ratio()
+        return data
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with per-entry expiry.
+
+    Runs on the event loop thread only, so no locking is needed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_cap: Optional[float] = None) -> None:
+        self.max_entries = max(max_entries, 0)
+        self.ttl_cap = ttl_cap if ttl_cap and ttl_cap > 0 else None
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        if not self.enabled or ttl_seconds <= 0:
+            return
+        if self.ttl_cap is not None:
+            ttl_seconds = min(ttl_seconds, self.ttl_cap)
+
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def remaining_ttl(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - time.monotonic()
+        return remaining if remaining > 0 else None
+
+    def invalidate(self, key: str) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        self.stats.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = self.stats.as_dict()
+        data["size"] = len(self._entries)
+        data["max_entries"] = self.max_entries
+        return data
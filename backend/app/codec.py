@@ -0,0 +1,120 @@
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger("speedscale.codec")
+
+# Stored values start with a two-byte header: format ("j" JSON, "m" msgpack)
+# and compression ("-" none, "z" zlib). Neither byte can start a JSON text,
+# so untagged values written by older gateways still decode as plain JSON.
+JSON_FORMAT = b"j"
+MSGPACK_FORMAT = b"m"
+UNCOMPRESSED = b"-"
+ZLIB = b"z"
+
+
+def to_builtin(value: Any) -> Any:
+    # Typed models (products.Product) encode through their dict form.
+    as_dict = getattr(value, "as_dict", None)
+    if as_dict is None:
+        raise TypeError(f"Type is not serializable: {type(value).__name__}")
+    return as_dict()
+
+
+def dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=to_builtin)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=to_builtin).encode()
+
+
+def loads_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class CacheCodec:
+    """Encodes cache payloads for Redis and recovers JSON bodies from them.
+
+    The gateway answers cache hits by splicing the stored JSON into the
+    response, so the JSON format only has to strip the header (and inflate
+    large values); msgpack trades that for smaller values and pays a
+    decode + JSON encode per Redis hit.
+    """
+
+    def __init__(self, name: str = "json", compress_min_bytes: int = 0, compress_level: int = 1) -> None:
+        # "orjson" is accepted as an alias: JSON is always encoded with orjson when installed.
+        name = "json" if name.lower() == "orjson" else name.lower()
+        if name == "msgpack" and msgpack is None:
+            logger.warning("CACHE_CODEC=msgpack but msgpack is not installed; using JSON")
+            name = "json"
+        if name not in {"json", "msgpack"}:
+            raise ValueError(f"Unknown cache codec {name!r}")
+        self.name = name
+        self.format = MSGPACK_FORMAT if self.name == "msgpack" else JSON_FORMAT
+        self.compress_min_bytes = max(compress_min_bytes, 0)
+        self.compress_level = compress_level
+
+        self.encoded = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def pack(self, payload: Any, body: Optional[bytes] = None) -> bytes:
+        if self.format == MSGPACK_FORMAT:
+            data = msgpack.packb(payload, use_bin_type=True, default=to_builtin)
+        else:
+            data = body if body is not None else dumps_json(payload)
+
+        self.encoded += 1
+        self.bytes_in += len(data)
+        compression = UNCOMPRESSED
+        if self.compress_min_bytes and len(data) >= self.compress_min_bytes:
+            data = zlib.compress(data, self.compress_level)
+            compression = ZLIB
+            self.compressed += 1
+        self.bytes_out += len(data) + 2
+        return self.format + compression + data
+
+    def _unwrap(self, raw: bytes):
+        if raw[:1] not in (JSON_FORMAT, MSGPACK_FORMAT):
+            return JSON_FORMAT, raw
+        data = raw[2:]
+        if raw[1:2] == ZLIB:
+            data = zlib.decompress(data)
+        return raw[:1], data
+
+    def loads(self, raw: bytes) -> Any:
+        kind, data = self._unwrap(raw)
+        if kind == MSGPACK_FORMAT:
+            return msgpack.unpackb(data, raw=False)
+        return loads_json(data)
+
+    def to_json(self, raw: bytes) -> bytes:
+        kind, data = self._unwrap(raw)
+        if kind == MSGPACK_FORMAT:
+            return dumps_json(msgpack.unpackb(data, raw=False))
+        return data
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "codec": self.name,
+            "json_encoder": "orjson" if orjson is not None else "json",
+            "compress_min_bytes": self.compress_min_bytes,
+            "encoded": self.encoded,
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+        }
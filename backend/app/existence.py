@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import math
+import time
+from hashlib import blake2b
+from typing import Any, Dict, Iterator, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger("speedscale.existence")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Positions come from one 128-bit BLAKE2b digest split into two halves
+    (Kirsch-Mitzenmacher double hashing), so adding or testing an id costs
+    a single hash regardless of the number of probes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(capacity, 1)
+        error_rate = min(max(error_rate, 1e-6), 0.5)
+        self.size = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * step) % self.size
+
+    def add(self, item: str) -> None:
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def false_positive_rate(self) -> float:
+        """Expected rate at the current fill, not the configured target."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "items": self.count,
+            "capacity": self.capacity,
+            "bytes": len(self._bits),
+            "hashes": self.hashes,
+            "false_positive_rate": round(self.false_positive_rate(), 6),
+        }
+
+
+class ExistenceFilter:
+    """Bloom filter of every product id in the collection, rebuilt periodically.
+
+    A Bloom filter never forgets an id it holds, so "not in the filter" is
+    reliable, except for products inserted after the rebuild's scan started
+    (possibly by another worker). ObjectIds carry their creation time, so
+    ids minted later than the scan (less ``clock_skew_seconds``) are never
+    rejected and go to the cache and Mongo as usual.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.01,
+        refresh_seconds: float = 600.0,
+        batch_size: int = 10000,
+        headroom: float = 1.2,
+        clock_skew_seconds: float = 60.0,
+    ) -> None:
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.batch_size = batch_size
+        self.headroom = headroom
+        self.clock_skew_seconds = clock_skew_seconds
+        self.filter: Optional[BloomFilter] = None
+        self.covers_before: Optional[float] = None
+
+        self.rebuilds = 0
+        self.rebuild_seconds: Optional[float] = None
+        self.checks = 0
+        self.rejected = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.filter is not None
+
+    def add(self, product_id: str) -> None:
+        if self.filter is not None:
+            self.filter.add(product_id)
+
+    def definitely_missing(self, product_id: str) -> bool:
+        """True only if ``product_id`` is known not to be in the collection."""
+        if self.filter is None or self.covers_before is None:
+            return False
+        try:
+            minted = ObjectId(product_id).generation_time.timestamp()
+        except (InvalidId, TypeError):
+            return False
+        if minted >= self.covers_before:
+            return False
+        self.checks += 1
+        if product_id in self.filter:
+            return False
+        self.rejected += 1
+        return True
+
+    async def rebuild(self, collection: AsyncIOMotorCollection) -> int:
+        started = time.time()
+        expected = await collection.estimated_document_count()
+        bloom = BloomFilter(int(max(expected, self.batch_size) * self.headroom), self.error_rate)
+        added = 0
+        async for doc in collection.find({}, {"_id": 1}).batch_size(self.batch_size):
+            bloom.add(str(doc["_id"]))
+            added += 1
+            if added % self.batch_size == 0:
+                await asyncio.sleep(0)
+        self.filter = bloom
+        self.covers_before = started - self.clock_skew_seconds
+        self.rebuilds += 1
+        self.rebuild_seconds = round(time.time() - started, 3)
+        logger.info("Existence filter rebuilt: %s ids, %s bytes", added, bloom.snapshot()["bytes"])
+        return added
+
+    async def run(self, collection: AsyncIOMotorCollection) -> None:
+        while True:
+            try:
+                await self.rebuild(collection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Existence filter rebuild failed: %s", exc)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "rebuilds": self.rebuilds,
+            "rebuild_seconds": self.rebuild_seconds,
+            "checks": self.checks,
+            "rejected": self.rejected,
+            "bloom": self.filter.snapshot() if self.filter is not None else None,
+        }
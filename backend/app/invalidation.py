@@ -0,0 +1,236 @@
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from redis.asyncio import Redis
+
+from .products import Product
+from .search import SEARCH_FIELDS, tokenize
+
+# KEYS: the search key registry, ARGV[1] reference sets, then cache keys.
+# ARGV: reference set count, invalidation channel ("" for none), origin,
+# tombstone key prefix, tombstone token and lifetime in ms (0 for none),
+# the cache key prefix whose keys share one tombstone ("" for none), then
+# an optional key/value/ttl to write through once the rest is gone.
+# One script, so no reader sees some of a product's entries dropped and
+# others still cached. It also touches keys it does not declare (ref set
+# members, tomb:* keys, the refresh key), so it needs a single Redis node.
+INVALIDATE_LUA = """
+local sets = tonumber(ARGV[1])
+local doomed = {}
+for i = 2, sets + 1 do
+  for _, key in ipairs(redis.call("SMEMBERS", KEYS[i])) do
+    doomed[#doomed + 1] = key
+  end
+  redis.call("DEL", KEYS[i])
+end
+for i = sets + 2, #KEYS do
+  doomed[#doomed + 1] = KEYS[i]
+end
+if ARGV[8] then
+  doomed[#doomed + 1] = ARGV[8]
+end
+local tomb_ms = tonumber(ARGV[6])
+local shared = ARGV[7]
+if tomb_ms > 0 and shared ~= "" then
+  redis.call("SET", ARGV[4] .. shared, ARGV[5], "PX", tomb_ms)
+end
+local deleted = {}
+for _, key in ipairs(doomed) do
+  if tomb_ms > 0 and (shared == "" or string.match(key, "^[^:]*") ~= shared) then
+    redis.call("SET", ARGV[4] .. key, ARGV[5], "PX", tomb_ms)
+  end
+  if key ~= ARGV[8] and redis.call("DEL", key) == 1 then
+    deleted[#deleted + 1] = key
+    if ARGV[2] ~= "" then
+      redis.call("PUBLISH", ARGV[2], ARGV[3] .. "|" .. key)
+    end
+  end
+  redis.call("ZREM", KEYS[1], key)
+end
+if ARGV[8] then
+  redis.call("SET", ARGV[8], ARGV[9], "EX", ARGV[10])
+  if ARGV[2] ~= "" then
+    redis.call("PUBLISH", ARGV[2], ARGV[3] .. "|" .. ARGV[8])
+  end
+end
+return deleted
+"""
+
+# KEYS: a cache key and its tombstone. ARGV: value, ttl in ms, and the
+# tombstone the reader saw before loading ("" for none). A different
+# tombstone means the key was invalidated while the value was being
+# loaded, so the value may predate the write and is dropped.
+FILL_LUA = """
+local tomb = redis.call("GET", KEYS[2]) or ""
+if tomb ~= ARGV[3] then
+  return 0
+end
+redis.call("SET", KEYS[1], ARGV[1], "PX", ARGV[2])
+return 1
+"""
+
+
+def payload_product_ids(payload: Any) -> List[str]:
+    """Ids of the products listed under a cached body's ``data``."""
+    items = payload.get("data") if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return []
+    ids = []
+    for item in items:
+        product_id = item.id if isinstance(item, Product) else item.get("_id") if isinstance(item, dict) else None
+        if product_id:
+            ids.append(str(product_id))
+    return ids
+
+
+def search_key_matches(key: str, product: Product) -> bool:
+    """Whether ``product`` could appear in the cached search page ``key``.
+
+    Deliberately loose: text search stems and the inverted index matches
+    prefixes, so a query token counts if its first few letters occur in a
+    searched field. Dropping a page too many only costs one Mongo query.
+    """
+    try:
+        query, _limit, _fields, category, _position = key.split(":", 1)[1].rsplit(":", 4)
+    except ValueError:
+        return True
+    if category != "*" and category != product.category:
+        return False
+    text = " ".join(str(getattr(product, field, "")) for field in SEARCH_FIELDS).lower()
+    if query in text:
+        return True
+    return any(token[: max(3, len(token) - 3)] in text for token in tokenize(query))
+
+
+class CacheIndex:
+    """Which cached entries contain which product, kept in Redis next to them.
+
+    Every cached search or similar page adds its key to a
+    ``refs:product:{id}`` set per listed product, so changing or deleting a
+    product finds the pages that show it. A new (or renamed) product is not
+    on any page yet; live search keys are also kept in one sorted set, scored
+    by expiry, and matched against the product instead.
+
+    Each invalidated key also gets a short-lived ``tomb:{key}`` holding a
+    token unique to that invalidation. Cache fills go through ``fill``, which
+    drops the value if the tombstone changed since the reader's miss: the
+    load may have started before the write, or read a lagging secondary.
+    Any write can change any search page, including ones nobody has cached
+    yet, so keys under ``shared_tombstone`` all share one tombstone that
+    every invalidation replaces.
+
+    Requires a single Redis node (or a replicated primary), not Redis
+    Cluster or a proxy that routes scripts by their declared keys. The
+    scripts touch keys found at run time, such as ref set members and
+    tombstones, and a product's entries hash to unrelated slots. A common
+    hash tag would work, but it would put the whole cache in one slot.
+    """
+
+    def __init__(
+        self,
+        refs_prefix: str = "refs:product:",
+        search_keys: str = "cache:search-keys",
+        indexed_prefixes: Sequence[str] = ("search", "similar"),
+        refs_ttl_seconds: int = 300,
+        tombstone_prefix: str = "tomb:",
+        tombstone_seconds: float = 120.0,
+        shared_tombstone: str = "search",
+    ) -> None:
+        self.refs_prefix = refs_prefix
+        self.search_keys = search_keys
+        self.indexed_prefixes = tuple(indexed_prefixes)
+        self.refs_ttl_seconds = refs_ttl_seconds
+        self.tombstone_prefix = tombstone_prefix
+        self.tombstone_seconds = tombstone_seconds
+        self.shared_tombstone = shared_tombstone
+
+        self.indexed = 0
+        self.invalidations = 0
+        self.keys_deleted = 0
+        self.failures = 0
+        self.stale_fills = 0
+
+    def refs_key(self, product_id: str) -> str:
+        return f"{self.refs_prefix}{product_id}"
+
+    def tombstone_key(self, key: str) -> str:
+        if self.shared_tombstone and key.split(":", 1)[0] == self.shared_tombstone:
+            return f"{self.tombstone_prefix}{self.shared_tombstone}"
+        return f"{self.tombstone_prefix}{key}"
+
+    def fill(self, pipe: Any, key: str, value: bytes, ttl_seconds: float, seen: bytes = b"") -> None:
+        """Queues a write of ``key`` that only happens if its tombstone is still ``seen``.
+
+        The queued command's result is 1 if the value was stored, 0 if not.
+        """
+        pipe.eval(FILL_LUA, 2, key, self.tombstone_key(key), value, max(int(ttl_seconds * 1000), 1), seen)
+
+    def add(self, pipe: Any, key: str, payload: Any, ttl_seconds: int) -> None:
+        """Queues the index updates for one cache write onto ``pipe``."""
+        prefix = key.split(":", 1)[0]
+        if prefix not in self.indexed_prefixes:
+            return
+        for product_id in payload_product_ids(payload):
+            refs = self.refs_key(product_id)
+            pipe.sadd(refs, key)
+            # Outlives every entry it points at; dead members are harmless.
+            pipe.expire(refs, max(self.refs_ttl_seconds, ttl_seconds))
+        if prefix == "search":
+            now = time.time()
+            pipe.zadd(self.search_keys, {key: now + ttl_seconds})
+            pipe.zremrangebyscore(self.search_keys, "-inf", now)
+        self.indexed += 1
+
+    async def matching_searches(self, client: Redis, products: Iterable[Product]) -> List[str]:
+        live = await client.zrangebyscore(self.search_keys, time.time(), "+inf")
+        keys = [key.decode() if isinstance(key, bytes) else key for key in live]
+        products = list(products)
+        return [key for key in keys if any(search_key_matches(key, product) for product in products)]
+
+    async def invalidate(
+        self,
+        client: Redis,
+        product_ids: Sequence[str],
+        keys: Sequence[str] = (),
+        channel: str = "",
+        origin: str = "",
+        refresh: Optional[Sequence[Any]] = None,
+    ) -> List[str]:
+        """Deletes ``keys`` plus every entry listing one of ``product_ids``.
+
+        ``refresh`` is an optional ``(key, value, ttl_seconds)`` written in
+        the same step. Every one of these keys is tombstoned, whether or not
+        it was cached. Returns the keys that existed and were deleted.
+        """
+        ref_sets = [self.refs_key(product_id) for product_id in product_ids]
+        token = uuid.uuid4().hex
+        args: List[Any] = [
+            len(ref_sets),
+            channel,
+            origin,
+            self.tombstone_prefix,
+            token,
+            int(self.tombstone_seconds * 1000),
+            self.shared_tombstone,
+        ]
+        if refresh is not None:
+            args.extend(refresh)
+        try:
+            deleted = await client.eval(INVALIDATE_LUA, 1 + len(ref_sets) + len(keys), self.search_keys, *ref_sets, *keys, *args)
+        except Exception:
+            self.failures += 1
+            raise
+        deleted = [key.decode() if isinstance(key, bytes) else key for key in deleted]
+        self.invalidations += 1
+        self.keys_deleted += len(deleted)
+        return deleted
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "indexed_writes": self.indexed,
+            "invalidations": self.invalidations,
+            "keys_deleted": self.keys_deleted,
+            "failures": self.failures,
+            "stale_fills_dropped": self.stale_fills,
+        }
@@ -1,51 +1,304 @@
 import asyncio
-import json
 import logging
 import os
 import random
+import socket
 import time
+import uuid
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from faker import Faker
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure
 from redis.asyncio import Redis
-
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from .breaker import CLOSED, CircuitBreaker
+from .bulk_load import CATALOG_RELOAD, BulkLoader, build_indexes, generated_batches
+from .cache import CacheStats, LocalCache
+from .codec import CacheCodec, dumps_json, loads_json
+from .existence import ExistenceFilter
+from .invalidation import CacheIndex
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import MetricsMiddleware, MetricsRegistry
+from .ml.executor import QueueFullError, RecommendationExecutor
+from .ml.manager import ModelManager
 from .ml.recommender import ProductRecommender
+from .mongo import PoolMetrics, describe_read_preference, parse_read_preferences
+from .ratelimit import RateLimiter, parse_rate_limits, rate_limit_headers
+from .search import build_search_backend, decode_cursor, encode_cursor
+from .products import Product, products_from_docs
+from .sharding import QueryPlanner
+from .snapshot import DEFAULT_PATH as DEFAULT_SNAPSHOT_PATH
+from .snapshot import DegradedSnapshot, collect_snapshot, write_snapshot
+from .singleflight import SingleFlight
+from .trending import TrendRecorder
+from .workers import RedisLock, StartupTimer, WorkerRegistry
 
 API_PORT = int(os.getenv("API_PORT", "8000"))
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/speedscale")
 MONGO_DB = os.getenv("MONGO_DB", "speedscale")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "products")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_CONNECTING = int(os.getenv("MONGO_MAX_CONNECTING", "4"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "1000"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+# Product reads stay on the primary (single-shard via the hashed _id key) so a
+# product re-cached right after a write is never a stale secondary copy.
+MONGO_READ_PREFERENCES = os.getenv(
+    "MONGO_READ_PREFERENCES", "search=secondaryPreferred:90,similar=secondaryPreferred:90,product=primary"
+)
 REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379")
 AUTO_SEED = os.getenv("AUTO_SEED", "true").lower() in {"1", "true", "yes", "on"}
 SEED_TARGET = int(os.getenv("SEED_TARGET", "2000"))
-SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "400"))
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "1000"))
+SEED_CONCURRENCY = int(os.getenv("SEED_CONCURRENCY", "4"))
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", "2048"))
+L1_CACHE_TTL_CAP = float(os.getenv("L1_CACHE_TTL_CAP", "0"))
+L1_INVALIDATION = os.getenv("L1_INVALIDATION", "pubsub").lower()
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+CATALOG_CHANGES_CHANNEL = os.getenv("CATALOG_CHANGES_CHANNEL", "catalog:changes")
+CACHE_TTL_SECONDS = {"search": 60, "product": 300, "similar": 120}
+CACHE_EARLY_REFRESH_SECONDS = float(os.getenv("CACHE_EARLY_REFRESH_SECONDS", "0"))
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "30"))
+# How long an invalidated key refuses fills that started before the write;
+# must outlast the slowest load, including secondaries up to maxStaleness behind.
+CACHE_TOMBSTONE_SECONDS = float(os.getenv("CACHE_TOMBSTONE_SECONDS", "120"))
+EXISTENCE_FILTER = os.getenv("EXISTENCE_FILTER", "true").lower() in {"1", "true", "yes", "on"}
+EXISTENCE_FILTER_ERROR_RATE = float(os.getenv("EXISTENCE_FILTER_ERROR_RATE", "0.01"))
+EXISTENCE_FILTER_REFRESH_SECONDS = float(os.getenv("EXISTENCE_FILTER_REFRESH_SECONDS", "600"))
+CACHED_SOURCE = "REDIS_CACHE ⚡ (Python)"
+SNAPSHOT_SOURCE = "LOCAL_SNAPSHOT 💾 (DB Offline)"
+MOCK_SOURCE = "BACKEND_MEMORY ⚠️ (DB Offline)"
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "8192"))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", "1"))
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "text")
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+SEARCH_INDEX_FULL_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_FULL_REFRESH_SECONDS", "600"))
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+ML_BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "32"))
+ML_BATCH_WAIT_MS = float(os.getenv("ML_BATCH_WAIT_MS", "2"))
+ML_QUEUE_MAX = int(os.getenv("ML_QUEUE_MAX", "1024"))
+ML_EXECUTOR_WORKERS = int(os.getenv("ML_EXECUTOR_WORKERS", "1"))
+ML_EXTEND_ON_STARTUP = os.getenv("ML_EXTEND_ON_STARTUP", "true").lower() in {"1", "true", "yes", "on"}
+ML_EXTEND_LIMIT = int(os.getenv("ML_EXTEND_LIMIT", "50000"))
+ML_WATCH_SECONDS = float(os.getenv("ML_WATCH_SECONDS", "0"))
+ML_CHANGE_STREAM = os.getenv("ML_CHANGE_STREAM", "false").lower() in {"1", "true", "yes", "on"}
+ML_CHANGE_DEBOUNCE_SECONDS = float(os.getenv("ML_CHANGE_DEBOUNCE_SECONDS", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+RATE_LIMITS = os.getenv("RATE_LIMITS", "default=120/60,search=60/60,product=600/60,similar=300/60,batch=120/60")
+RATE_LIMIT_LOCAL_LEASE = int(os.getenv("RATE_LIMIT_LOCAL_LEASE", "0"))
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1"))
+SHARD_LAYOUT_REFRESH_SECONDS = float(os.getenv("SHARD_LAYOUT_REFRESH_SECONDS", "60"))
+SHARD_EXPLAIN_SAMPLE_RATE = float(os.getenv("SHARD_EXPLAIN_SAMPLE_RATE", "0"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "2"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("BREAKER_MAX_OPEN_SECONDS", "30"))
+BREAKER_PROBE_TIMEOUT_SECONDS = float(os.getenv("BREAKER_PROBE_TIMEOUT_SECONDS", "1"))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+# Set by the pre-fork launcher: workers dump their metrics there so a scrape
+# answered by any of them covers all of them.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+TRENDING_HALF_LIFE_SECONDS = float(os.getenv("TRENDING_HALF_LIFE_SECONDS", "3600"))
+TRENDING_FLUSH_SECONDS = float(os.getenv("TRENDING_FLUSH_SECONDS", "1"))
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "20"))
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "300"))
+SNAPSHOT_MAX_PRODUCTS = int(os.getenv("SNAPSHOT_MAX_PRODUCTS", "5000"))
+SNAPSHOT_MAX_QUERIES = int(os.getenv("SNAPSHOT_MAX_QUERIES", "200"))
+# SNAPSHOT_PATH is a host-local file, so the rebuild lease is per host: one
+# worker on each host (container) writes the file its siblings map.
+SNAPSHOT_LOCK_KEY = os.getenv("SNAPSHOT_LOCK_KEY", f"gateway:snapshot-lock:{socket.gethostname()}")
+SEED_LOCK_KEY = os.getenv("SEED_LOCK_KEY", "gateway:seed-lock")
+SEED_LOCK_TTL_SECONDS = float(os.getenv("SEED_LOCK_TTL_SECONDS", "30"))
+WORKER_REGISTRY_KEY = os.getenv("WORKER_REGISTRY_KEY", "gateway:workers")
+WORKER_HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "5"))
 
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 logger = logging.getLogger("speedscale.fastapi")
+startup = StartupTimer()
+startup.mark("import")
 
 
 mongo_client: Optional[AsyncIOMotorClient] = None
 mongo_collection: Optional[AsyncIOMotorCollection] = None
+mongo_reads: Dict[str, AsyncIOMotorCollection] = {}
+mongo_read_preferences = parse_read_preferences(MONGO_READ_PREFERENCES)
+mongo_pool_metrics = PoolMetrics()
+query_planner = QueryPlanner(
+    f"{MONGO_DB}.{MONGO_COLLECTION}",
+    refresh_seconds=SHARD_LAYOUT_REFRESH_SECONDS,
+    explain_sample_rate=SHARD_EXPLAIN_SAMPLE_RATE,
+)
 redis_client: Optional[Redis] = None
 db_status = {"mongo": False, "redis": False}
 seed_lock = asyncio.Lock()
 seed_completed = False
-faker = Faker()
-ml_engine = ProductRecommender()
+metrics = MetricsRegistry(prefix="speedscale_")
+request_latency = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("route", "method", "status")
+)
+stage_latency = metrics.histogram(
+    "stage_duration_seconds",
+    "Time spent per request stage (redis_read, redis_write, mongo, normalize, serialize, ml_*).",
+    ("stage", "endpoint"),
+)
+cache_lookups = metrics.counter("cache_lookups_total", "Cache lookups by key prefix, tier and result.", ("prefix", "tier", "result"))
+backend_errors = metrics.counter("backend_errors_total", "Failed MongoDB/Redis calls by operation.", ("backend", "operation"))
+ml_batch_size = metrics.histogram("ml_batch_size", "Queries answered per ML inference batch.", buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+def record_ml_batch(size: int, inference_seconds: float, queue_waits: List[float]) -> None:
+    ml_batch_size.observe(size)
+    stage_latency.observe(inference_seconds, "ml_inference", "similar")
+    for waited in queue_waits:
+        stage_latency.observe(waited, "ml_queue_wait", "similar")
+
+
+ml_models = ModelManager(ProductRecommender(lazy=True), extend_limit=ML_EXTEND_LIMIT)
+ml_executor = RecommendationExecutor(
+    lambda: ml_models.current,
+    max_batch_size=ML_BATCH_MAX_SIZE,
+    max_wait_ms=ML_BATCH_WAIT_MS,
+    max_queue=ML_QUEUE_MAX,
+    workers=ML_EXECUTOR_WORKERS,
+    on_batch=record_ml_batch,
+)
+worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+l1_cache = LocalCache(max_entries=L1_CACHE_MAX_ENTRIES, ttl_cap=L1_CACHE_TTL_CAP)
+redis_cache_stats = CacheStats()
+cache_codec = CacheCodec(CACHE_CODEC, compress_min_bytes=CACHE_COMPRESS_MIN_BYTES, compress_level=CACHE_COMPRESS_LEVEL)
+request_flights = SingleFlight()
+cache_index = CacheIndex(refs_ttl_seconds=max(CACHE_TTL_SECONDS.values()), tombstone_seconds=CACHE_TOMBSTONE_SECONDS)
+existence = ExistenceFilter(error_rate=EXISTENCE_FILTER_ERROR_RATE, refresh_seconds=EXISTENCE_FILTER_REFRESH_SECONDS)
+search_backend = build_search_backend(
+    SEARCH_BACKEND,
+    refresh_seconds=SEARCH_INDEX_REFRESH_SECONDS,
+    full_refresh_seconds=SEARCH_INDEX_FULL_REFRESH_SECONDS,
+)
+background_tasks: List[asyncio.Task] = []
+seed_loader: Optional[BulkLoader] = None
+rate_limits = RateLimiter(
+    lambda: get_redis_client(),
+    parse_rate_limits(RATE_LIMITS),
+    lease_size=RATE_LIMIT_LOCAL_LEASE,
+    lease_seconds=RATE_LIMIT_LEASE_SECONDS,
+)
+
+
+def on_breaker_change(name: str, state: str) -> None:
+    db_status[name] = state == CLOSED
+
+
+mongo_breaker = CircuitBreaker(
+    "mongo",
+    lambda: ping_mongo(),
+    # Only outages trip it; query errors are the caller's problem.
+    trip_on=(ConnectionFailure,),
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    max_open_seconds=BREAKER_MAX_OPEN_SECONDS,
+    probe_timeout=BREAKER_PROBE_TIMEOUT_SECONDS,
+    on_change=on_breaker_change,
+)
+redis_breaker = CircuitBreaker(
+    "redis",
+    lambda: ping_redis(),
+    trip_on=(RedisConnectionError, RedisTimeoutError, OSError),
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    max_open_seconds=BREAKER_MAX_OPEN_SECONDS,
+    probe_timeout=BREAKER_PROBE_TIMEOUT_SECONDS,
+    on_change=on_breaker_change,
+)
+metrics.gauge(
+    "circuit_open",
+    "1 while the backend's circuit breaker is open or half-open.",
+    lambda: [((breaker.name,), float(breaker.state != CLOSED)) for breaker in (mongo_breaker, redis_breaker)],
+    ("backend",),
+)
+metrics.gauge("ml_queue_depth", "Similarity queries waiting for an inference batch.", lambda: [((), ml_executor.snapshot()["queue_depth"])])
+metrics.gauge("l1_cache_entries", "Entries in the in-process L1 cache.", lambda: [((), len(l1_cache))])
+search_trends = TrendRecorder(
+    lambda: get_redis_client(),
+    half_life_seconds=TRENDING_HALF_LIFE_SECONDS,
+    flush_seconds=TRENDING_FLUSH_SECONDS,
+)
+# Same decayed counting, keyed by product id: picks what the snapshot keeps.
+product_trends = TrendRecorder(
+    lambda: get_redis_client(),
+    key="trending:products",
+    half_life_seconds=TRENDING_HALF_LIFE_SECONDS,
+    flush_seconds=TRENDING_FLUSH_SECONDS,
+)
+degraded = DegradedSnapshot(SNAPSHOT_PATH)
+
+
+def worker_state() -> Dict[str, Any]:
+    return {
+        "pid": os.getpid(),
+        "mongo": db_status["mongo"],
+        "redis": db_status["redis"],
+        "breakers": {"mongo": mongo_breaker.state, "redis": redis_breaker.state},
+        "seed_completed": seed_completed,
+        "model_ready": ml_models.current.ready,
+        "startup": startup.snapshot(),
+    }
+
+
+worker_registry = WorkerRegistry(
+    lambda: get_redis_client(),
+    WORKER_REGISTRY_KEY,
+    worker_id,
+    worker_state,
+    interval_seconds=WORKER_HEARTBEAT_SECONDS,
+)
+metrics.gauge(
+    "worker_startup_seconds",
+    "Duration of each startup phase of this worker; preloaded phases ran once in the parent.",
+    lambda: [((phase,), seconds) for phase, seconds in startup.phases.items()]
+    + [((f"preload_{phase}",), seconds) for phase, seconds in startup.preloaded.items()],
+    ("phase",),
+)
+
+
+def after_fork() -> None:
+    """Gives a worker forked from a preloaded parent its own identity."""
+    global worker_id
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    worker_registry.worker_id = worker_id
+    # Forked children would otherwise share the parent's random sequence.
+    random.seed()
+    startup.forked()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    startup.mark("boot")
     init_mongo_client()
+    # Whatever the last run persisted is served if Mongo is already down.
+    degraded.reload()
+    # Artifacts load on a worker thread (a no-op when preloaded before fork);
+    # /similar falls back to category queries until ready.
+    ml_models.current.load_in_background()
     await asyncio.gather(check_mongo_connection(), check_redis_connection())
+    startup.mark("connect")
 
     print("\n" + "=" * 50)
     print("🚀 SPEEDSCALE GATEWAY STARTED")
@@ -55,11 +308,30 @@ async def lifespan(app: FastAPI):
         print("   ⚠️  Make sure Redis is running on localhost:6379")
     print("=" * 50 + "\n")
 
-    if db_status["mongo"]:
-        await seed_database_if_needed()
+    start_background_task(mongo_breaker.run())
+    start_background_task(redis_breaker.run())
+    start_invalidation_listener()
+    start_background_task(search_trends.run())
+    start_background_task(product_trends.run())
+    ml_executor.start()
+    if mongo_client is not None:
+        start_background_task(query_planner.run(mongo_client))
+    if mongo_collection is not None:
+        # Seeding no longer blocks startup; requests are served (and may see
+        # a partial catalog) while it runs.
+        start_background_task(bootstrap_catalog())
+    start_background_task(worker_registry.run())
+    if METRICS_MULTIPROC_DIR:
+        start_background_task(flush_metrics())
+    logger.info("Worker %s ready in %.3fs", worker_id, startup.ready())
 
     yield
 
+    await stop_background_tasks()
+    if METRICS_MULTIPROC_DIR:
+        # This worker's totals keep counting in the other workers' scrapes.
+        dump_metrics()
+    await ml_executor.stop()
     if mongo_client:
         mongo_client.close()
     await reset_redis_client()
@@ -78,19 +350,48 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, histogram=request_latency)
 
 
 def init_mongo_client() -> None:
     global mongo_client, mongo_collection
     if mongo_client is None:
-        mongo_client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-        mongo_collection = mongo_client[MONGO_DB][MONGO_COLLECTION]
+        mongo_client = AsyncIOMotorClient(
+            MONGO_URI,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxConnecting=MONGO_MAX_CONNECTING,
+            # Fail over to the fallbacks instead of queueing behind a saturated pool.
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            event_listeners=[mongo_pool_metrics],
+        )
+        database = mongo_client[MONGO_DB]
+        mongo_collection = database[MONGO_COLLECTION]
+        mongo_reads.clear()
+        for endpoint, preference in mongo_read_preferences.items():
+            mongo_reads[endpoint] = database.get_collection(MONGO_COLLECTION, read_preference=preference)
+
+
+# Set while refilling a key a write invalidated recently: a secondary may not
+# have that write yet, so the loader reads from the primary instead.
+primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+def read_collection(endpoint: str) -> Optional[AsyncIOMotorCollection]:
+    # Same collection, with the endpoint's read preference; writes always use mongo_collection.
+    if primary_reads.get():
+        return mongo_collection
+    return mongo_reads.get(endpoint, mongo_collection)
 
 
 def build_redis_client() -> Redis:
     return Redis.from_url(
         REDIS_URL,
-        decode_responses=True,
+        # Bytes mode: cached bodies go from Redis to the socket without a str round trip.
+        decode_responses=False,
         socket_connect_timeout=1,
         socket_timeout=1,
     )
@@ -105,29 +406,31 @@ def format_latency(start_time: float) -> str:
     return f"{max(elapsed, 0)}ms"
 
 
-def normalize_product(doc: Dict[str, Any]) -> Dict[str, Any]:
-    created = doc.get("createdAt", datetime.utcnow())
-    if isinstance(created, datetime):
-        created_iso = created.isoformat()
-    else:
-        created_iso = str(created)
+PRODUCT_FIELDS = ("name", "price", "description", "category", "brand", "inStock", "rating", "imageUrl", "createdAt")
 
-    return {
-        "_id": str(doc.get("_id")),
-        "name": doc.get("name", ""),
-        "price": float(doc.get("price", 0.0)),
-        "description": doc.get("description", ""),
-        "category": doc.get("category", ""),
-        "brand": doc.get("brand", ""),
-        "inStock": bool(doc.get("inStock", True)),
-        "rating": float(doc.get("rating", 0.0)),
-        "imageUrl": doc.get("imageUrl", "https://picsum.photos/seed/placeholder/400/300"),
-        "createdAt": created_iso,
-    }
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(PRODUCT_FIELDS) - {"_id"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # Canonical order so equivalent requests share a cache key.
+    return tuple(field for field in PRODUCT_FIELDS if field in requested)
+
+
+# Placeholders of last resort, for outages the snapshot can't answer. Seeded
+# by the request, so a query gets the same answer every time; never cached.
+MOCK_CREATED_AT = "2024-01-01T00:00:00"
+# Placeholder products carry these ids; they resolve to placeholders again.
+MOCK_ID_PREFIX = "fallback-"
 
 
 def generate_mock_products(query: str, count: int = 8) -> List[Dict[str, Any]]:
     base = query.strip() or "Product"
+    rng = random.Random(f"mock:{base.lower()}")
+    slug = "".join(ch for ch in base.lower() if ch.isalnum())[:24] or "product"
     tiers = ["Pro", "Elite", "Plus", "Lite", "Studio", "Max"]
     categories = [
         "Electronics",
@@ -149,16 +452,16 @@ def generate_mock_products(query: str, count: int = 8) -> List[Dict[str, Any]]:
     for idx in range(count):
         items.append(
             {
-                "_id": f"fallback-{idx}-{int(time.time() * 1000)}",
+                "_id": f"{MOCK_ID_PREFIX}{slug}-{idx}",
                 "name": f"{base} {tiers[idx % len(tiers)]}",
-                "price": round(random.uniform(50, 1200), 2),
+                "price": round(rng.uniform(50, 1200), 2),
                 "description": "This result is served from in-memory fallback data because the primary database is offline.",
                 "category": categories[idx % len(categories)],
-                "brand": random.choice(brands),
+                "brand": rng.choice(brands),
                 "inStock": True,
-                "rating": round(random.uniform(3.5, 5.0), 1),
+                "rating": round(rng.uniform(3.5, 5.0), 1),
                 "imageUrl": f"https://picsum.photos/seed/{base.replace(' ', '')}{idx}/400/300",
-                "createdAt": now_iso(),
+                "createdAt": MOCK_CREATED_AT,
             }
         )
     return items
@@ -168,18 +471,25 @@ def generate_mock_product_by_id(product_id: str) -> Dict[str, Any]:
     return {
         "_id": product_id,
         "name": f"SpeedScale Memory {product_id[-6:]}" if len(product_id) >= 6 else "SpeedScale Memory SKU",
-        "price": round(random.uniform(199, 499), 2),
+        "price": round(random.Random(f"mock:{product_id}").uniform(199, 499), 2),
         "description": "This product was generated from the gateway cache to keep the UI responsive while MongoDB is unavailable.",
         "category": "Memory Fallback",
         "brand": "SpeedScale Edge",
         "inStock": True,
         "rating": 4.7,
         "imageUrl": f"https://picsum.photos/seed/{product_id}/800/600",
-        "createdAt": now_iso(),
+        "createdAt": MOCK_CREATED_AT,
     }
 
 
 async def get_redis_client() -> Optional[Redis]:
+    # None while the breaker is open: callers skip the cache instead of timing out.
+    if not redis_breaker.allow():
+        return None
+    return redis_connection()
+
+
+def redis_connection() -> Redis:
     global redis_client
     if redis_client is None:
         redis_client = build_redis_client()
@@ -196,168 +506,607 @@ async def reset_redis_client() -> None:
     redis_client = None
 
 
-async def read_cache(key: str) -> Optional[Any]:
+def cache_ttl_for(key: str) -> int:
+    return CACHE_TTL_SECONDS.get(key.split(":", 1)[0], 60)
+
+
+async def read_cache_entry(key: str) -> Tuple[Optional[bytes], Optional[float], Optional[bytes]]:
+    """Returns the cached JSON body, its remaining TTL and the key's tombstone.
+
+    L1 keeps bodies already unwrapped. The tombstone (``b""`` for none) is
+    read in the same pipeline on a Redis lookup and is ``None`` otherwise;
+    pass it on to ``write_cache`` when refilling the key.
+    """
+    prefix = key.split(":", 1)[0]
+    local = l1_cache.get(key)
+    if local is not None:
+        cache_lookups.inc(prefix, "l1", "hit")
+        return local, l1_cache.remaining_ttl(key), None
+    if l1_cache.enabled:
+        cache_lookups.inc(prefix, "l1", "miss")
+
     client = await get_redis_client()
     if not client:
-        return None
+        return None, None, None
     try:
-        cached = await client.get(key)
-        db_status["redis"] = True
+        with stage_latency.time("redis_read", prefix):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                pipe.get(cache_index.tombstone_key(key))
+                cached, ttl_ms, tombstone = await pipe.execute()
+        redis_breaker.record_success()
+        tombstone = tombstone or b""
         if cached is None:
-            return None
-        return json.loads(cached)
+            redis_cache_stats.misses += 1
+            cache_lookups.inc(prefix, "redis", "miss")
+            return None, None, tombstone
+        redis_cache_stats.hits += 1
+        cache_lookups.inc(prefix, "redis", "hit")
+        body = cache_codec.to_json(cached)
+        remaining = ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else float(cache_ttl_for(key))
+        l1_cache.set(key, body, remaining)
+        return body, remaining, tombstone
     except Exception as exc:
-        db_status["redis"] = False
+        redis_cache_stats.errors += 1
+        backend_errors.inc("redis", "read")
+        redis_breaker.record_failure(exc)
         logger.debug("Redis read failed for %s: %s", key, exc)
-        await reset_redis_client()
-    return None
+    return None, None, None
+
+
+async def read_cache(key: str) -> Optional[Any]:
+    body, _, _ = await read_cache_entry(key)
+    return loads_json(body) if body is not None else None
+
+
+async def read_tombstone(key: str) -> Optional[bytes]:
+    client = await get_redis_client()
+    if not client:
+        return None
+    try:
+        tombstone = await client.get(cache_index.tombstone_key(key))
+        redis_breaker.record_success()
+    except Exception as exc:
+        backend_errors.inc("redis", "read")
+        redis_breaker.record_failure(exc)
+        logger.debug("Tombstone read failed for %s: %s", key, exc)
+        return None
+    return tombstone or b""
+
 
+async def write_cache(
+    key: str, payload: Any, ttl_seconds: int, body: Optional[bytes] = None, tombstone: Optional[bytes] = None
+) -> None:
+    """Caches ``payload`` unless ``key`` was invalidated since ``tombstone`` was read.
 
-async def write_cache(key: str, payload: Any, ttl_seconds: int) -> None:
+    ``tombstone`` is what ``read_cache_entry`` returned before the load; an
+    unknown one (``None``) only lets the fill through if no write touched
+    the key lately.
+    """
+    body = body if body is not None else dumps_json(payload)
     client = await get_redis_client()
     if not client:
+        l1_cache.set(key, body, ttl_seconds)
         return
     try:
-        await client.setex(key, ttl_seconds, json.dumps(payload))
-        db_status["redis"] = True
+        value = cache_codec.pack(payload, body)
+        with stage_latency.time("redis_write", key.split(":", 1)[0]):
+            async with client.pipeline(transaction=False) as pipe:
+                cache_index.fill(pipe, key, value, ttl_seconds, tombstone or b"")
+                cache_index.add(pipe, key, payload, ttl_seconds)
+                if L1_INVALIDATION == "pubsub":
+                    pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{worker_id}|{key}")
+                stored, *_ = await pipe.execute()
+        redis_breaker.record_success()
     except Exception as exc:
-        db_status["redis"] = False
+        redis_cache_stats.errors += 1
+        backend_errors.inc("redis", "write")
+        redis_breaker.record_failure(exc)
         logger.debug("Redis write failed for %s: %s", key, exc)
-        await reset_redis_client()
-
+        stored = True
+    if not stored:
+        # Not in L1 either, so the next read loads it afresh.
+        cache_index.stale_fills += 1
+        logger.debug("Dropped fill of %s: invalidated while loading", key)
+        return
+    l1_cache.set(key, body, ttl_seconds)
+
+
+async def read_cache_entries(keys: List[str]) -> Tuple[Dict[str, bytes], Dict[str, bytes]]:
+    """Batch form of ``read_cache_entry``: L1 first, then one MGET for the rest.
+
+    Keys must share a prefix. Returns the keys that were found, and the
+    tombstones of the keys looked up in Redis for ``write_cache_entries``.
+    """
+    prefix = keys[0].split(":", 1)[0]
+    found: Dict[str, bytes] = {}
+    remote: List[str] = []
+    for key in keys:
+        local = l1_cache.get(key)
+        if local is not None:
+            found[key] = local
+        else:
+            remote.append(key)
+    if found:
+        cache_lookups.inc(prefix, "l1", "hit", amount=len(found))
+    if remote and l1_cache.enabled:
+        cache_lookups.inc(prefix, "l1", "miss", amount=len(remote))
 
-async def check_mongo_connection() -> bool:
-    if not mongo_client:
-        return False
+    client = await get_redis_client()
+    if not remote or not client:
+        return found, {}
     try:
-        await mongo_client.admin.command("ping")
-        db_status["mongo"] = True
-        return True
+        with stage_latency.time("redis_read", prefix):
+            # PTTLs ride in the same pipeline so L1 never outlives the Redis copy.
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.mget(remote)
+                pipe.mget([cache_index.tombstone_key(key) for key in remote])
+                for key in remote:
+                    pipe.pttl(key)
+                values, tombstones, *ttls = await pipe.execute()
+        redis_breaker.record_success()
     except Exception as exc:
-        db_status["mongo"] = False
-        logger.warning("MongoDB ping failed: %s", exc)
-        return False
+        redis_cache_stats.errors += 1
+        backend_errors.inc("redis", "read")
+        redis_breaker.record_failure(exc)
+        logger.debug("Redis batch read failed for %s %s keys: %s", len(remote), prefix, exc)
+        return found, {}
+
+    hits = 0
+    for key, cached, ttl_ms in zip(remote, values, ttls):
+        if cached is None:
+            continue
+        hits += 1
+        body = cache_codec.to_json(cached)
+        l1_cache.set(key, body, ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else float(cache_ttl_for(key)))
+        found[key] = body
+    redis_cache_stats.hits += hits
+    redis_cache_stats.misses += len(remote) - hits
+    if hits:
+        cache_lookups.inc(prefix, "redis", "hit", amount=hits)
+    if len(remote) > hits:
+        cache_lookups.inc(prefix, "redis", "miss", amount=len(remote) - hits)
+    return found, {key: tombstone or b"" for key, tombstone in zip(remote, tombstones)}
+
+
+async def write_cache_entries(
+    entries: List[Tuple[str, Any, bytes]], ttl_seconds: int, tombstones: Optional[Dict[str, bytes]] = None
+) -> None:
+    """Backfills many ``(key, payload, body)`` entries in one pipelined round trip.
+
+    Like ``write_cache``, an entry invalidated since its tombstone was read
+    is dropped rather than cached.
+    """
+    if not entries:
+        return
+    tombstones = tombstones or {}
+    client = await get_redis_client()
+    stored = [True] * len(entries)
+    prefix = entries[0][0].split(":", 1)[0]
+    if client:
+        try:
+            with stage_latency.time("redis_write", prefix):
+                async with client.pipeline(transaction=False) as pipe:
+                    # Fills go first so their results lead the reply.
+                    for key, payload, body in entries:
+                        cache_index.fill(pipe, key, cache_codec.pack(payload, body), ttl_seconds, tombstones.get(key, b""))
+                    for key, payload, _ in entries:
+                        cache_index.add(pipe, key, payload, ttl_seconds)
+                        if L1_INVALIDATION == "pubsub":
+                            pipe.publish(CACHE_INVALIDATION_CHANNEL, f"{worker_id}|{key}")
+                    stored = (await pipe.execute())[: len(entries)]
+            redis_breaker.record_success()
+        except Exception as exc:
+            redis_cache_stats.errors += 1
+            backend_errors.inc("redis", "write")
+            redis_breaker.record_failure(exc)
+            logger.debug("Redis batch write failed for %s %s keys: %s", len(entries), prefix, exc)
+    for (key, _, body), ok in zip(entries, stored):
+        if ok:
+            l1_cache.set(key, body, ttl_seconds)
+        else:
+            cache_index.stale_fills += 1
 
 
-async def check_redis_connection() -> bool:
+def negative_key(product_id: str) -> str:
+    return f"missing:product:{product_id}"
+
+
+def product_id_rejected(product_id: str) -> bool:
+    """In-process checks that turn a lookup into a 404 before any I/O."""
+    if not ObjectId.is_valid(product_id):
+        if product_id.startswith(MOCK_ID_PREFIX):
+            return False
+        cache_lookups.inc("product", "shape", "reject")
+        return True
+    if existence.definitely_missing(product_id):
+        cache_lookups.inc("product", "bloom", "reject")
+        return True
+    return False
+
+
+async def known_missing(product_id: str) -> bool:
+    """Whether a recent lookup found no such product (negative cache, L1 then Redis)."""
+    if NEGATIVE_CACHE_TTL_SECONDS <= 0:
+        return False
+    key = negative_key(product_id)
+    if l1_cache.get(key) is not None:
+        cache_lookups.inc("product", "negative", "hit")
+        return True
     client = await get_redis_client()
     if not client:
         return False
     try:
-        await client.ping()
-        db_status["redis"] = True
-        return True
+        remaining_ms = await client.pttl(key)
+        redis_breaker.record_success()
     except Exception as exc:
-        db_status["redis"] = False
-        logger.debug("Redis ping failed: %s", exc)
-        await reset_redis_client()
+        backend_errors.inc("redis", "read")
+        redis_breaker.record_failure(exc)
+        logger.debug("Negative cache read failed for %s: %s", key, exc)
+        return False
+    if remaining_ms is None or remaining_ms <= 0:
+        cache_lookups.inc("product", "negative", "miss")
         return False
+    cache_lookups.inc("product", "negative", "hit")
+    l1_cache.set(key, b"1", remaining_ms / 1000)
+    return True
 
 
-async def rate_limiter(request: Request):
+async def remember_missing(product_ids: List[str]) -> None:
+    """Negative-caches ids Mongo just reported missing; creating one clears it."""
+    if NEGATIVE_CACHE_TTL_SECONDS <= 0 or not product_ids:
+        return
+    for product_id in product_ids:
+        l1_cache.set(negative_key(product_id), b"1", NEGATIVE_CACHE_TTL_SECONDS)
     client = await get_redis_client()
     if not client:
         return
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            # A product created meanwhile tombstoned its marker; don't resurrect it.
+            for product_id in product_ids:
+                cache_index.fill(pipe, negative_key(product_id), b"1", NEGATIVE_CACHE_TTL_SECONDS)
+            await pipe.execute()
+        redis_breaker.record_success()
+    except Exception as exc:
+        backend_errors.inc("redis", "write")
+        redis_breaker.record_failure(exc)
+        logger.debug("Negative cache write failed for %s ids: %s", len(product_ids), exc)
+
+
+# Loaders return (body, source, cacheable); body holds every response field
+# except the source/time/cached envelope.
+Loader = Callable[[], Awaitable[Tuple[Dict[str, Any], str, bool]]]
 
-    client_ip = request.client.host if request.client else "unknown"
-    key = f"rate_limit:{client_ip}"
 
+async def load_and_store(cache_key: str, loader: Loader, tombstone: Optional[bytes] = None) -> Tuple[bytes, str]:
+    if tombstone is None:
+        tombstone = await read_tombstone(cache_key)
+    # A recent write tombstoned the key; replicas may not have it yet.
+    reset = primary_reads.set(bool(tombstone))
     try:
-        count = await client.incr(key)
-        if count == 1:
-            await client.expire(key, 60)
+        payload, source, cacheable = await loader()
+    finally:
+        primary_reads.reset(reset)
+    # Serialized once: the same bytes are cached and sent to every waiter.
+    with stage_latency.time("serialize", cache_key.split(":", 1)[0]):
+        body = dumps_json(payload)
+    if cacheable:
+        await write_cache(cache_key, payload, ttl_seconds=cache_ttl_for(cache_key), body=body, tombstone=tombstone)
+    return body, source
+
+
+async def read_through_cache(cache_key: str, loader: Loader) -> Tuple[bytes, str, bool]:
+    cached, remaining, tombstone = await read_cache_entry(cache_key)
+    if cached is not None:
+        if (
+            CACHE_EARLY_REFRESH_SECONDS > 0
+            and remaining is not None
+            and remaining <= CACHE_EARLY_REFRESH_SECONDS
+        ):
+            request_flights.spawn(cache_key, lambda: load_and_store(cache_key, loader))
+        return cached, CACHED_SOURCE, True
+
+    # Concurrent misses for the same key share one Mongo/ML computation.
+    body, source = await request_flights.do(cache_key, lambda: load_and_store(cache_key, loader, tombstone))
+    return body, source, False
+
+
+def envelope_response(body: bytes, source: str, start: float, cached: bool) -> Response:
+    # Splices the pre-serialized body after the per-request fields instead of
+    # decoding and re-encoding it.
+    envelope = dumps_json({"source": source, "time": format_latency(start), "cached": cached})
+    if body != b"{}":
+        envelope = envelope[:-1] + b"," + body[1:]
+    return Response(content=envelope, media_type="application/json")
+
+
+async def cached_response(cache_key: str, loader: Loader, start: float) -> Response:
+    body, source, cached = await read_through_cache(cache_key, loader)
+    return envelope_response(body, source, start, cached)
+
+
+async def subscribe_forever(channel: str, handle: Callable[[str, str], Awaitable[None]], on_connect: Callable[[], None] = lambda: None) -> None:
+    """Feeds ``origin|payload`` messages from other workers to ``handle``, reconnecting as needed."""
+    while True:
+        client = await get_redis_client()
+        if client is None:
+            await asyncio.sleep(1)
+            continue
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(channel)
+            on_connect()
+            async for message in pubsub.listen():
+                data = message.get("data", b"")
+                if isinstance(data, bytes):
+                    data = data.decode()
+                origin, _, payload = str(data).partition("|")
+                if payload and origin != worker_id:
+                    await handle(origin, payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("Subscription to %s failed: %s", channel, exc)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+        await asyncio.sleep(1)
+
 
-        if count > 60:
-            raise HTTPException(status_code=429, detail="Too Many Requests")
+async def listen_for_invalidations() -> None:
+    async def invalidate(origin: str, key: str) -> None:
+        l1_cache.invalidate(key)
+
+    # Anything published while we were disconnected is lost, so start clean.
+    await subscribe_forever(CACHE_INVALIDATION_CHANNEL, invalidate, on_connect=l1_cache.clear)
+
+
+async def apply_catalog_change(origin: str, product_id: str) -> None:
+    if mongo_collection is None:
+        return
+    if product_id == CATALOG_RELOAD:
+        # A bulk import, possibly of ids older than the existence filter's scan.
+        logger.info("Catalog reloaded by %s; rebuilding the existence filter", origin)
+        l1_cache.clear()
+        if EXISTENCE_FILTER:
+            try:
+                await existence.rebuild(mongo_collection)
+            except Exception as exc:
+                logger.warning("Existence filter rebuild after %s failed: %s", origin, exc)
+        return
+    # Another worker wrote this product; re-read it rather than trust the message.
+    existence.add(product_id)
+    try:
+        await search_backend.refresh_ids(mongo_collection, [product_id])
     except Exception as exc:
-        logger.debug("Rate limiter error: %s", exc)
+        logger.debug("Applying catalog change for %s failed: %s", product_id, exc)
 
 
-async def record_search_trend(query: str):
+async def listen_for_catalog_changes() -> None:
+    await subscribe_forever(CATALOG_CHANGES_CHANNEL, apply_catalog_change)
+
+
+async def publish_catalog_change(product_id: str) -> None:
     client = await get_redis_client()
-    if not client:
+    if client is None:
         return
     try:
-        await client.lpush("global:searches", query)
-        await client.ltrim("global:searches", 0, 19)
+        await client.publish(CATALOG_CHANGES_CHANNEL, f"{worker_id}|{product_id}")
     except Exception as exc:
-        logger.debug("Failed to record trend: %s", exc)
+        logger.debug("Publishing catalog change for %s failed: %s", product_id, exc)
+
+
+def start_background_task(coro: Awaitable[Any]) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    background_tasks.append(task)
+    return task
+
+
+async def stop_background_tasks() -> None:
+    while background_tasks:
+        task = background_tasks.pop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            logger.debug("Background task failed during shutdown: %s", exc)
+
+
+async def bootstrap_catalog() -> None:
+    if db_status["mongo"]:
+        await seed_database_if_needed()
+    # Index-backed search, the model extension and the offline snapshot start after the bulk load.
+    start_background_task(search_backend.run(mongo_collection))
+    start_background_task(listen_for_catalog_changes())
+    if EXISTENCE_FILTER and mongo_collection is not None:
+        start_background_task(existence.run(mongo_collection))
+    start_model_refresh_tasks()
+    if SNAPSHOT_REFRESH_SECONDS > 0:
+        start_background_task(refresh_degraded_snapshot())
+
+
+async def build_degraded_snapshot() -> Dict[str, Any]:
+    started = time.perf_counter()
+    hot_queries = [term for term, _ in await search_trends.top(SNAPSHOT_MAX_QUERIES)]
+    hot_ids = [product_id for product_id, _ in await product_trends.top(SNAPSHOT_MAX_PRODUCTS)]
+    products, searches = await collect_snapshot(
+        read_collection("search"),
+        search_backend,
+        hot_queries,
+        hot_ids,
+        max_products=SNAPSHOT_MAX_PRODUCTS,
+        page_size=SEARCH_PAGE_SIZE,
+    )
+    info = await asyncio.to_thread(write_snapshot, degraded.path, products, searches)
+    degraded.reload()
+    degraded.builds += 1
+    degraded.last_build = {**info, "worker": worker_id, "seconds": round(time.perf_counter() - started, 3)}
+    return info
+
+
+async def refresh_degraded_snapshot() -> None:
+    while True:
+        try:
+            if mongo_collection is not None and db_status["mongo"] and mongo_breaker.state == CLOSED:
+                # One worker per host and period rebuilds the file; the lease is
+                # left to expire rather than released, the rest just re-map it.
+                client = await get_redis_client()
+                lock = RedisLock(client, SNAPSHOT_LOCK_KEY, worker_id, ttl_seconds=SNAPSHOT_REFRESH_SECONDS * 0.9) if client else None
+                if lock is None or await lock.acquire():
+                    info = await build_degraded_snapshot()
+                    logger.info("Degraded-mode snapshot rebuilt: %s", info)
+            degraded.reload()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Degraded-mode snapshot refresh failed: %s", exc)
+        await asyncio.sleep(SNAPSHOT_REFRESH_SECONDS)
+
+
+def start_model_refresh_tasks() -> None:
+    if ML_EXTEND_ON_STARTUP:
+        # Picks up products seeded or inserted since the artifacts were trained.
+        start_background_task(ml_models.extend(mongo_collection))
+    if ML_WATCH_SECONDS > 0:
+        start_background_task(ml_models.watch_artifacts(ML_WATCH_SECONDS, mongo_collection))
+    if ML_CHANGE_STREAM:
+        start_background_task(ml_models.follow_inserts(mongo_collection, ML_CHANGE_DEBOUNCE_SECONDS))
+
+
+def start_invalidation_listener() -> None:
+    if L1_INVALIDATION == "pubsub" and l1_cache.enabled:
+        start_background_task(listen_for_invalidations())
+
+
+async def ping_mongo() -> None:
+    await mongo_client.admin.command("ping")
+
+
+async def ping_redis() -> None:
+    try:
+        await redis_connection().ping()
+    except Exception:
+        # Rebuilt from scratch for the next probe.
+        await reset_redis_client()
+        raise
+
+
+async def check_mongo_connection() -> bool:
+    # A failed ping opens the breaker at once; recovery is left to its probe task.
+    if not mongo_client or not mongo_breaker.allow():
+        return False
+    try:
+        await ping_mongo()
+        db_status["mongo"] = True
+        return True
+    except Exception as exc:
+        mongo_breaker.trip(exc)
+        logger.warning("MongoDB ping failed: %s", exc)
+        return False
+
+
+async def check_redis_connection() -> bool:
+    if not redis_breaker.allow():
+        return False
+    try:
+        await ping_redis()
+        db_status["redis"] = True
+        return True
+    except Exception as exc:
+        redis_breaker.trip(exc)
+        logger.debug("Redis ping failed: %s", exc)
+        return False
+
+
+def rate_limiter(scope: str) -> Callable[[Request], Awaitable[None]]:
+    async def check_rate_limit(request: Request) -> None:
+        client_ip = request.client.host if request.client else "unknown"
+        decision = await rate_limits.check(scope, client_ip)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429, detail="Too Many Requests", headers=rate_limit_headers(decision)
+            )
+
+    return check_rate_limit
 
 
 async def ensure_indexes() -> None:
     if mongo_collection is None:
         return
     try:
-        await mongo_collection.create_index("name")
-        await mongo_collection.create_index("category")
-        await mongo_collection.create_index("brand")
+        await build_indexes(mongo_collection)
     except Exception as exc:
         logger.debug("Index creation skipped: %s", exc)
 
 
 async def seed_database_if_needed() -> None:
-    global seed_completed
     if seed_completed or not AUTO_SEED or mongo_collection is None:
         return
 
     async with seed_lock:
-        if seed_completed:
-            return
-
-        try:
-            existing = await mongo_collection.estimated_document_count()
-        except Exception as exc:
-            logger.warning("Unable to count products: %s", exc)
-            return
-
-        if existing >= SEED_TARGET:
-            seed_completed = True
-            logger.info("MongoDB already contains %s products. Skipping seed.", existing)
-            return
-
-        logger.info("Seeding MongoDB with %s products", SEED_TARGET)
-        created = existing
-        success = True
-        while created < SEED_TARGET:
-            batch_size = min(SEED_BATCH_SIZE, SEED_TARGET - created)
-            docs = []
-            for _ in range(batch_size):
-                docs.append(
-                    {
-                        "name": faker.catch_phrase(),
-                        "price": round(random.uniform(20, 2500), 2),
-                        "description": faker.paragraph(nb_sentences=3),
-                        "category": faker.random_element(
-                            [
-                                "Electronics",
-                                "Computers",
-                                "Accessories",
-                                "Home Office",
-                                "Audio",
-                                "Gaming",
-                            ]
-                        ),
-                        "brand": faker.company(),
-                        "inStock": faker.pybool(),
-                        "rating": round(random.uniform(1.5, 5.0), 1),
-                        "imageUrl": f"https://picsum.photos/seed/{faker.random_int()}/400/300",
-                        "createdAt": datetime.utcnow(),
-                    }
-                )
+        # Workers take turns through a Redis lease: one bulk-loads while the
+        # rest wait, then each finds the target met on its own count check.
+        while not seed_completed:
+            client = await get_redis_client()
+            if client is None:
+                await seed_catalog()
+                return
+            lock = RedisLock(client, SEED_LOCK_KEY, worker_id, ttl_seconds=SEED_LOCK_TTL_SECONDS)
             try:
-                await mongo_collection.insert_many(docs)
-                created += len(docs)
-                logger.info("Seed progress: %s/%s", created, SEED_TARGET)
+                acquired = await lock.acquire()
             except Exception as exc:
-                logger.error("Failed to insert seed batch: %s", exc)
-                success = False
-                break
+                logger.debug("Seed lock unavailable, seeding locally: %s", exc)
+                await seed_catalog()
+                return
+            if acquired:
+                async with lock.held():
+                    await seed_catalog()
+                return
+            await asyncio.sleep(1)
+
+
+async def seed_catalog() -> None:
+    global seed_completed, seed_loader
+    try:
+        existing = await mongo_collection.estimated_document_count()
+    except Exception as exc:
+        logger.warning("Unable to count products: %s", exc)
+        return
 
-        if success and created >= SEED_TARGET:
-            await ensure_indexes()
-            seed_completed = True
-        else:
-            logger.warning("Seed process did not reach target. Current count: %s", created)
+    if existing >= SEED_TARGET:
+        seed_completed = True
+        logger.info("MongoDB already contains %s products. Skipping seed.", existing)
+        return
+
+    missing = SEED_TARGET - existing
+    logger.info("Seeding MongoDB with %s products", missing)
+    seed_loader = BulkLoader(
+        mongo_collection,
+        concurrency=SEED_CONCURRENCY,
+        progress_seconds=2,
+        on_progress=lambda stats: logger.info(
+            "Seed progress: %s/%s (%s docs/s)", existing + stats["inserted"], SEED_TARGET, stats["docs_per_sec"]
+        ),
+    )
+    try:
+        # Generation runs on the default thread pool so the event loop keeps serving.
+        stats = await seed_loader.load(generated_batches(missing, SEED_BATCH_SIZE, window=SEED_CONCURRENCY))
+    except Exception as exc:
+        logger.error("Failed to insert seed batch: %s", exc)
+        return
+
+    if stats["failed"] == 0 and existing + stats["inserted"] >= SEED_TARGET:
+        await ensure_indexes()
+        seed_completed = True
+        logger.info("Seeded %s products at %s docs/s", stats["inserted"], stats["docs_per_sec"])
+    else:
+        logger.warning("Seed process did not reach target. Current count: %s", existing + stats["inserted"])
 
 
 @app.get("/")
@@ -368,6 +1117,8 @@ async def root() -> Dict[str, str]:
 @app.get("/health")
 async def health() -> Dict[str, Any]:
     await asyncio.gather(check_mongo_connection(), check_redis_connection())
+    # This worker's view plus every live worker's last heartbeat.
+    cluster = await worker_registry.snapshot()
     return {
         "status": "healthy" if any(db_status.values()) else "degraded",
         "timestamp": now_iso(),
@@ -375,6 +1126,19 @@ async def health() -> Dict[str, Any]:
             "mongodb": db_status["mongo"],
             "redis": db_status["redis"],
         },
+        "breakers": {"mongodb": mongo_breaker.snapshot(), "redis": redis_breaker.snapshot()},
+        "search": search_backend.snapshot(),
+        "degraded_snapshot": degraded.snapshot(),
+        "seed": {"completed": seed_completed, **(seed_loader.snapshot() if seed_loader else {})},
+        "worker": {"id": worker_id, "startup": startup.snapshot()},
+        "cluster": cluster,
+        "mongo": {
+            "read_preferences": {
+                endpoint: describe_read_preference(preference) for endpoint, preference in mongo_read_preferences.items()
+            },
+            "pool": mongo_pool_metrics.snapshot(),
+            "sharding": query_planner.snapshot(),
+        },
         "servers": {
             "this_server": "Backend API (FastAPI)",
             "mongodb": "Connected" if db_status["mongo"] else "Offline",
@@ -383,196 +1147,729 @@ async def health() -> Dict[str, Any]:
     }
 
 
+def dump_metrics() -> None:
+    try:
+        metrics.dump(METRICS_MULTIPROC_DIR)
+    except OSError as exc:
+        logger.warning("Writing metrics to %s failed: %s", METRICS_MULTIPROC_DIR, exc)
+
+
+async def flush_metrics() -> None:
+    while True:
+        dump_metrics()
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    if METRICS_MULTIPROC_DIR:
+        # Other workers' numbers are at most METRICS_FLUSH_SECONDS old; ours are current.
+        dump_metrics()
+        return Response(content=metrics.render_merged(METRICS_MULTIPROC_DIR), media_type=METRICS_CONTENT_TYPE)
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    redis_tier: Dict[str, Any] = redis_cache_stats.as_dict()
+    client = await get_redis_client()
+    if client:
+        try:
+            info = await client.info("stats")
+            redis_tier["server"] = {
+                "keyspace_hits": info.get("keyspace_hits", 0),
+                "keyspace_misses": info.get("keyspace_misses", 0),
+                "evicted_keys": info.get("evicted_keys", 0),
+                "expired_keys": info.get("expired_keys", 0),
+            }
+        except Exception as exc:
+            logger.debug("Redis INFO failed: %s", exc)
+    return {
+        "worker": worker_id,
+        "invalidation": L1_INVALIDATION,
+        "l1": l1_cache.snapshot(),
+        "redis": redis_tier,
+        "codec": cache_codec.snapshot(),
+        "single_flight": request_flights.snapshot(),
+        "rate_limits": rate_limits.snapshot(),
+        "trending": search_trends.snapshot(),
+        "write_invalidation": cache_index.snapshot(),
+        "negative_ttl_seconds": NEGATIVE_CACHE_TTL_SECONDS,
+        "existence_filter": existence.snapshot(),
+    }
+
+
+def require_admin(request: Request) -> None:
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def require_write_admin(request: Request) -> None:
+    # Unlike the admin views, catalog writes stay closed until a token is set.
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Product writes are disabled; set ADMIN_TOKEN")
+    require_admin(request)
+
+
+@app.get("/api/ml/stats")
+async def ml_stats() -> Dict[str, Any]:
+    engine = ml_models.current
+    return {
+        "model_loaded": engine.ready,
+        "model_version": engine.version,
+        "load_seconds": engine.load_seconds,
+        "products": engine.size,
+        "index": engine.index_kind,
+        "precomputed_neighbors": engine.neighbors is not None,
+        "manager": ml_models.snapshot(),
+        "executor": ml_executor.snapshot(),
+    }
+
+
+@app.post("/admin/ml/reload")
+async def reload_model(
+    mode: str = Query("reload", pattern="^(reload|extend)$"),
+    _: None = Depends(require_admin),
+) -> Dict[str, Any]:
+    if mode == "extend":
+        if mongo_collection is None:
+            raise HTTPException(status_code=503, detail="MongoDB unavailable")
+        return await ml_models.extend(mongo_collection)
+    return await ml_models.reload(mongo_collection)
+
+
+@app.get("/admin/mongo/explain")
+async def explain_routing(
+    category: Optional[str] = Query(None, max_length=100),
+    product_id: Optional[str] = Query(None, max_length=24),
+    _: None = Depends(require_admin),
+) -> Dict[str, Any]:
+    if mongo_collection is None:
+        raise HTTPException(status_code=503, detail="MongoDB unavailable")
+    query: Dict[str, Any] = {}
+    if category:
+        query["category"] = category
+    if product_id:
+        try:
+            query["_id"] = ObjectId(product_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid product id")
+    try:
+        explained = await query_planner.explain(mongo_collection, query)
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=f"explain failed: {exc}")
+    return {
+        "filter": {key: str(value) for key, value in query.items()},
+        "layout": query_planner.layout.as_dict(),
+        "planned": query_planner.layout.plan(query).as_dict(),
+        "explain": explained,
+    }
+
+
 @app.get("/api/search")
 async def search_products(
     request: Request,
     query: str = Query(..., min_length=1, max_length=100),
-    _: Any = Depends(rate_limiter),
-) -> Dict[str, Any]:
+    page: int = Query(1, ge=1, le=500),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = Query(None, max_length=512),
+    fields: Optional[str] = Query(None, max_length=200),
+    category: Optional[str] = Query(None, min_length=1, max_length=100),
+    _: None = Depends(rate_limiter("search")),
+) -> Response:
     start = time.perf_counter()
     cleaned_query = query.strip()
     if not cleaned_query:
         raise HTTPException(status_code=400, detail="Query required")
+    limit = min(limit, SEARCH_MAX_PAGE_SIZE)
+    projection = parse_fields(fields)
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not cursor:
+        # Buffered in-process; flushed to Redis in the background.
+        search_trends.record(cleaned_query)
+
+    # One key per page and projection; a cursor pins the page regardless of `page`.
+    position = f"c{cursor}" if cursor else f"p{page}"
+    field_key = ",".join(projection) if projection else "*"
+    cache_key = f"search:{cleaned_query.lower()}:{limit}:{field_key}:{category or '*'}:{position}"
+    return await cached_response(
+        cache_key, lambda: load_search_results(cleaned_query, page, limit, after, projection, category), start
+    )
 
-    await record_search_trend(cleaned_query)
-
-    cache_key = f"search:{cleaned_query.lower()}"
-    cached_payload = await read_cache(cache_key)
-    if cached_payload is not None:
-        return {
-            "source": "REDIS_CACHE ⚡ (Python)",
-            "time": format_latency(start),
-            "cached": True,
-            "count": len(cached_payload),
-            "data": cached_payload,
-        }
 
-    products: List[Dict[str, Any]] = []
+async def load_search_results(
+    cleaned_query: str,
+    page: int = 1,
+    limit: int = SEARCH_PAGE_SIZE,
+    after: Optional[Dict[str, Any]] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+    category: Optional[str] = None,
+) -> Tuple[Dict[str, Any], str, bool]:
+    products: List[Any] = []
+    next_after = None
     source = ""
     mongo_available = False
 
-    if mongo_collection is not None:
+    if mongo_collection is not None and mongo_breaker.allow():
         try:
-            cursor = mongo_collection.find(
-                {
-                    "$or": [
-                        {"name": {"$regex": cleaned_query, "$options": "i"}},
-                        {"category": {"$regex": cleaned_query, "$options": "i"}},
-                        {"brand": {"$regex": cleaned_query, "$options": "i"}},
-                    ]
-                }
-            ).limit(20)
-            docs = await cursor.to_list(length=20)
-            products = [normalize_product(doc) for doc in docs]
+            collection = read_collection("search")
+            query_planner.observe("search", collection, {"category": category} if category else {})
+            with stage_latency.time("mongo", "search"):
+                docs, next_after = await search_backend.search(
+                    collection,
+                    cleaned_query,
+                    skip=(page - 1) * limit,
+                    limit=limit,
+                    after=after,
+                    fields=fields,
+                    category=category,
+                )
+            with stage_latency.time("normalize", "search"):
+                products = products_from_docs(docs, fields)
             source = "MONGODB_DISK 🐢 (Python)"
-            db_status["mongo"] = True
+            mongo_breaker.record_success()
             mongo_available = True
         except Exception as exc:
-            db_status["mongo"] = False
+            backend_errors.inc("mongo", "search")
+            mongo_breaker.record_failure(exc)
             logger.warning("Mongo search failed: %s", exc)
 
     if not mongo_available:
-        await asyncio.sleep(0.05)
-        products = generate_mock_products(cleaned_query)
-        source = "BACKEND_MEMORY ⚠️ (DB Offline)"
-
-    if mongo_available and products:
-        await write_cache(cache_key, products, ttl_seconds=60)
+        found = degraded.search(cleaned_query, skip=0 if after else (page - 1) * limit, limit=limit, category=category)
+        if after:
+            # Snapshot results have no cursors; a cursor page past page one is empty offline.
+            found = []
+        if found:
+            source = SNAPSHOT_SOURCE
+        else:
+            found = generate_mock_products(cleaned_query)
+            source = MOCK_SOURCE
+        products = [{key: item[key] for key in ("_id",) + fields} for item in found] if fields else found
 
-    return {
-        "source": source or "UNKNOWN",
-        "time": format_latency(start),
-        "cached": False,
+    body = {
+        "page": None if after else page,
         "count": len(products),
+        "next_cursor": encode_cursor(next_after) if next_after else None,
         "data": products,
     }
+    return body, source or "UNKNOWN", mongo_available and bool(products)
 
 
 @app.get("/api/trending")
-async def get_trending_searches() -> List[str]:
-    client = await get_redis_client()
-    if not client:
-        return []
+async def get_trending_searches(
+    limit: int = Query(TRENDING_TOP_K, ge=1, le=100),
+    scores: bool = False,
+) -> List[Any]:
     try:
-        return await client.lrange("global:searches", 0, -1)
-    except Exception:
+        top = await search_trends.top(limit)
+    except Exception as exc:
+        logger.debug("Trending lookup failed: %s", exc)
         return []
+    if scores:
+        return [{"query": term, "score": score} for term, score in top]
+    return [term for term, _ in top]
 
 
-@app.get("/api/products/{product_id}")
-async def get_product(product_id: str) -> Dict[str, Any]:
+@app.get("/api/products/{product_id}", dependencies=[Depends(rate_limiter("product"))])
+async def get_product(product_id: str) -> Response:
     start = time.perf_counter()
-    cache_key = f"product:{product_id}"
-
-    cached_product = await read_cache(cache_key)
-    if cached_product is not None:
-        return {
-            "source": "REDIS_CACHE ⚡ (Python)",
-            "time": format_latency(start),
-            "cached": True,
-            "data": cached_product,
-        }
+    if product_id_rejected(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
+    product_trends.record(product_id)
+    return await cached_response(f"product:{product_id}", lambda: load_product(product_id), start)
+
 
-    product: Optional[Dict[str, Any]] = None
+async def load_product(product_id: str) -> Tuple[Dict[str, Any], str, bool]:
+    product: Optional[Product] = None
     mongo_error = False
+    looked_up = False
+    if await known_missing(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
 
-    if mongo_collection is not None:
+    if mongo_collection is not None and mongo_breaker.allow():
         try:
             oid = ObjectId(product_id)
-            doc = await mongo_collection.find_one({"_id": oid})
-            db_status["mongo"] = True
+            collection = read_collection("product")
+            query_planner.observe("product", collection, {"_id": oid})
+            with stage_latency.time("mongo", "product"):
+                doc = await collection.find_one({"_id": oid})
+            mongo_breaker.record_success()
+            looked_up = True
             if doc:
-                product = normalize_product(doc)
+                with stage_latency.time("normalize", "product"):
+                    product = Product.from_doc(doc)
         except InvalidId:
             pass
         except Exception as exc:
-            db_status["mongo"] = False
+            backend_errors.inc("mongo", "product")
+            mongo_breaker.record_failure(exc)
             mongo_error = True
             logger.warning("Mongo product lookup failed: %s", exc)
 
-    if not product:
-        if not db_status["mongo"] or mongo_error:
-            await asyncio.sleep(0.03)
-            product = generate_mock_product_by_id(product_id)
-            source = "BACKEND_MEMORY ⚠️ (DB Offline)"
-        else:
-            raise HTTPException(status_code=404, detail="Product not found")
+    if product:
+        return {"data": product}, "MONGODB_DISK 🐢 (Python)", True
+
+    if looked_up:
+        await remember_missing([product_id])
+        raise HTTPException(status_code=404, detail="Product not found")
+    if not db_status["mongo"] or mongo_error:
+        snapshot = degraded.product(product_id)
+        if snapshot is not None:
+            return {"data": snapshot}, SNAPSHOT_SOURCE, False
+        return {"data": generate_mock_product_by_id(product_id)}, MOCK_SOURCE, False
+
+    raise HTTPException(status_code=404, detail="Product not found")
+
+
+async def ml_similar_ids(origin: Dict[str, Any]) -> List[str]:
+    text_features = f"{origin.get('name', '')} {origin.get('description', '')}"
+    try:
+        return await ml_executor.find_similar(text_features, limit=4)
+    except QueueFullError:
+        # Shed load to the category query rather than queueing unbounded work.
+        return []
+
+
+async def find_similar_live(oid: ObjectId) -> Tuple[Optional[List[Product]], str]:
+    """Similar products for ``oid``; ``None`` if the product itself does not exist."""
+    collection = read_collection("similar")
+    with stage_latency.time("mongo", "similar"):
+        origin = await collection.find_one({"_id": oid})
+    mongo_breaker.record_success()
+    if not origin:
+        return None, ""
+
+    similar_ids = await ml_similar_ids(origin)
+    if similar_ids:
+        query: Dict[str, Any] = {"_id": {"$in": [ObjectId(i) for i in similar_ids]}}
+        source = "ML_ENGINE 🤖"
+        cursor = collection.find(query)
     else:
-        source = "MONGODB_DISK 🐢 (Python)"
-        await write_cache(cache_key, product, ttl_seconds=300)
+        query = {"category": origin.get("category"), "_id": {"$ne": oid}}
+        source = "MONGODB_QUERY 🐢"
+        cursor = collection.find(query).limit(4)
+    query_planner.observe("similar", collection, query)
 
-    return {
-        "source": source,
-        "time": format_latency(start),
-        "cached": False,
-        "data": product,
-    }
+    with stage_latency.time("mongo", "similar"):
+        docs = await cursor.to_list(length=4)
+    with stage_latency.time("normalize", "similar"):
+        return products_from_docs(docs), source
 
 
-@app.get("/api/products/{product_id}/similar")
-async def get_similar_products(product_id: str) -> Dict[str, Any]:
+@app.get("/api/products/{product_id}/similar", dependencies=[Depends(rate_limiter("similar"))])
+async def get_similar_products(product_id: str) -> Response:
     start = time.perf_counter()
-    cache_key = f"similar:{product_id}"
+    if product_id_rejected(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
+    product_trends.record(product_id)
+    return await cached_response(f"similar:{product_id}", lambda: load_similar_products(product_id), start)
 
-    cached = await read_cache(cache_key)
-    if cached is not None:
-        return {
-            "source": "REDIS_CACHE ⚡ (Python)",
-            "time": format_latency(start),
-            "cached": True,
-            "data": cached,
-        }
 
-    products: List[Dict[str, Any]] = []
+async def load_similar_products(product_id: str) -> Tuple[Dict[str, Any], str, bool]:
+    products: Optional[List[Any]] = []
     source = ""
     mongo_available = False
+    if await known_missing(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
 
-    if mongo_collection is not None:
+    if mongo_collection is not None and mongo_breaker.allow():
         try:
-            oid = ObjectId(product_id)
-            origin = await mongo_collection.find_one({"_id": oid})
-            db_status["mongo"] = True
-            if origin:
-                text_features = f"{origin.get('name', '')} {origin.get('description', '')}"
-
-                similar_ids = ml_engine.find_similar_products(text_features, limit=4)
-
-                if similar_ids:
-                    cursor = mongo_collection.find({"_id": {"$in": [ObjectId(i) for i in similar_ids]}})
-                    source = "ML_ENGINE 🤖"
-                else:
-                    cursor = mongo_collection.find(
-                        {
-                            "category": origin.get("category"),
-                            "_id": {"$ne": oid},
-                        }
-                    ).limit(4)
-                    source = "MONGODB_QUERY 🐢"
-
-                docs = await cursor.to_list(length=4)
-                products = [normalize_product(doc) for doc in docs]
+            precomputed_ids = ml_models.current.precomputed_neighbors(product_id, limit=4)
+            if precomputed_ids:
+                # Trained product: the offline neighbour table already has the answer.
+                ranked = [ObjectId(i) for i in precomputed_ids]
+                collection = read_collection("similar")
+                query_planner.observe("similar", collection, {"_id": {"$in": ranked}})
+                with stage_latency.time("mongo", "similar"):
+                    docs = await collection.find({"_id": {"$in": ranked}}).to_list(length=len(ranked))
+                mongo_breaker.record_success()
+                by_id = {doc["_id"]: doc for doc in docs}
+                with stage_latency.time("normalize", "similar"):
+                    products = products_from_docs(by_id[oid] for oid in ranked if oid in by_id)
+                source = "ML_ENGINE 🤖 (Precomputed)"
+                mongo_available = True
+            else:
+                products, source = await find_similar_live(ObjectId(product_id))
                 mongo_available = True
         except InvalidId:
             pass
         except Exception as exc:
-            db_status["mongo"] = False
+            backend_errors.inc("mongo", "similar")
+            mongo_breaker.record_failure(exc)
             logger.warning("Mongo similar lookup failed: %s", exc)
 
-    if not products:
-        products = generate_mock_products("Similar", count=4)
-        source = "BACKEND_MEMORY ⚠️" if not mongo_available else "MONGODB_FALLBACK"
+    if products is None:
+        await remember_missing([product_id])
+        raise HTTPException(status_code=404, detail="Product not found")
+    if not mongo_available:
+        # The model is in memory, so its neighbours are known even offline.
+        neighbors = ml_models.current.precomputed_neighbors(product_id, limit=4) or []
+        products = degraded.similar(product_id, neighbors)
+        if products:
+            return {"data": products}, SNAPSHOT_SOURCE, False
+        return {"data": generate_mock_products("Similar", count=4)}, MOCK_SOURCE, False
 
-    await write_cache(cache_key, products, ttl_seconds=120)
+    # Don't pin category fallbacks in the cache while the model is still loading.
+    return {"data": products}, source or "MONGODB_QUERY 🐢", not ml_models.current.loading
 
-    return {
-        "source": source,
-        "time": format_latency(start),
-        "cached": False,
-        "data": products,
-    }
+
+class BatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+
+def data_field(body: bytes) -> bytes:
+    # Product/similar bodies are exactly {"data": ...} in compact JSON, so the
+    # value can be cut out without decoding it.
+    if body.startswith(b'{"data":') and body.endswith(b"}"):
+        return body[8:-1]
+    return dumps_json(loads_json(body)["data"])
+
+
+BatchLoader = Callable[[List[str]], Awaitable[Tuple[Dict[str, Dict[str, Any]], str, bool]]]
+
+
+async def batch_response(prefix: str, ids: List[str], loader: BatchLoader, start: float) -> Tuple[Dict[str, bytes], bytes]:
+    """Resolves ``ids`` through the cache with one MGET and loads only the misses.
+
+    Per-id entries share keys and format with the single-id endpoints, so
+    either endpoint warms the cache for the other. Returns the found bodies
+    and the response envelope fields other than ``data``.
+    """
+    ids = list(dict.fromkeys(ids))
+    # Ids that cannot exist are reported missing without a lookup.
+    wanted = [product_id for product_id in ids if not product_id_rejected(product_id)]
+    for product_id in wanted:
+        product_trends.record(product_id)
+    keys = {product_id: f"{prefix}:{product_id}" for product_id in wanted}
+    cached, tombstones = await read_cache_entries(list(keys.values()))
+    bodies = {product_id: cached[key] for product_id, key in keys.items() if key in cached}
+    misses = [product_id for product_id in wanted if product_id not in bodies]
+
+    source = CACHED_SOURCE
+    if misses:
+        reset = primary_reads.set(any(tombstones.get(keys[product_id]) for product_id in misses))
+        try:
+            payloads, source, cacheable = await loader(misses)
+        finally:
+            primary_reads.reset(reset)
+        with stage_latency.time("serialize", prefix):
+            loaded = {product_id: dumps_json(payload) for product_id, payload in payloads.items()}
+        if cacheable:
+            await write_cache_entries(
+                [(keys[product_id], payloads[product_id], body) for product_id, body in loaded.items()],
+                ttl_seconds=cache_ttl_for(prefix),
+                tombstones=tombstones,
+            )
+        bodies.update(loaded)
+
+    envelope = dumps_json({"source": source, "time": format_latency(start), "cached": not misses})
+    missing = [product_id for product_id in ids if product_id not in bodies]
+    extra = b',"cache_hits":' + str(len(cached)).encode() + b',"missing":' + dumps_json(missing)
+    return {product_id: bodies[product_id] for product_id in ids if product_id in bodies}, envelope[:-1] + extra
+
+
+@app.post("/api/products:batch", dependencies=[Depends(rate_limiter("batch"))])
+async def get_products_batch(request: BatchRequest) -> Response:
+    start = time.perf_counter()
+    bodies, head = await batch_response("product", request.ids, load_products, start)
+    data = b"[" + b",".join(data_field(body) for body in bodies.values()) + b"]"
+    return Response(content=head + b',"data":' + data + b"}", media_type="application/json")
+
+
+async def load_products(product_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], str, bool]:
+    """Batch ``load_product``: one ``$in`` query; unknown or invalid ids are left out."""
+    products: Dict[str, Dict[str, Any]] = {}
+    mongo_error = False
+    oids: Dict[ObjectId, str] = {}
+    for product_id in product_ids:
+        try:
+            oids[ObjectId(product_id)] = product_id
+        except InvalidId:
+            pass
+
+    if oids and mongo_collection is not None and mongo_breaker.allow():
+        try:
+            collection = read_collection("product")
+            query = {"_id": {"$in": list(oids)}}
+            query_planner.observe("product", collection, query)
+            with stage_latency.time("mongo", "product_batch"):
+                docs = await collection.find(query).to_list(length=len(oids))
+            mongo_breaker.record_success()
+            with stage_latency.time("normalize", "product_batch"):
+                for doc, product in zip(docs, products_from_docs(docs)):
+                    products[oids[doc["_id"]]] = {"data": product}
+            await remember_missing([product_id for product_id in oids.values() if product_id not in products])
+        except Exception as exc:
+            backend_errors.inc("mongo", "product_batch")
+            mongo_breaker.record_failure(exc)
+            mongo_error = True
+            logger.warning("Mongo batch product lookup failed: %s", exc)
+
+    if not products and (not db_status["mongo"] or mongo_error):
+        offline = {product_id: degraded.product(product_id) for product_id in product_ids}
+        if any(offline.values()):
+            return {product_id: {"data": body} for product_id, body in offline.items() if body}, SNAPSHOT_SOURCE, False
+        mocks = {product_id: {"data": generate_mock_product_by_id(product_id)} for product_id in product_ids}
+        return mocks, MOCK_SOURCE, False
+    return products, "MONGODB_DISK 🐢 (Python)", True
+
+
+@app.post("/api/products/similar:batch", dependencies=[Depends(rate_limiter("batch"))])
+async def get_similar_batch(request: BatchRequest) -> Response:
+    start = time.perf_counter()
+    bodies, head = await batch_response("similar", request.ids, load_similar_many, start)
+    data = b"{" + b",".join(dumps_json(product_id) + b":" + data_field(body) for product_id, body in bodies.items()) + b"}"
+    return Response(content=head + b',"data":' + data + b"}", media_type="application/json")
+
+
+async def load_similar_many(product_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], str, bool]:
+    """Batch ``load_similar_products``.
+
+    Precomputed neighbours and live ML answers are fetched with one ``$in``
+    query; live origins are read with another and all go to the batching
+    executor together. Only the category fallback runs one query per id.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    source = "MONGODB_QUERY 🐢"
+    mongo_error = False
+
+    if mongo_collection is not None and mongo_breaker.allow():
+        try:
+            collection = read_collection("similar")
+            ranked: Dict[str, List[ObjectId]] = {}
+            live: Dict[ObjectId, str] = {}
+            for product_id in product_ids:
+                try:
+                    oid = ObjectId(product_id)
+                except InvalidId:
+                    continue
+                precomputed_ids = ml_models.current.precomputed_neighbors(product_id, limit=4)
+                if precomputed_ids:
+                    ranked[product_id] = [ObjectId(i) for i in precomputed_ids]
+                else:
+                    live[oid] = product_id
+
+            fallbacks: List[Tuple[str, Dict[str, Any]]] = []
+            if live:
+                with stage_latency.time("mongo", "similar_batch"):
+                    origins = await collection.find({"_id": {"$in": list(live)}}).to_list(length=len(live))
+                found = {origin["_id"] for origin in origins}
+                await remember_missing([product_id for oid, product_id in live.items() if oid not in found])
+                answers = await asyncio.gather(*(ml_similar_ids(origin) for origin in origins))
+                for origin, similar_ids in zip(origins, answers):
+                    if similar_ids:
+                        ranked[live[origin["_id"]]] = [ObjectId(i) for i in similar_ids]
+                    else:
+                        fallbacks.append((live[origin["_id"]], origin))
+
+            if ranked:
+                wanted = list({oid for oids in ranked.values() for oid in oids})
+                query = {"_id": {"$in": wanted}}
+                query_planner.observe("similar", collection, query)
+                with stage_latency.time("mongo", "similar_batch"):
+                    docs = await collection.find(query).to_list(length=len(wanted))
+                by_id = {doc["_id"]: doc for doc in docs}
+                with stage_latency.time("normalize", "similar_batch"):
+                    for product_id, oids in ranked.items():
+                        results[product_id] = {"data": products_from_docs(by_id[oid] for oid in oids if oid in by_id)}
+                source = "ML_ENGINE 🤖 (Batch)"
+
+            if fallbacks:
+                with stage_latency.time("mongo", "similar_batch"):
+                    category_docs = await asyncio.gather(
+                        *(
+                            collection.find({"category": origin.get("category"), "_id": {"$ne": origin["_id"]}})
+                            .limit(4)
+                            .to_list(length=4)
+                            for _, origin in fallbacks
+                        )
+                    )
+                for (product_id, _), docs in zip(fallbacks, category_docs):
+                    results[product_id] = {"data": products_from_docs(docs)}
+            mongo_breaker.record_success()
+        except Exception as exc:
+            backend_errors.inc("mongo", "similar_batch")
+            mongo_breaker.record_failure(exc)
+            logger.warning("Mongo batch similar lookup failed: %s", exc)
+            mongo_error = True
+
+    results = {product_id: payload for product_id, payload in results.items() if payload["data"]}
+    if not results and (not db_status["mongo"] or mongo_error):
+        offline = {
+            product_id: degraded.similar(product_id, ml_models.current.precomputed_neighbors(product_id, limit=4) or [])
+            for product_id in product_ids
+        }
+        if any(offline.values()):
+            return {product_id: {"data": found} for product_id, found in offline.items() if found}, SNAPSHOT_SOURCE, False
+        mocks = {product_id: {"data": generate_mock_products("Similar", count=4)} for product_id in product_ids}
+        return mocks, MOCK_SOURCE, False
+    return results, source, not ml_models.current.loading
+
+
+class ProductWrite(BaseModel):
+    name: str = Field(..., min_length=1, max_length=200)
+    price: float = Field(..., ge=0)
+    description: str = Field("", max_length=2000)
+    category: str = Field(..., min_length=1, max_length=100)
+    brand: str = Field("", max_length=100)
+    inStock: bool = True
+    rating: float = Field(0.0, ge=0, le=5)
+    imageUrl: Optional[str] = Field(None, max_length=500)
+
+
+class ProductPatch(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=200)
+    price: Optional[float] = Field(None, ge=0)
+    description: Optional[str] = Field(None, max_length=2000)
+    category: Optional[str] = Field(None, min_length=1, max_length=100)
+    brand: Optional[str] = Field(None, max_length=100)
+    inStock: Optional[bool] = None
+    rating: Optional[float] = Field(None, ge=0, le=5)
+    imageUrl: Optional[str] = Field(None, max_length=500)
+
+
+def writable_collection() -> AsyncIOMotorCollection:
+    # Writes always go to the primary; there is no offline fallback for them.
+    if mongo_collection is None or not mongo_breaker.allow():
+        raise HTTPException(status_code=503, detail="MongoDB unavailable")
+    return mongo_collection
+
+
+def product_oid(product_id: str) -> ObjectId:
+    try:
+        return ObjectId(product_id)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+
+async def mongo_write(operation: str, call: Awaitable[Any]) -> Any:
+    try:
+        with stage_latency.time("mongo", operation):
+            result = await call
+    except Exception as exc:
+        backend_errors.inc("mongo", operation)
+        mongo_breaker.record_failure(exc)
+        logger.warning("Mongo %s failed: %s", operation, exc)
+        raise HTTPException(status_code=503, detail="MongoDB write failed")
+    mongo_breaker.record_success()
+    return result
+
+
+async def invalidate_product_caches(product_id: str, product: Optional[Product]) -> int:
+    """Drops every cached entry a write to ``product_id`` may have made stale.
+
+    That is its similar list, each search or similar page listing it and,
+    for a new or changed ``product``, each cached search it could now match
+    and any negative-cache marker for its id.
+    ``product:{id}`` is rewritten with ``product`` (or dropped on delete) in
+    the same Redis script. Returns how many cached entries were dropped.
+    """
+    product_key = f"product:{product_id}"
+    keys = [f"similar:{product_id}"]
+    refresh = None
+    if product is not None:
+        keys.append(negative_key(product_id))
+        payload = {"data": product}
+        body = dumps_json(payload)
+        ttl = cache_ttl_for(product_key)
+        refresh = (product_key, cache_codec.pack(payload, body), ttl)
+    else:
+        keys.append(product_key)
+    l1_cache.invalidate(product_key)
+    for key in keys:
+        l1_cache.invalidate(key)
+
+    client = await get_redis_client()
+    if client is None:
+        logger.warning("Redis unavailable; cached entries for %s expire on their TTL", product_id)
+        return 0
+    channel = CACHE_INVALIDATION_CHANNEL if L1_INVALIDATION == "pubsub" else ""
+    try:
+        with stage_latency.time("redis_write", "invalidate"):
+            if product is not None:
+                keys += await cache_index.matching_searches(client, [product])
+            deleted = await cache_index.invalidate(client, [product_id], keys, channel=channel, origin=worker_id, refresh=refresh)
+        redis_breaker.record_success()
+    except Exception as exc:
+        backend_errors.inc("redis", "invalidate")
+        redis_breaker.record_failure(exc)
+        logger.warning("Cache invalidation failed for %s: %s", product_id, exc)
+        return 0
+    for key in deleted:
+        l1_cache.invalidate(key)
+    return len(deleted)
+
+
+def write_response(payload: Dict[str, Any], status_code: int = 200) -> Response:
+    return Response(content=dumps_json(payload), media_type="application/json", status_code=status_code)
+
+
+@app.post("/api/products", status_code=201)
+async def create_product(product: ProductWrite, _: None = Depends(require_write_admin)) -> Response:
+    collection = writable_collection()
+    doc = {key: value for key, value in product.model_dump().items() if value is not None}
+    doc["createdAt"] = datetime.utcnow()
+    result = await mongo_write("insert", collection.insert_one(doc))
+    doc["_id"] = result.inserted_id
+    created = Product.from_doc(doc)
+    search_backend.upsert(doc)
+    existence.add(created.id)
+    await publish_catalog_change(created.id)
+    invalidated = await invalidate_product_caches(created.id, created)
+    return write_response({"data": created, "invalidated": invalidated}, status_code=201)
+
+
+@app.patch("/api/products/{product_id}")
+async def update_product(product_id: str, changes: ProductPatch, _: None = Depends(require_write_admin)) -> Response:
+    collection = writable_collection()
+    oid = product_oid(product_id)
+    updates = changes.model_dump(exclude_none=True)
+    if not updates:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    current = await mongo_write("update", collection.find_one({"_id": oid}, {"category": 1}))
+    if current is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    # (category, _id) is the shard key: filtering on both targets one shard.
+    doc = await mongo_write(
+        "update",
+        collection.find_one_and_update(
+            {"_id": oid, "category": current.get("category")},
+            {"$set": updates},
+            return_document=ReturnDocument.AFTER,
+        ),
+    )
+    if doc is None:
+        raise HTTPException(status_code=409, detail="Product changed concurrently; retry")
+    updated = Product.from_doc(doc)
+    search_backend.upsert(doc)
+    await publish_catalog_change(product_id)
+    invalidated = await invalidate_product_caches(product_id, updated)
+    return write_response({"data": updated, "invalidated": invalidated})
+
+
+@app.delete("/api/products/{product_id}")
+async def delete_product(product_id: str, _: None = Depends(require_write_admin)) -> Response:
+    collection = writable_collection()
+    oid = product_oid(product_id)
+    current = await mongo_write("delete", collection.find_one({"_id": oid}, {"category": 1}))
+    if current is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    result = await mongo_write("delete", collection.delete_one({"_id": oid, "category": current.get("category")}))
+    if not result.deleted_count:
+        raise HTTPException(status_code=404, detail="Product not found")
+    search_backend.remove(product_id)
+    await publish_catalog_change(product_id)
+    invalidated = await invalidate_product_caches(product_id, None)
+    return write_response({"deleted": product_id, "invalidated": invalidated})
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from .serve import main as serve
 
-    uvicorn.run("app.main:app", host="0.0.0.0", port=API_PORT, reload=True)
+    raise SystemExit(serve())
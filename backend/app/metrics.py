@@ -0,0 +1,317 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; dense below 10ms where cache hits live.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Labels) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is one bisect and two adds.
+
+    Buckets are stored non-cumulative and summed only when scraped.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one count per bucket, one for +Inf, then the sum.
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def quantile(self, q: float, *labels: str) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation."""
+        series = self._series.get(labels)
+        if not series:
+            return None
+        target = q * sum(series[:-1])
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+            seen += count
+            if seen >= target and count:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge read from existing state at scrape time, so the hot path pays nothing."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Labels, float]]],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self.collect()
+        ]
+
+
+class MetricsRegistry:
+    """Holds one process's metrics.
+
+    Under a pre-fork server every worker has its own registry. Each worker
+    ``dump``s its state to ``{directory}/{pid}.json`` and any worker can then
+    ``render_merged`` the lot: counters and histograms are summed across
+    workers (dead ones included, so totals never go backwards), and gauges
+    get a ``pid`` label per live worker.
+    """
+
+    def __init__(self, prefix: str = "") -> None:
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Labels, float]]],
+        labelnames: Sequence[str] = (),
+    ) -> CallbackGauge:
+        return self._register(CallbackGauge(self.prefix + name, documentation, collect, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def state(self) -> Dict[str, Dict[str, List[Any]]]:
+        state: Dict[str, Dict[str, List[Any]]] = {"counter": {}, "histogram": {}, "gauge": {}}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Counter):
+                state["counter"][name] = [[list(labels), value] for labels, value in metric._values.items()]
+            elif isinstance(metric, Histogram):
+                state["histogram"][name] = [[list(labels), series] for labels, series in metric._series.items()]
+            else:
+                state["gauge"][name] = [[list(labels), value] for labels, value in metric.collect()]
+        return state
+
+    def dump(self, directory: str, pid: Optional[int] = None) -> None:
+        path = os.path.join(directory, f"{pid or os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.state(), f)
+        # Readers only ever see a complete file.
+        os.replace(path + ".tmp", path)
+
+    def render_merged(self, directory: str) -> str:
+        """Renders every worker's last dump as one registry, in this registry's order."""
+        counters: Dict[str, Dict[Labels, float]] = {}
+        histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        gauges: Dict[str, List[Tuple[Labels, float]]] = {}
+        for pid, state in read_dumps(directory):
+            for name, values in state.get("counter", {}).items():
+                merged = counters.setdefault(name, {})
+                for labels, value in values:
+                    merged[tuple(labels)] = merged.get(tuple(labels), 0.0) + value
+            for name, values in state.get("histogram", {}).items():
+                merged_series = histograms.setdefault(name, {})
+                for labels, series in values:
+                    current = merged_series.get(tuple(labels))
+                    merged_series[tuple(labels)] = series if current is None else [a + b for a, b in zip(current, series)]
+            for name, values in state.get("gauge", {}).items():
+                gauges.setdefault(name, []).extend((tuple(labels) + (pid,), value) for labels, value in values)
+
+        merged_registry = MetricsRegistry()
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Counter):
+                counter = merged_registry._register(Counter(name, metric.documentation, metric.labelnames))
+                counter._values = counters.get(name, {})
+            elif isinstance(metric, Histogram):
+                histogram = merged_registry._register(Histogram(name, metric.documentation, metric.labelnames, metric.buckets))
+                histogram._series = histograms.get(name, {})
+            else:
+                values = gauges.get(name, [])
+                merged_registry._register(
+                    CallbackGauge(name, metric.documentation, lambda values=values: values, metric.labelnames + ("pid",))
+                )
+        return merged_registry.render()
+
+
+def read_dumps(directory: str) -> List[Tuple[str, Dict[str, Any]]]:
+    dumps = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                dumps.append((filename[: -len(".json")], json.load(f)))
+        except (OSError, ValueError):
+            continue
+    return dumps
+
+
+def mark_process_dead(directory: str, pid: int) -> None:
+    """Drops a dead worker's gauges; its counters and histograms still count."""
+    path = os.path.join(directory, f"{pid}.json")
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return
+    state["gauge"] = {}
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def clear_dumps(directory: str) -> None:
+    """Removes dumps left by a previous run of the server."""
+    for filename in os.listdir(directory):
+        if filename.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(directory, filename))
+
+
+class MetricsMiddleware:
+    """Times every HTTP request by route template, method and status.
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would add a task and a
+    stream copy to each request.
+    """
+
+    def __init__(self, app: Any, histogram: Histogram) -> None:
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The route template keeps /api/products/{product_id} one series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.histogram.observe(time.perf_counter() - start, route, scope["method"], str(status))
@@ -0,0 +1,135 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+
+class BruteForceIndex:
+    """Exact cosine kNN over L2-normalised rows (cosine similarity is a dot product)."""
+
+    def __init__(self, matrix) -> None:
+        # No copy: the matrix may be backed by memory-mapped artifact arrays.
+        self._matrix = matrix
+
+    def __len__(self) -> int:
+        return self._matrix.shape[0]
+
+    def kneighbors(self, queries, n_neighbors: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.asarray((queries @ self._matrix.T).todense(), dtype=np.float32)
+        take = min(n_neighbors, scores.shape[1])
+        if take == 0:
+            return np.empty((scores.shape[0], 0), np.float32), np.empty((scores.shape[0], 0), np.int64)
+        top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        indices = np.take_along_axis(top, order, axis=1).astype(np.int64)
+        return 1.0 - np.take_along_axis(top_scores, order, axis=1), indices
+
+
+class IVFIndex:
+    """Approximate cosine kNN over TF-IDF vectors (inverted file index).
+
+    Vectors are reduced with a truncated SVD, normalised and clustered with
+    k-means. A query only scans the ``n_probe`` clusters whose centroids are
+    closest, keeps the best ``rerank`` candidates in the reduced space and
+    re-scores those against the original sparse vectors, so the returned
+    distances are exact cosine distances. Raise ``n_probe``/``rerank`` for
+    recall, lower them for latency.
+    """
+
+    def __init__(
+        self,
+        n_components: int = 128,
+        n_lists: int = 0,
+        n_probe: int = 8,
+        rerank: int = 50,
+        sample_size: int = 20000,
+        seed: int = 42,
+    ) -> None:
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.rerank = rerank
+        self.sample_size = sample_size
+        self.seed = seed
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._projection: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._reduced: Optional[np.ndarray] = None
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    @property
+    def lists(self) -> int:
+        return 0 if self._centroids is None else self._centroids.shape[0]
+
+    def _reduce(self, vectors) -> np.ndarray:
+        reduced = np.asarray(vectors @ self._projection, dtype=np.float32)
+        return normalize(reduced).astype(np.float32, copy=False)
+
+    def fit(self, matrix) -> "IVFIndex":
+        self._matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+        rows, dims = self._matrix.shape
+        rng = np.random.default_rng(self.seed)
+
+        components = max(1, min(self.n_components, dims - 1, rows - 1))
+        sample = self._matrix
+        if rows > self.sample_size:
+            sample = self._matrix[rng.choice(rows, self.sample_size, replace=False)]
+        svd = TruncatedSVD(n_components=components, random_state=self.seed).fit(sample)
+        self._projection = svd.components_.T.astype(np.float32)
+        reduced = self._reduce(self._matrix)
+
+        n_lists = self.n_lists or int(4 * np.sqrt(rows))
+        n_lists = max(1, min(n_lists, rows))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.seed, n_init=1, batch_size=4096)
+        labels = kmeans.fit_predict(reduced)
+        self._centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+        # Store vectors grouped by cluster so each inverted list is a contiguous slice.
+        self._order = np.argsort(labels, kind="stable").astype(np.int64)
+        self._offsets = np.searchsorted(labels[self._order], np.arange(n_lists + 1))
+        self._reduced = reduced[self._order]
+        return self
+
+    def kneighbors(self, queries, n_neighbors: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        if self._matrix is None:
+            raise RuntimeError("Index has not been fitted")
+        queries = normalize(sparse.csr_matrix(queries, dtype=np.float32))
+        reduced_queries = self._reduce(queries)
+        centroid_scores = reduced_queries @ self._centroids.T
+        n_probe = max(1, min(self.n_probe, self.lists))
+
+        distances = np.full((queries.shape[0], n_neighbors), np.inf, dtype=np.float32)
+        indices = np.full((queries.shape[0], n_neighbors), -1, dtype=np.int64)
+        for row in range(queries.shape[0]):
+            probes = np.argpartition(-centroid_scores[row], n_probe - 1)[:n_probe]
+            slots = np.concatenate(
+                [np.arange(self._offsets[p], self._offsets[p + 1]) for p in probes]
+            )
+            if slots.size == 0:
+                continue
+
+            approx = self._reduced[slots] @ reduced_queries[row]
+            keep = min(max(self.rerank, n_neighbors), slots.size)
+            candidates = self._order[slots[np.argpartition(-approx, keep - 1)[:keep]]]
+
+            exact = np.asarray((self._matrix[candidates] @ queries[row].T).todense()).ravel()
+            take = min(n_neighbors, candidates.size)
+            best = np.argpartition(-exact, take - 1)[:take]
+            best = best[np.argsort(-exact[best], kind="stable")]
+            indices[row, :take] = candidates[best]
+            distances[row, :take] = 1.0 - exact[best]
+        return distances, indices
+
+
+def build_index(kind: str, matrix, **params) -> Optional[IVFIndex]:
+    if kind == "ivf":
+        return IVFIndex(**params).fit(matrix)
+    return None
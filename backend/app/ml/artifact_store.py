@@ -0,0 +1,285 @@
+"""Versioned, pickle-free recommender artifacts.
+
+Layout of the artifacts directory (format version 1)::
+
+    manifest.json                   written last; names every file below
+    vocabulary.<build>.json         terms ordered by matrix column
+    idf.<build>.npy                 float32 IDF weights
+    matrix_data.<build>.npy         CSR values (float32, rows L2-normalised)
+    matrix_indices.<build>.npy      CSR column indices (int32)
+    matrix_indptr.<build>.npy       CSR row pointers (int32/int64)
+    product_ids.<build>.npy         ObjectId hex strings as fixed-width bytes
+    id_order.<build>.npy            argsort of product_ids for binary-search lookup
+    neighbors.<build>.npy           optional top-K neighbour rows (int32)
+
+Arrays are opened with ``mmap_mode="r"`` so every gateway worker maps the
+same page-cache pages instead of holding a private copy. A build is
+published by atomically replacing ``manifest.json``; readers always see a
+complete set of files.
+
+    python -m backend.app.ml.artifact_store convert   # legacy *.pkl -> v1
+    python -m backend.app.ml.artifact_store info
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+FORMAT_NAME = "speedscale-recommender"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+ARRAY_FILES = ("idf", "matrix_data", "matrix_indices", "matrix_indptr", "product_ids", "id_order")
+DEFAULT_VECTORIZER = {
+    "lowercase": True,
+    "stop_words": "english",
+    "token_pattern": r"(?u)\b\w\w+\b",
+    "ngram_range": [1, 1],
+    "norm": "l2",
+    "sublinear_tf": False,
+    "smooth_idf": True,
+}
+
+
+class ArtifactError(RuntimeError):
+    pass
+
+
+class RecommenderArtifacts:
+    def __init__(
+        self,
+        vocabulary: List[str],
+        idf: np.ndarray,
+        matrix: sparse.csr_matrix,
+        product_ids: np.ndarray,
+        id_order: Optional[np.ndarray] = None,
+        neighbors: Optional[np.ndarray] = None,
+        vectorizer_params: Optional[Dict[str, Any]] = None,
+        manifest: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = matrix
+        self.product_ids = product_ids
+        self.id_order = id_order if id_order is not None else np.argsort(product_ids, kind="stable")
+        self.neighbors = neighbors
+        self.vectorizer_params = dict(vectorizer_params or DEFAULT_VECTORIZER)
+        self.manifest = manifest or {}
+
+    @property
+    def build_id(self) -> Optional[str]:
+        return self.manifest.get("build_id")
+
+    def build_vectorizer(self) -> TfidfVectorizer:
+        return make_vectorizer(self.vocabulary, self.idf, self.vectorizer_params)
+
+
+def make_vectorizer(
+    vocabulary: Sequence[str], idf: np.ndarray, vectorizer_params: Optional[Dict[str, Any]] = None
+) -> TfidfVectorizer:
+    params = dict(vectorizer_params or DEFAULT_VECTORIZER)
+    params["ngram_range"] = tuple(params.get("ngram_range", (1, 1)))
+    vectorizer = TfidfVectorizer(
+        vocabulary={term: column for column, term in enumerate(vocabulary)},
+        dtype=np.float32,
+        **params,
+    )
+    vectorizer.idf_ = np.asarray(idf, dtype=np.float64)
+    return vectorizer
+
+
+def encode_product_ids(product_ids: Sequence[str]) -> np.ndarray:
+    width = max((len(product_id) for product_id in product_ids), default=24)
+    return np.asarray([product_id.encode("ascii") for product_id in product_ids], dtype=f"S{width}")
+
+
+def _write_array(directory: str, name: str, build_id: str, array: np.ndarray) -> str:
+    filename = f"{name}.{build_id}.npy"
+    np.save(os.path.join(directory, filename), np.ascontiguousarray(array))
+    return filename
+
+
+def _write_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ArtifactError(f"{path} is not a {FORMAT_NAME} manifest")
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact version {manifest.get('version')} (expected {FORMAT_VERSION})")
+    return manifest
+
+
+def _referenced_files(manifest: Optional[Dict[str, Any]]) -> set:
+    return set((manifest or {}).get("files", {}).values())
+
+
+def _remove_unreferenced(directory: str, keep: set) -> None:
+    for filename in os.listdir(directory):
+        parts = filename.split(".")
+        if len(parts) != 3 or parts[2] not in {"npy", "json"} or filename in keep:
+            continue
+        if parts[0] in ARRAY_FILES + ("vocabulary", "neighbors"):
+            try:
+                os.unlink(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def save_artifacts(directory: str, artifacts: RecommenderArtifacts, extra: Optional[Dict[str, Any]] = None) -> str:
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory) if os.path.exists(os.path.join(directory, MANIFEST_FILE)) else None
+    build_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    matrix = sparse.csr_matrix(artifacts.matrix, dtype=np.float32)
+    index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+    files = {
+        "idf": _write_array(directory, "idf", build_id, np.asarray(artifacts.idf, dtype=np.float32)),
+        "matrix_data": _write_array(directory, "matrix_data", build_id, matrix.data),
+        "matrix_indices": _write_array(directory, "matrix_indices", build_id, matrix.indices.astype(np.int32)),
+        "matrix_indptr": _write_array(directory, "matrix_indptr", build_id, matrix.indptr.astype(index_dtype)),
+        "product_ids": _write_array(directory, "product_ids", build_id, artifacts.product_ids),
+        "id_order": _write_array(directory, "id_order", build_id, artifacts.id_order.astype(np.int64)),
+    }
+    if artifacts.neighbors is not None:
+        files["neighbors"] = _write_array(directory, "neighbors", build_id, np.asarray(artifacts.neighbors, dtype=np.int32))
+
+    vocabulary_file = f"vocabulary.{build_id}.json"
+    with open(os.path.join(directory, vocabulary_file), "w") as f:
+        json.dump(list(artifacts.vocabulary), f)
+    files["vocabulary"] = vocabulary_file
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "build_id": build_id,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": int(matrix.shape[0]),
+        "features": int(matrix.shape[1]),
+        "nnz": int(matrix.nnz),
+        "vectorizer": artifacts.vectorizer_params,
+        "files": files,
+    }
+    manifest.update(extra or {})
+    _write_manifest(directory, manifest)
+    artifacts.manifest = manifest
+
+    # Keep the previous build around: workers may still have it mapped.
+    _remove_unreferenced(directory, _referenced_files(manifest) | _referenced_files(previous))
+    return build_id
+
+
+def load_artifacts(directory: str, mmap: bool = True) -> Optional[RecommenderArtifacts]:
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    files = manifest["files"]
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(directory, files[name]), mmap_mode=mmap_mode)
+        for name in ARRAY_FILES + ("neighbors",)
+        if name in files
+    }
+    with open(os.path.join(directory, files["vocabulary"])) as f:
+        vocabulary = json.load(f)
+
+    shape = (manifest["rows"], manifest["features"])
+    matrix = sparse.csr_matrix(
+        (arrays["matrix_data"], arrays["matrix_indices"], arrays["matrix_indptr"]), shape=shape, copy=False
+    )
+    neighbors = arrays.get("neighbors")
+    if neighbors is not None and neighbors.shape[0] != shape[0]:
+        neighbors = None
+    return RecommenderArtifacts(
+        vocabulary=vocabulary,
+        idf=arrays["idf"],
+        matrix=matrix,
+        product_ids=arrays["product_ids"],
+        id_order=arrays["id_order"],
+        neighbors=neighbors,
+        vectorizer_params=manifest.get("vectorizer"),
+        manifest=manifest,
+    )
+
+
+def load_legacy_pickles(directory: str) -> Optional[RecommenderArtifacts]:
+    paths = [os.path.join(directory, name) for name in ("vectorizer.pkl", "model.pkl", "product_ids.pkl")]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    with open(paths[0], "rb") as f:
+        vectorizer = pickle.load(f)
+    with open(paths[1], "rb") as f:
+        model = pickle.load(f)
+    with open(paths[2], "rb") as f:
+        product_ids = pickle.load(f)
+
+    params = vectorizer.get_params()
+    vectorizer_params = {key: params[key] for key in DEFAULT_VECTORIZER}
+    vectorizer_params["ngram_range"] = list(vectorizer_params["ngram_range"])
+    return RecommenderArtifacts(
+        vocabulary=vectorizer.get_feature_names_out().tolist(),
+        idf=vectorizer.idf_.astype(np.float32),
+        matrix=normalize(sparse.csr_matrix(model._fit_X, dtype=np.float32)),
+        product_ids=encode_product_ids(product_ids),
+        vectorizer_params=vectorizer_params,
+    )
+
+
+def main() -> None:
+    from .recommender import ARTIFACTS_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["convert", "info"])
+    parser.add_argument("--path", default=ARTIFACTS_PATH)
+    parser.add_argument("--remove-pickles", action="store_true", help="delete *.pkl after converting")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        manifest = read_manifest(args.path)
+        print(json.dumps(manifest, indent=2) if manifest else f"No {MANIFEST_FILE} in {args.path}")
+        return
+
+    legacy = load_legacy_pickles(args.path)
+    if legacy is None:
+        raise SystemExit(f"No legacy pickle artifacts in {args.path}")
+    legacy_neighbors = os.path.join(args.path, "neighbors.npy")
+    if os.path.exists(legacy_neighbors):
+        table = np.load(legacy_neighbors)
+        if table.shape[0] == legacy.matrix.shape[0]:
+            legacy.neighbors = table
+    build_id = save_artifacts(args.path, legacy, extra={"source": "converted from pickle artifacts"})
+    print(f"Wrote artifact build {build_id} ({legacy.matrix.shape[0]} products) to {args.path}")
+
+    if args.remove_pickles:
+        for name in ("vectorizer.pkl", "model.pkl", "product_ids.pkl", "neighbors.npy"):
+            path = os.path.join(args.path, name)
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Recall vs. latency benchmark for the IVF index against brute-force cosine kNN.
+
+    python -m backend.app.ml.benchmark_ann                  # trained artifacts
+    python -m backend.app.ml.benchmark_ann --synthetic 200000
+    python -m backend.app.ml.benchmark_ann --components 64 128 --probes 1 4 16 --rerank 50 200
+"""
+
+import argparse
+import itertools
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from .ann import IVFIndex
+
+
+def synthetic_matrix(rows: int, dims: int, seed: int, terms_per_row: int = 10) -> sparse.csr_matrix:
+    # Clustered sparse vectors so neighbourhoods resemble TF-IDF product text.
+    rng = np.random.default_rng(seed)
+    centers = sparse.random(max(rows // 50, 1), dims, density=0.004, random_state=seed, format="csr")
+    noise = sparse.csr_matrix(
+        (
+            rng.random(rows * terms_per_row),
+            (np.repeat(np.arange(rows), terms_per_row), rng.integers(0, dims, rows * terms_per_row)),
+        ),
+        shape=(rows, dims),
+    )
+    return normalize((centers[rng.integers(0, centers.shape[0], rows)] + noise).tocsr())
+
+
+def load_matrix(synthetic: int, dims: int, seed: int) -> sparse.csr_matrix:
+    if synthetic:
+        return synthetic_matrix(synthetic, dims, seed)
+
+    from .recommender import ProductRecommender
+
+    recommender = ProductRecommender(index="brute")
+    if not recommender.ready:
+        raise SystemExit("No trained artifacts found; use --synthetic N instead.")
+    return normalize(sparse.csr_matrix(recommender.matrix))
+
+
+def brute_force(matrix: sparse.csr_matrix, query: sparse.csr_matrix, k: int) -> np.ndarray:
+    scores = (matrix @ query.T).toarray().ravel()
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    matrix = load_matrix(args.synthetic, args.dims, args.seed)
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(matrix.shape[0], size=min(args.queries, matrix.shape[0]), replace=False)
+    queries = matrix[sample]
+
+    # One query at a time, the way the similar endpoint calls the model.
+    started = time.perf_counter()
+    truth = [set(brute_force(matrix, queries[row], args.k).tolist()) for row in range(len(sample))]
+    brute_ms = (time.perf_counter() - started) * 1000 / len(sample)
+    print(f"{matrix.shape[0]} vectors x {matrix.shape[1]} dims, {len(sample)} queries, k={args.k}")
+    print(f"brute force: {brute_ms:.3f} ms/query\n")
+    print(f"{'dims':>5} {'lists':>6} {'probe':>5} {'rerank':>6} {'build_s':>8} {'recall':>7} {'p50_ms':>7} {'p95_ms':>7} {'speedup':>7}")
+
+    results: List[Dict[str, Any]] = []
+    for components in args.components:
+        started = time.perf_counter()
+        index = IVFIndex(n_components=components, n_lists=args.lists, seed=args.seed).fit(matrix)
+        build_s = time.perf_counter() - started
+
+        for probe, rerank in itertools.product(args.probes, args.rerank):
+            index.n_probe = probe
+            index.rerank = rerank
+            latencies: List[float] = []
+            hits = 0
+            for row, expected in enumerate(truth):
+                started = time.perf_counter()
+                _, found = index.kneighbors(queries[row], n_neighbors=args.k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits += len(set(found[0].tolist()) & expected)
+
+            result = {
+                "components": components,
+                "lists": index.lists,
+                "probe": probe,
+                "rerank": rerank,
+                "build_s": round(build_s, 3),
+                "recall": round(hits / (len(truth) * args.k), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                "speedup": round(brute_ms / max(float(np.mean(latencies)), 1e-9), 2),
+            }
+            results.append(result)
+            print(
+                f"{components:>5} {index.lists:>6} {probe:>5} {rerank:>6} {result['build_s']:>8} "
+                f"{result['recall']:>7} {result['p50_ms']:>7} {result['p95_ms']:>7} {result['speedup']:>7}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark N synthetic vectors instead of artifacts")
+    parser.add_argument("--dims", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--components", type=int, nargs="+", default=[64, 128])
+    parser.add_argument("--lists", type=int, default=0, help="inverted lists (0 = 4*sqrt(N))")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("speedscale.ml")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class RecommendationExecutor:
+    """Runs recommender inference off the event loop in micro-batches.
+
+    Queries that arrive within ``max_wait_ms`` of each other are stacked and
+    answered with one ``find_similar_batch`` call on a worker thread, so
+    concurrent /similar misses share a single vectorize + kneighbors pass.
+    At most ``workers`` batches run at once; further queries wait in the
+    bounded queue, so ``max_queue`` sheds load once inference falls behind.
+    """
+
+    def __init__(
+        self,
+        get_recommender: Callable[[], Any],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 1024,
+        workers: int = 1,
+        on_batch: Optional[Callable[[int, float, List[float]], None]] = None,
+    ) -> None:
+        self.get_recommender = get_recommender
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue = max_queue
+        self.workers = max(1, workers)
+        # Called with (batch size, inference seconds, per-item queue waits).
+        self.on_batch = on_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: "set[asyncio.Task]" = set()
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.max_batch_seen = 0
+        self.errors = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.inference_total = 0.0
+        self.inference_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._collector is not None and not self._collector.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recommender")
+        self._slots = asyncio.Semaphore(self.workers)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    async def find_similar(self, product_text: str, limit: int = 4) -> List[str]:
+        if not self.running:
+            self.start()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((product_text, limit, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError("Recommendation queue is full")
+        self.requests += 1
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker before draining the queue; otherwise the
+            # backlog moves into the pool's unbounded queue, out of sight.
+            await self._slots.acquire()
+            batch: List[Tuple[str, int, asyncio.Future, float]] = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except BaseException:
+                # Stopped mid-collection: free the slot and the partial batch's callers.
+                self._slots.release()
+                for _, _, future, _ in batch:
+                    future.cancel()
+                raise
+            # Inference runs concurrently with collecting the next batch.
+            task = asyncio.create_task(self._run_batch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, int, asyncio.Future, float]]) -> None:
+        try:
+            await self._infer(batch)
+        finally:
+            self._slots.release()
+
+    async def _infer(self, batch: List[Tuple[str, int, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        waits = [dispatched - enqueued for _, _, _, enqueued in batch]
+        for waited in waits:
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+        self.batches += 1
+        self.batched_items += len(batch)
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        texts = [text for text, _, _, _ in batch]
+        limit = max(limit for _, limit, _, _ in batch)
+        # Resolved per batch so a hot-swapped model is picked up between batches.
+        recommender = self.get_recommender()
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._pool, recommender.find_similar_batch, texts, limit
+            )
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("Batched ML inference failed: %s", exc)
+            results = [[] for _ in batch]
+
+        elapsed = time.perf_counter() - dispatched
+        self.inference_total += elapsed
+        self.inference_max = max(self.inference_max, elapsed)
+        if self.on_batch is not None:
+            self.on_batch(len(batch), elapsed, waits)
+        for (_, item_limit, future, _), similar_ids in zip(batch, results):
+            if not future.done():
+                future.set_result(similar_ids[: item_limit + 1])
+
+    def snapshot(self) -> Dict[str, Any]:
+        batches = self.batches or 1
+        items = self.batched_items or 1
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_items / batches, 2),
+            "max_batch_size": self.max_batch_seen,
+            "avg_queue_wait_ms": round(self.queue_wait_total * 1000 / items, 3),
+            "max_queue_wait_ms": round(self.queue_wait_max * 1000, 3),
+            "avg_inference_ms": round(self.inference_total * 1000 / batches, 3),
+            "max_inference_ms": round(self.inference_max * 1000, 3),
+        }
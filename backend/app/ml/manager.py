@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .artifact_store import read_manifest
+from .recommender import ProductRecommender, product_text
+
+logger = logging.getLogger("speedscale.ml")
+
+
+class ModelManager:
+    """Owns the live recommender and swaps in rebuilt ones atomically.
+
+    Rebuilds happen off the event loop on a fresh instance; the swap is a
+    single reference assignment, so requests that already hold the old
+    recommender finish on it while new requests see the new one.
+    """
+
+    def __init__(self, recommender: ProductRecommender, extend_limit: int = 50000) -> None:
+        self.current = recommender
+        self.extend_limit = extend_limit
+        self.swaps = 0
+        self.last_swap_at: Optional[float] = None
+        self.last_action: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._pending_inserts = asyncio.Event()
+
+    def _swap(self, recommender: ProductRecommender, action: Dict[str, Any]) -> None:
+        previous = self.current
+        self.current = recommender
+        self.swaps += 1
+        self.last_swap_at = time.time()
+        self.last_action = action
+        logger.info("Recommender swapped %s -> %s (%s)", previous.version, recommender.version, action["mode"])
+
+    async def reload(self, collection: Optional[AsyncIOMotorCollection] = None) -> Dict[str, Any]:
+        async with self._lock:
+            started = time.perf_counter()
+            base = self.current
+            fresh = ProductRecommender(index=base.index_kind, lazy=True, artifacts_path=base.artifacts_path)
+            if not await asyncio.to_thread(fresh.load):
+                self.last_error = "artifact load failed"
+                return {"mode": "reload", "swapped": False, "version": base.version, "error": self.last_error}
+            result = {
+                "mode": "reload",
+                "swapped": True,
+                "version": fresh.version,
+                "products": fresh.size,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            self._swap(fresh, result)
+            self.last_error = None
+
+        # Products inserted after that build was trained are appended right away.
+        if collection is not None:
+            result["extended"] = await self.extend(collection)
+        return result
+
+    async def extend(self, collection: AsyncIOMotorCollection, wait_seconds: float = 30.0) -> Dict[str, Any]:
+        async with self._lock:
+            started = time.perf_counter()
+            base = self.current
+            if not base.ready and not await asyncio.to_thread(base.wait_ready, wait_seconds):
+                return {"mode": "extend", "swapped": False, "added": 0, "error": "model not loaded"}
+
+            latest = base.latest_product_id()
+            query = {"_id": {"$gt": ObjectId(latest)}} if latest and ObjectId.is_valid(latest) else {}
+            cursor = collection.find(query, {"name": 1, "description": 1, "category": 1}).sort("_id", 1)
+            docs = await cursor.to_list(length=self.extend_limit)
+            if not docs:
+                return {"mode": "extend", "swapped": False, "added": 0, "version": base.version}
+
+            ids = [str(doc["_id"]) for doc in docs]
+            texts = [product_text(doc) for doc in docs]
+            try:
+                extended = await asyncio.to_thread(base.extended, ids, texts)
+            except Exception as exc:
+                self.last_error = str(exc)
+                logger.warning("Recommender extension failed: %s", exc)
+                return {"mode": "extend", "swapped": False, "added": 0, "error": self.last_error}
+
+            result = {
+                "mode": "extend",
+                "swapped": True,
+                "added": len(ids),
+                "version": extended.version,
+                "products": extended.size,
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            self._swap(extended, result)
+            self.last_error = None
+            return result
+
+    async def watch_artifacts(self, interval: float, collection: Optional[AsyncIOMotorCollection] = None) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                manifest = await asyncio.to_thread(read_manifest, self.current.artifacts_path)
+            except Exception as exc:
+                logger.debug("Artifact manifest unreadable: %s", exc)
+                continue
+            if manifest and self.current.ready and manifest.get("build_id") != self.current.build_id:
+                logger.info("New artifact build %s detected", manifest.get("build_id"))
+                await self.reload(collection)
+
+    async def follow_inserts(self, collection: AsyncIOMotorCollection, debounce: float = 5.0) -> None:
+        # Change streams need a replica set or mongos; on a standalone server this
+        # logs once and leaves the admin endpoint and file watch as triggers.
+        consumer = asyncio.create_task(self._extend_on_inserts(collection, debounce))
+        try:
+            async with collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                async for _ in stream:
+                    self._pending_inserts.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Recommender change stream unavailable: %s", exc)
+        finally:
+            consumer.cancel()
+
+    async def _extend_on_inserts(self, collection: AsyncIOMotorCollection, debounce: float) -> None:
+        while True:
+            await self._pending_inserts.wait()
+            await asyncio.sleep(debounce)
+            self._pending_inserts.clear()
+            try:
+                await self.extend(collection)
+            except Exception as exc:
+                logger.warning("Recommender extension after inserts failed: %s", exc)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "version": self.current.version,
+            "build_id": self.current.build_id,
+            "swaps": self.swaps,
+            "last_swap_at": self.last_swap_at,
+            "last_action": self.last_action,
+            "last_error": self.last_error,
+            "rebuilding": self._lock.locked(),
+        }
@@ -0,0 +1,95 @@
+"""Offline top-K neighbour table for every trained product.
+
+    python -m backend.app.ml.neighbors --k 10
+
+Adds an int32 ``neighbors`` array of shape ``(len(product_ids), k)`` to
+the artifact build: row ``i`` holds the row numbers of the products most
+similar to ``product_ids[i]`` (best first, -1 padded). The recommender
+memory-maps it, so /similar for a trained product is an O(1) row lookup
+instead of a vectorize + kNN call.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+# Per cell of a dense (block, N) score block: the float32 scores, their
+# negated copy and argpartition's int64 indices.
+BYTES_PER_SCORE = 16
+
+
+def block_rows(rows: int, batch_size: int = 1024, memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES) -> int:
+    """Rows scored per exact block, so a block's dense scores fit the budget."""
+    return max(1, min(batch_size, memory_budget_bytes // (BYTES_PER_SCORE * max(rows, 1))))
+
+
+def build_neighbor_table(
+    matrix,
+    k: int = 10,
+    batch_size: int = 1024,
+    index=None,
+    memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES,
+) -> np.ndarray:
+    matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32))
+    rows = matrix.shape[0]
+    k = max(1, min(k, rows - 1))
+    table = np.full((rows, k), -1, dtype=np.int32)
+    if index is None:
+        # Each exact block is dense over all N columns: 1024 rows of a
+        # 3M-product catalog would need ~48 GB.
+        batch_size = block_rows(rows, batch_size, memory_budget_bytes)
+
+    for start in range(0, rows, batch_size):
+        stop = min(start + batch_size, rows)
+        block = matrix[start:stop]
+        if index is not None:
+            _, found = index.kneighbors(block, n_neighbors=k + 1)
+            for offset, candidates in enumerate(found):
+                others = [c for c in candidates if c >= 0 and c != start + offset][:k]
+                table[start + offset, : len(others)] = others
+            continue
+
+        scores = (block @ matrix.T).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        table[start:stop] = np.take_along_axis(top, order, axis=1)
+    return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=10, help="neighbours stored per product")
+    parser.add_argument("--batch-size", type=int, default=1024, help="upper bound on rows scored per block")
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_BUDGET_BYTES // (1024 * 1024), help="memory per exact block")
+    parser.add_argument("--ann", action="store_true", help="use the IVF index instead of exact blockwise kNN")
+    args = parser.parse_args()
+
+    from .ann import IVFIndex
+    from .artifact_store import load_artifacts, save_artifacts
+    from .recommender import ARTIFACTS_PATH
+
+    artifacts = load_artifacts(ARTIFACTS_PATH)
+    if artifacts is None:
+        raise SystemExit("No trained artifacts found; run `python -m backend.app.ml.train` first.")
+
+    started = time.perf_counter()
+    index = IVFIndex().fit(artifacts.matrix) if args.ann else None
+    artifacts.neighbors = build_neighbor_table(
+        artifacts.matrix,
+        k=args.k,
+        batch_size=args.batch_size,
+        index=index,
+        memory_budget_bytes=args.memory_mb * 1024 * 1024,
+    )
+    build_id = save_artifacts(ARTIFACTS_PATH, artifacts, extra={"neighbors_k": args.k})
+    rows, k = artifacts.neighbors.shape
+    print(f"Wrote {rows}x{k} neighbour table (build {build_id}) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,238 @@
 import os
-import pickle
-from typing import List
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from .ann import BruteForceIndex, build_index
+from .artifact_store import ArtifactError, load_artifacts, load_legacy_pickles
+
+ARTIFACTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts")
+
+ML_INDEX = os.getenv("ML_INDEX", "brute").lower()
+ML_IVF_COMPONENTS = int(os.getenv("ML_IVF_COMPONENTS", "128"))
+ML_IVF_LISTS = int(os.getenv("ML_IVF_LISTS", "0"))
+ML_IVF_PROBE = int(os.getenv("ML_IVF_PROBE", "8"))
+ML_IVF_RERANK = int(os.getenv("ML_IVF_RERANK", "50"))
+
+
+def product_text(doc: Dict[str, Any]) -> str:
+    # Same text the training pipeline vectorizes.
+    return f"{doc.get('name') or ''} {doc.get('description') or ''} {doc.get('category') or ''}".lower()
 
 
 class ProductRecommender:
-    def __init__(self):
-        self.model = None
+    """TF-IDF similarity over the trained artifacts plus products added since.
+
+    The artifact matrix, ids and index are shared read-only (memory-mapped,
+    and inherited across forks). Products appended by ``extended`` go into
+    a separate small delta matrix searched exactly next to the base index,
+    so extending never copies the base matrix or refits the index.
+    """
+
+    def __init__(self, index: str = ML_INDEX, lazy: bool = False, artifacts_path: str = ARTIFACTS_PATH):
+        self.artifacts_path = artifacts_path
+        self.index_kind = index
         self.vectorizer = None
-        self.product_ids: List[str] = []
+        self.matrix = None
+        self.index = None
+        self.product_ids: np.ndarray = np.empty(0, dtype="S24")
+        self.id_order: Optional[np.ndarray] = None
+        self.neighbors = None
+        # Products appended after training; their rows follow the base rows.
+        self.delta_ids: np.ndarray = np.empty(0, dtype="S24")
+        self.delta_matrix = None
+        self.delta_index: Optional[BruteForceIndex] = None
+        self._delta_rows: Dict[bytes, int] = {}
+        self.build_id: Optional[str] = None
+        self.build_rows = 0
+        self.version: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._ready = threading.Event()
+        self._load_lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+
+        if not lazy:
+            self.load()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def loading(self) -> bool:
+        return self._loader is not None and self._loader.is_alive()
+
+    @property
+    def size(self) -> int:
+        return len(self.product_ids) + len(self.delta_ids)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
 
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        artifacts_path = os.path.join(base_path, "artifacts")
+    def load_in_background(self) -> threading.Thread:
+        with self._load_lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self.load, name="recommender-load", daemon=True)
+                self._loader.start()
+            return self._loader
 
+    def load(self) -> bool:
+        if self.ready:
+            return True
+        started = time.perf_counter()
         try:
-            with open(os.path.join(artifacts_path, "vectorizer.pkl"), "rb") as f:
-                self.vectorizer = pickle.load(f)
-            with open(os.path.join(artifacts_path, "model.pkl"), "rb") as f:
-                self.model = pickle.load(f)
-            with open(os.path.join(artifacts_path, "product_ids.pkl"), "rb") as f:
-                self.product_ids = pickle.load(f)
-            print("ML Model loaded successfully ✅")
-        except FileNotFoundError:
-            print("⚠️ ML Artifacts not found. Please run training.ipynb first.")
+            artifacts = load_artifacts(self.artifacts_path)
+            if artifacts is None:
+                artifacts = load_legacy_pickles(self.artifacts_path)
+                if artifacts is not None:
+                    print("⚠️ Loaded legacy pickle artifacts. Run `python -m backend.app.ml.artifact_store convert`.")
+        except (ArtifactError, OSError, ValueError, KeyError) as exc:
+            print(f"⚠️ ML Artifacts could not be loaded: {exc}")
+            return False
+
+        if artifacts is None:
+            print("⚠️ ML Artifacts not found. Run `python -m backend.app.ml.train` first.")
+            return False
+
+        self._install(
+            vectorizer=artifacts.build_vectorizer(),
+            matrix=artifacts.matrix,
+            product_ids=artifacts.product_ids,
+            id_order=artifacts.id_order,
+            neighbors=artifacts.neighbors,
+            build_id=artifacts.build_id or "legacy-pickle",
+        )
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        print(f"ML Model loaded successfully ✅ ({self.size} products in {self.load_seconds}s)")
+        return True
+
+    def _install(
+        self,
+        vectorizer,
+        matrix,
+        product_ids: np.ndarray,
+        id_order: np.ndarray,
+        neighbors,
+        build_id: str,
+    ) -> None:
+        if self.index_kind == "brute":
+            index = BruteForceIndex(matrix)
+        else:
+            index = build_index(
+                self.index_kind,
+                matrix,
+                n_components=ML_IVF_COMPONENTS,
+                n_lists=ML_IVF_LISTS,
+                n_probe=ML_IVF_PROBE,
+                rerank=ML_IVF_RERANK,
+            )
+
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.index = index
+        self.product_ids = product_ids
+        self.id_order = id_order
+        self.neighbors = neighbors
+        self.build_id = build_id
+        self.build_rows = len(product_ids)
+        self.version = build_id
+        self._ready.set()
+
+    def extended(self, product_ids: List[str], product_texts: List[str]) -> "ProductRecommender":
+        """Returns a new recommender that also covers ``product_ids``.
+
+        New rows are vectorized with the trained vocabulary and added to the
+        delta; the base matrix and index are shared, not copied. This
+        instance is left untouched so requests already using it finish on it.
+        """
+        if not self.ready:
+            raise RuntimeError("Cannot extend a recommender that is not loaded")
+        started = time.perf_counter()
+        new_rows = sparse.csr_matrix(self.vectorizer.transform(product_texts), dtype=np.float32)
+        delta_ids = np.concatenate([self.delta_ids, np.asarray(product_ids, dtype=self.product_ids.dtype)])
+        delta = new_rows if self.delta_matrix is None else sparse.vstack([self.delta_matrix, new_rows], format="csr")
+
+        clone = ProductRecommender(index=self.index_kind, lazy=True, artifacts_path=self.artifacts_path)
+        clone.vectorizer = self.vectorizer
+        clone.matrix = self.matrix
+        clone.index = self.index
+        clone.product_ids = self.product_ids
+        clone.id_order = self.id_order
+        clone.neighbors = self.neighbors
+        clone.build_id = self.build_id
+        clone.build_rows = self.build_rows
+        clone.delta_ids = delta_ids
+        clone.delta_matrix = delta
+        clone.delta_index = BruteForceIndex(delta)
+        base_rows = len(self.product_ids)
+        clone._delta_rows = {key: base_rows + offset for offset, key in enumerate(delta_ids)}
+        clone.version = f"{self.build_id}+{len(delta_ids)}"
+        clone.load_seconds = round(time.perf_counter() - started, 3)
+        clone._ready.set()
+        return clone
+
+    def latest_product_id(self) -> Optional[str]:
+        if not self.ready:
+            return None
+        # Deltas are appended in _id order, after everything in the build.
+        if len(self.delta_ids):
+            return self.delta_ids[-1].decode("ascii")
+        if not len(self.product_ids):
+            return None
+        return self.product_id_at(int(self.id_order[-1]))
+
+    def product_id_at(self, row: int) -> str:
+        base_rows = len(self.product_ids)
+        if row >= base_rows:
+            return self.delta_ids[row - base_rows].decode("ascii")
+        return self.product_ids[row].decode("ascii")
+
+    def row_for(self, product_id: str) -> Optional[int]:
+        if not self.ready or self.id_order is None:
+            return None
+        key = product_id.encode("ascii", "ignore")
+        position = int(np.searchsorted(self.product_ids, key, sorter=self.id_order))
+        if position < len(self.id_order):
+            row = int(self.id_order[position])
+            if self.product_ids[row] == key:
+                return row
+        return self._delta_rows.get(key)
+
+    def precomputed_neighbors(self, product_id: str, limit: int = 4) -> Optional[List[str]]:
+        if self.neighbors is None:
+            return None
+        row = self.row_for(product_id)
+        if row is None or row >= self.neighbors.shape[0]:
+            # Products appended after training have no precomputed row.
+            return None
+        return [self.product_id_at(idx) for idx in self.neighbors[row, :limit] if idx >= 0]
 
     def find_similar_products(self, product_text: str, limit: int = 4) -> List[str]:
-        if not self.model or not self.vectorizer:
-            return []
+        return self.find_similar_batch([product_text], limit=limit)[0]
 
-        try:
-            query_vec = self.vectorizer.transform([product_text])
-            distances, indices = self.model.kneighbors(query_vec, n_neighbors=limit + 1)
+    def find_similar_batch(self, product_texts: List[str], limit: int = 4) -> List[List[str]]:
+        if not self.ready:
+            return [[] for _ in product_texts]
 
-            similar_ids: List[str] = []
-            for idx in indices[0]:
-                if idx < len(self.product_ids):
-                    similar_ids.append(self.product_ids[idx])
+        try:
+            query_matrix = self.vectorizer.transform(product_texts)
+            distances, indices = self.index.kneighbors(query_matrix, n_neighbors=limit + 1)
+            if self.delta_index is not None:
+                delta_distances, delta_indices = self.delta_index.kneighbors(query_matrix, n_neighbors=limit + 1)
+                distances = np.hstack([distances, delta_distances])
+                indices = np.hstack([indices, delta_indices + len(self.product_ids)])
+                # Unfilled base slots are -1 at distance inf, so they sort last.
+                order = np.argsort(distances, axis=1, kind="stable")[:, : limit + 1]
+                indices = np.take_along_axis(indices, order, axis=1)
 
-            return similar_ids
+            results: List[List[str]] = []
+            size = self.size
+            for row in indices:
+                results.append([self.product_id_at(idx) for idx in row if 0 <= idx < size])
+            return results
         except Exception as exc:
             print(f"Error during ML inference: {exc}")
-            return []
+            return [[] for _ in product_texts]
@@ -0,0 +1,308 @@
+"""Streaming, parallel training pipeline for the product recommender.
+
+    python -m backend.app.ml.train                          # MONGO_URI / MONGO_DB / MONGO_COLLECTION
+    python -m backend.app.ml.train --workers 8 --batch-size 20000 --neighbors 10
+    python -m backend.app.ml.train --output /tmp/artifacts --report train.json
+
+Produces the same vocabulary, IDF weights and L2-normalised TF-IDF matrix
+as ``TfidfVectorizer(stop_words="english", max_features=5000)`` on the full
+catalog, without ever holding the catalog in memory:
+
+1. Count pass: products are streamed from Mongo in ``_id`` order and each
+   batch's term/document frequencies are counted on a worker process. Only
+   the merged per-term counters stay in the parent.
+2. Vectorize pass: the same ``_id`` range is streamed again and batches are
+   transformed in parallel. CSR rows are appended to spill files next to
+   the artifacts, so the parent holds one window of batches at a time.
+
+The spilled arrays are memory-mapped into a matrix and published with
+``save_artifacts`` (atomic manifest swap), so serving workers either keep
+the previous build or see the complete new one. Wall-clock time per phase
+and peak RSS (parent and workers) are printed and stored in the manifest.
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+
+from .artifact_store import DEFAULT_VECTORIZER, RecommenderArtifacts, make_vectorizer, save_artifacts
+from .recommender import ARTIFACTS_PATH, product_text
+
+PROJECTION = {"name": 1, "description": 1, "category": 1}
+MAX_FEATURES = 5000
+
+Batch = Tuple[List[str], List[str]]
+
+_worker_vectorizer = None
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "parent": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "workers": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def iter_batches(collection, batch_size: int, max_id: Any = None) -> Iterator[Batch]:
+    query = {"_id": {"$lte": max_id}} if max_id is not None else {}
+    cursor = collection.find(query, PROJECTION, batch_size=batch_size).sort("_id", 1)
+    ids: List[str] = []
+    texts: List[str] = []
+    for doc in cursor:
+        ids.append(str(doc["_id"]))
+        texts.append(product_text(doc))
+        if len(ids) >= batch_size:
+            yield ids, texts
+            ids, texts = [], []
+    if ids:
+        yield ids, texts
+
+
+def _count_terms(texts: List[str]) -> Tuple[int, List[str], np.ndarray, np.ndarray]:
+    params = {key: DEFAULT_VECTORIZER[key] for key in ("lowercase", "stop_words", "token_pattern")}
+    counter = CountVectorizer(dtype=np.int64, **params)
+    try:
+        counts = counter.fit_transform(texts)
+    except ValueError:
+        # Batch made only of stop words / empty strings.
+        return len(texts), [], np.empty(0, np.int64), np.empty(0, np.int64)
+    term_freq = np.asarray(counts.sum(axis=0)).ravel()
+    doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+    return len(texts), counter.get_feature_names_out().tolist(), term_freq, doc_freq
+
+
+def _init_vectorizer(vocabulary: List[str], idf: np.ndarray) -> None:
+    global _worker_vectorizer
+    _worker_vectorizer = make_vectorizer(vocabulary, idf)
+
+
+def _vectorize(texts: List[str]) -> sparse.csr_matrix:
+    return _worker_vectorizer.transform(texts).astype(np.float32)
+
+
+def _ordered_map(pool: Optional[Executor], fn: Callable, items: Iterable, window: int) -> Iterator[Any]:
+    # Executor.map would drain the whole batch generator up front; keep at most
+    # ``window`` batches in flight so memory stays bounded by the window.
+    if pool is None:
+        for item in items:
+            yield fn(item)
+        return
+    pending: deque = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def select_vocabulary(
+    term_freq: Counter, doc_freq: Counter, n_docs: int, max_features: int
+) -> Tuple[List[str], np.ndarray]:
+    # Same selection as TfidfVectorizer: most frequent terms over the corpus,
+    # columns in alphabetical order, smoothed IDF.
+    ranked = sorted(term_freq.items(), key=lambda item: (-item[1], item[0]))
+    if max_features:
+        ranked = ranked[:max_features]
+    vocabulary = sorted(term for term, _ in ranked)
+    df = np.array([doc_freq[term] for term in vocabulary], dtype=np.float64)
+    idf = np.log((1 + n_docs) / (1 + df)) + 1
+    return vocabulary, idf
+
+
+class _SpillWriter:
+    """Appends CSR batches to flat files and maps them back as one matrix."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.rows = 0
+        self.nnz = 0
+        self._files = {
+            name: open(os.path.join(directory, f"{name}.bin"), "wb")
+            for name in ("data", "indices", "row_nnz", "ids")
+        }
+
+    def append(self, ids: List[str], batch: sparse.csr_matrix) -> None:
+        batch.data.astype(np.float32, copy=False).tofile(self._files["data"])
+        batch.indices.astype(np.int32, copy=False).tofile(self._files["indices"])
+        np.diff(batch.indptr).astype(np.int64).tofile(self._files["row_nnz"])
+        np.asarray([product_id.encode("ascii") for product_id in ids], dtype="S24").tofile(self._files["ids"])
+        self.rows += batch.shape[0]
+        self.nnz += batch.nnz
+
+    def _map(self, name: str, dtype: str) -> np.ndarray:
+        path = os.path.join(self.directory, f"{name}.bin")
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def finish(self, n_features: int) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        for f in self._files.values():
+            f.close()
+        indptr = np.zeros(self.rows + 1, dtype=np.int64)
+        np.cumsum(self._map("row_nnz", "int64"), out=indptr[1:])
+        matrix = sparse.csr_matrix(
+            (self._map("data", "float32"), self._map("indices", "int32"), indptr),
+            shape=(self.rows, n_features),
+            copy=False,
+        )
+        return matrix, self._map("ids", "S24")
+
+
+def train(
+    collection,
+    output: str = ARTIFACTS_PATH,
+    workers: int = 0,
+    batch_size: int = 10000,
+    max_features: int = MAX_FEATURES,
+    neighbors_k: int = 0,
+    ann_neighbors: bool = False,
+) -> Dict[str, Any]:
+    workers = workers or os.cpu_count() or 1
+    window = workers * 2
+    report: Dict[str, Any] = {"workers": workers, "batch_size": batch_size, "max_features": max_features}
+    started = time.perf_counter()
+
+    # Pass 1: vocabulary and document frequencies.
+    term_freq: Counter = Counter()
+    doc_freq: Counter = Counter()
+    n_docs = 0
+    max_id = None
+    batches = 0
+
+    def count_source() -> Iterator[List[str]]:
+        nonlocal max_id
+        for ids, texts in iter_batches(collection, batch_size):
+            max_id = ids[-1]
+            yield texts
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for count, terms, tf, df in _ordered_map(pool, _count_terms, count_source(), window):
+            n_docs += count
+            batches += 1
+            term_freq.update(dict(zip(terms, tf.tolist())))
+            doc_freq.update(dict(zip(terms, df.tolist())))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if n_docs == 0:
+        raise SystemExit("No products to train on.")
+
+    vocabulary, idf = select_vocabulary(term_freq, doc_freq, n_docs, max_features)
+    report["count_seconds"] = round(time.perf_counter() - started, 3)
+    report["products"] = n_docs
+    report["batches"] = batches
+    report["terms_seen"] = len(term_freq)
+    del term_freq, doc_freq
+
+    # Pass 2: vectorize the same _id range and spill rows to disk.
+    phase = time.perf_counter()
+    os.makedirs(output, exist_ok=True)
+    upper = ObjectId(max_id) if ObjectId.is_valid(max_id) else max_id
+    with tempfile.TemporaryDirectory(dir=output, prefix=".train-") as spill_dir:
+        spill = _SpillWriter(spill_dir)
+        pool = (
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_vectorizer, initargs=(vocabulary, idf))
+            if workers > 1
+            else None
+        )
+        if pool is None:
+            _init_vectorizer(vocabulary, idf)
+        pending_ids: deque = deque()
+
+        def vectorize_source() -> Iterator[List[str]]:
+            for ids, texts in iter_batches(collection, batch_size, max_id=upper):
+                pending_ids.append(ids)
+                yield texts
+
+        try:
+            for batch in _ordered_map(pool, _vectorize, vectorize_source(), window):
+                spill.append(pending_ids.popleft(), batch)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        matrix, product_ids = spill.finish(len(vocabulary))
+        report["vectorize_seconds"] = round(time.perf_counter() - phase, 3)
+        report["nnz"] = int(matrix.nnz)
+
+        artifacts = RecommenderArtifacts(vocabulary=vocabulary, idf=idf, matrix=matrix, product_ids=product_ids)
+        if neighbors_k > 0:
+            from .ann import IVFIndex
+            from .neighbors import build_neighbor_table
+
+            phase = time.perf_counter()
+            index = IVFIndex().fit(matrix) if ann_neighbors else None
+            artifacts.neighbors = build_neighbor_table(matrix, k=neighbors_k, index=index)
+            report["neighbors_seconds"] = round(time.perf_counter() - phase, 3)
+
+        phase = time.perf_counter()
+        report["total_seconds"] = round(time.perf_counter() - started, 3)
+        report["peak_rss_mb"] = peak_rss_mb()
+        extra: Dict[str, Any] = {"source": "backend.app.ml.train", "training": report}
+        if neighbors_k > 0:
+            extra["neighbors_k"] = neighbors_k
+        report["build_id"] = save_artifacts(output, artifacts, extra=extra)
+        report["save_seconds"] = round(time.perf_counter() - phase, 3)
+    report["total_seconds"] = round(time.perf_counter() - started, 3)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/speedscale"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "speedscale"))
+    parser.add_argument("--collection", default=os.getenv("MONGO_COLLECTION", "products"))
+    parser.add_argument("--output", default=ARTIFACTS_PATH)
+    parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--max-features", type=int, default=MAX_FEATURES)
+    parser.add_argument("--neighbors", type=int, default=0, help="also build a top-K neighbour table")
+    parser.add_argument("--ann", action="store_true", help="build the neighbour table with the IVF index")
+    parser.add_argument("--report", help="write the timing/memory report to this JSON file")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        report = train(
+            client[args.db][args.collection],
+            output=args.output,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            max_features=args.max_features,
+            neighbors_k=args.neighbors,
+            ann_neighbors=args.ann,
+        )
+    finally:
+        client.close()
+
+    rss = report["peak_rss_mb"]
+    print(
+        f"Trained build {report['build_id']}: {report['products']} products, "
+        f"{report['total_seconds']}s total, peak RSS {rss['parent']} MiB (workers {rss['workers']} MiB)"
+    )
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
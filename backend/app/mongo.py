@@ -0,0 +1,176 @@
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
+
+logger = logging.getLogger("speedscale.mongo")
+
+READ_MODES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# Smallest maxStalenessSeconds servers accept (heartbeat interval + 80s).
+MIN_MAX_STALENESS_SECONDS = 90
+
+
+def parse_read_preferences(spec: str) -> Dict[str, _ServerMode]:
+    """Parses ``"search=secondaryPreferred:90,product=primary"`` into per-endpoint modes.
+
+    The optional number is ``maxStalenessSeconds``; it is ignored for
+    ``primary``, which never reads from a secondary.
+    """
+    preferences: Dict[str, _ServerMode] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        endpoint, _, rule = part.partition("=")
+        mode, _, staleness = rule.partition(":")
+        mode_class = READ_MODES.get(mode.strip().lower())
+        try:
+            max_staleness = int(staleness) if staleness.strip() else -1
+        except ValueError:
+            mode_class = None
+        if mode_class is None:
+            logger.warning("Ignoring malformed read preference %r", part)
+            continue
+        if mode_class is Primary:
+            preferences[endpoint.strip()] = Primary()
+            continue
+        if 0 <= max_staleness < MIN_MAX_STALENESS_SECONDS:
+            logger.warning("maxStalenessSeconds for %s raised to %ss", endpoint.strip(), MIN_MAX_STALENESS_SECONDS)
+            max_staleness = MIN_MAX_STALENESS_SECONDS
+        preferences[endpoint.strip()] = mode_class(max_staleness=max_staleness)
+    return preferences
+
+
+def describe_read_preference(preference: _ServerMode) -> Dict[str, Any]:
+    return dict(preference.document)
+
+
+class _PoolStats:
+    __slots__ = ("connections", "checked_out", "checkouts", "timeouts", "failures", "wait_total_ms", "wait_max_ms", "waits")
+
+    def __init__(self, samples: int) -> None:
+        self.connections = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.waits: Deque[float] = deque(maxlen=samples)
+
+    def as_dict(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def percentile(q: float) -> Optional[float]:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))], 3) if waits else None
+
+        return {
+            "connections": self.connections,
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "wait_ms": {
+                "avg": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else None,
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+                "max": round(self.wait_max_ms, 3),
+            },
+        }
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool gauges and checkout wait times per server.
+
+    pymongo reports each checkout's wait (pymongo >= 4.7), so a pool that is
+    too small shows up as growing ``wait_ms`` long before requests start
+    failing with ``WaitQueueTimeoutError``. Callbacks run on the driver's
+    threads, hence the lock.
+    """
+
+    def __init__(self, samples: int = 1024) -> None:
+        self.samples = samples
+        self._pools: Dict[str, _PoolStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, address) -> _PoolStats:
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        stats = self._pools.get(key)
+        if stats is None:
+            stats = self._pools[key] = _PoolStats(self.samples)
+        return stats
+
+    def _record_wait(self, stats: _PoolStats, duration: Optional[float]) -> None:
+        if duration is None:
+            return
+        wait_ms = duration * 1000
+        stats.wait_total_ms += wait_ms
+        stats.wait_max_ms = max(stats.wait_max_ms, wait_ms)
+        stats.waits.append(wait_ms)
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.checkouts += 1
+            stats.checked_out += 1
+            self._record_wait(stats, getattr(event, "duration", None))
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            stats = self._stats(event.address)
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                stats.timeouts += 1
+            else:
+                stats.failures += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.checked_out = max(stats.checked_out - 1, 0)
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self._stats(event.address).connections += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            stats = self._stats(event.address)
+            stats.connections = max(stats.connections - 1, 0)
+
+    # Remaining events carry nothing the snapshot reports.
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {address: stats.as_dict() for address, stats in self._pools.items()}
@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+PLACEHOLDER_IMAGE = "https://picsum.photos/seed/placeholder/400/300"
+
+
+def _created_iso(value: Any, oid: Any, memo: Dict[Any, str]) -> str:
+    if value is None:
+        # Products without createdAt report their insert time, which the
+        # ObjectId already carries; unlike utcnow() it is the same on every read.
+        if not isinstance(oid, ObjectId):
+            return ""
+        value = oid.generation_time.replace(tzinfo=None)
+    # Bulk-loaded batches share one timestamp, so most rows are a memo hit.
+    iso = memo.get(value)
+    if iso is None:
+        iso = memo[value] = value.isoformat() if isinstance(value, datetime) else str(value)
+    return iso
+
+
+class Product:
+    """One catalog product in API form.
+
+    Slots instead of a dict per product (about 110 bytes rather than 270),
+    filled positionally from the Mongo document. Encoders serialize it
+    through ``as_dict`` (see ``codec.to_builtin``).
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "price",
+        "description",
+        "category",
+        "brand",
+        "in_stock",
+        "rating",
+        "image_url",
+        "created_at",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        price: float,
+        description: str,
+        category: str,
+        brand: str,
+        in_stock: bool,
+        rating: float,
+        image_url: str,
+        created_at: str,
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.price = price
+        self.description = description
+        self.category = category
+        self.brand = brand
+        self.in_stock = in_stock
+        self.rating = rating
+        self.image_url = image_url
+        self.created_at = created_at
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any], memo: Optional[Dict[Any, str]] = None) -> "Product":
+        get = doc.get
+        oid = get("_id")
+        return cls(
+            str(oid),
+            get("name", ""),
+            float(get("price", 0.0)),
+            get("description", ""),
+            get("category", ""),
+            get("brand", ""),
+            bool(get("inStock", True)),
+            float(get("rating", 0.0)),
+            get("imageUrl", PLACEHOLDER_IMAGE),
+            _created_iso(get("createdAt"), oid, {} if memo is None else memo),
+        )
+
+    def as_dict(self, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        full = {
+            "_id": self.id,
+            "name": self.name,
+            "price": self.price,
+            "description": self.description,
+            "category": self.category,
+            "brand": self.brand,
+            "inStock": self.in_stock,
+            "rating": self.rating,
+            "imageUrl": self.image_url,
+            "createdAt": self.created_at,
+        }
+        if fields is None:
+            return full
+        return {key: full[key] for key in ("_id",) + fields}
+
+    def __repr__(self) -> str:
+        return f"Product({self.id!r}, {self.name!r})"
+
+
+def products_from_docs(docs: Iterable[Dict[str, Any]], fields: Optional[Tuple[str, ...]] = None) -> List[Any]:
+    """Converts a batch of Mongo documents; ``fields`` projects them to dicts."""
+    memo: Dict[Any, str] = {}
+    from_doc = Product.from_doc
+    products = [from_doc(doc, memo) for doc in docs]
+    if fields is None:
+        return products
+    return [product.as_dict(fields) for product in products]
@@ -0,0 +1,231 @@
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.asyncio import Redis
+
+from .cache import LocalCache
+
+logger = logging.getLogger("speedscale.ratelimit")
+
+# Sliding-window counter: the previous fixed window is weighted by how much of
+# it still overlaps the sliding window. One EVALSHA both checks and consumes,
+# and the counter key always gets its TTL in the same atomic step.
+#
+# KEYS: current window, previous window, window a returned lease was taken from
+# ARGV: limit, window_ms, elapsed_ms in current window, tokens wanted, refund
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local wanted = tonumber(ARGV[4])
+local refund = tonumber(ARGV[5])
+
+if refund > 0 then
+  local left = tonumber(redis.call("GET", KEYS[3]) or "0")
+  if left > 0 then
+    redis.call("DECRBY", KEYS[3], math.min(refund, left))
+  end
+end
+
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+local used = previous * (window - elapsed) / window + current
+local available = math.floor(limit - used)
+if available < 1 then
+  local retry = window - elapsed
+  if previous > 0 and current < limit - 1 then
+    retry = math.max(1, math.ceil(window - elapsed - (limit - 1 - current) * window / previous))
+  end
+  return {0, 0, retry}
+end
+
+local granted = math.min(wanted, available)
+redis.call("INCRBY", KEYS[1], granted)
+redis.call("PEXPIRE", KEYS[1], window * 2)
+return {granted, available - granted, 0}
+"""
+
+
+class RateLimitRule:
+    __slots__ = ("limit", "window_seconds")
+
+    def __init__(self, limit: int, window_seconds: float) -> None:
+        self.limit = max(1, limit)
+        self.window_seconds = max(window_seconds, 0.001)
+
+    def __repr__(self) -> str:
+        return f"{self.limit}/{self.window_seconds:g}s"
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimitRule]:
+    """Parses ``"search=60/60,product=600/60"`` into per-scope rules.
+
+    A scope without its own rule uses ``default``.
+    """
+    rules: Dict[str, RateLimitRule] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        scope, _, rule = part.partition("=")
+        limit, _, window = rule.partition("/")
+        try:
+            rules[scope.strip()] = RateLimitRule(int(limit), float(window or 60))
+        except ValueError:
+            logger.warning("Ignoring malformed rate limit %r", part)
+    rules.setdefault("default", RateLimitRule(60, 60))
+    return rules
+
+
+class RateDecision:
+    __slots__ = ("allowed", "limit", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, retry_after: float = 0.0) -> None:
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class _Lease:
+    __slots__ = ("tokens", "window_key", "expires_at")
+
+    def __init__(self, tokens: int, window_key: str, expires_at: float) -> None:
+        self.tokens = tokens
+        self.window_key = window_key
+        self.expires_at = expires_at
+
+
+class RateLimiter:
+    """Per-scope sliding-window limits shared through Redis.
+
+    With ``lease_size`` > 0 a worker takes up to that many tokens from Redis
+    at once and spends them locally for ``lease_seconds``; unspent tokens are
+    handed back on the next lease, so only one request per lease pays a Redis
+    round trip. Without Redis each worker falls back to a local token bucket
+    with the same rate.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Awaitable[Optional[Redis]]],
+        rules: Dict[str, RateLimitRule],
+        lease_size: int = 0,
+        lease_seconds: float = 1.0,
+        max_local_keys: int = 10000,
+    ) -> None:
+        self.get_client = get_client
+        self.rules = rules
+        self.lease_size = max(lease_size, 0)
+        self.lease_seconds = lease_seconds
+        self._leases = LocalCache(max_entries=max_local_keys if self.lease_size else 0)
+        self._buckets = LocalCache(max_entries=max_local_keys)
+        self._script = None
+
+        self.allowed = 0
+        self.denied = 0
+        self.local_grants = 0
+        self.redis_calls = 0
+        self.fallbacks = 0
+
+    def rule_for(self, scope: str) -> RateLimitRule:
+        return self.rules.get(scope) or self.rules["default"]
+
+    async def check(self, scope: str, identity: str) -> RateDecision:
+        rule = self.rule_for(scope)
+        key = f"{scope}:{identity}"
+
+        lease: Optional[_Lease] = self._leases.get(key)
+        if lease is not None and lease.tokens > 0 and lease.expires_at > time.monotonic():
+            lease.tokens -= 1
+            self.local_grants += 1
+            return self._record(RateDecision(True, rule.limit, lease.tokens))
+
+        client = await self.get_client()
+        if client is not None:
+            try:
+                return self._record(await self._acquire(client, key, rule, lease))
+            except Exception as exc:
+                logger.debug("Rate limiter Redis call failed: %s", exc)
+        self.fallbacks += 1
+        return self._record(self._local_take(key, rule))
+
+    async def _acquire(self, client: Redis, key: str, rule: RateLimitRule, lease: Optional[_Lease]) -> RateDecision:
+        if self._script is None:
+            self._script = client.register_script(SLIDING_WINDOW_LUA)
+        window_ms = int(rule.window_seconds * 1000)
+        now_ms = int(time.time() * 1000)
+        window_start = now_ms - now_ms % window_ms
+        # Hash tag keeps both windows of a key in one cluster slot.
+        current_key = f"rl:{{{key}}}:{window_start}"
+        previous_key = f"rl:{{{key}}}:{window_start - window_ms}"
+        wanted = min(self.lease_size, rule.limit) if self.lease_size else 1
+        refund = lease.tokens if lease is not None else 0
+        self.redis_calls += 1
+        granted, remaining, retry_ms = await self._script(
+            keys=[current_key, previous_key, lease.window_key if lease is not None else current_key],
+            args=[rule.limit, window_ms, now_ms - window_start, wanted, refund],
+            client=client,
+        )
+        if not granted:
+            self._leases.invalidate(key)
+            return RateDecision(False, rule.limit, 0, int(retry_ms) / 1000)
+        if self.lease_size:
+            # Kept past its expiry so unspent tokens can still be refunded.
+            expires_at = time.monotonic() + self.lease_seconds
+            self._leases.set(key, _Lease(int(granted) - 1, current_key, expires_at), rule.window_seconds * 2)
+        return RateDecision(True, rule.limit, int(remaining) + int(granted) - 1)
+
+    def _local_take(self, key: str, rule: RateLimitRule) -> RateDecision:
+        bucket: Optional[TokenBucket] = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rule.limit / rule.window_seconds, rule.limit)
+            self._buckets.set(key, bucket, rule.window_seconds * 2)
+        allowed, retry_after = bucket.take()
+        return RateDecision(allowed, rule.limit, int(bucket.tokens), retry_after)
+
+    def _record(self, decision: RateDecision) -> RateDecision:
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.denied += 1
+        return decision
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rules": {scope: repr(rule) for scope, rule in self.rules.items()},
+            "lease_size": self.lease_size,
+            "allowed": self.allowed,
+            "denied": self.denied,
+            "local_grants": self.local_grants,
+            "redis_calls": self.redis_calls,
+            "fallbacks": self.fallbacks,
+        }
+
+
+def rate_limit_headers(decision: RateDecision) -> Dict[str, str]:
+    return {
+        "Retry-After": str(max(1, math.ceil(decision.retry_after))),
+        "X-RateLimit-Limit": str(decision.limit),
+        "X-RateLimit-Remaining": "0",
+    }
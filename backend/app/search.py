@@ -0,0 +1,480 @@
+import asyncio
+import base64
+import heapq
+import json
+import logging
+import math
+import re
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import TEXT
+from pymongo.errors import OperationFailure
+
+SEARCH_FIELDS = ("name", "category", "brand")
+FIELD_WEIGHTS = {"name": 10, "brand": 4, "category": 4}
+TEXT_INDEX_NAME = "product_text_search"
+INDEX_NOT_FOUND = 27
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Keyset position of the last row on a page: {"id": <ObjectId hex>} for _id
+# ordered results, plus "s" (score) for relevance-ordered ones.
+SearchAfter = Dict[str, Any]
+SearchPage = Tuple[List[Dict[str, Any]], Optional[SearchAfter]]
+
+logger = logging.getLogger("speedscale.search")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def encode_cursor(after: SearchAfter) -> str:
+    raw = json.dumps(after, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> SearchAfter:
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(after, dict) or not ObjectId.is_valid(after.get("id")):
+        raise ValueError("Malformed cursor")
+    if "s" in after and not isinstance(after["s"], (int, float)):
+        raise ValueError("Malformed cursor")
+    return after
+
+
+def build_projection(fields: Optional[Sequence[str]]) -> Optional[Dict[str, int]]:
+    if not fields:
+        return None
+    return {field: 1 for field in fields}
+
+
+class InvertedIndex:
+    """BM25-ranked in-memory index over weighted product fields.
+
+    The last query token is also matched as a prefix so partial input
+    ("lap") still finds "laptop", mirroring the old substring search.
+    """
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, int]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_prefix_terms: int = 32,
+    ) -> None:
+        self.weights = weights or FIELD_WEIGHTS
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        # Frequencies are stored in field-weight units, so saturate on the same scale.
+        self._saturation = k1 * max(self.weights.values())
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._slots: Dict[str, int] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._lengths: List[float] = []
+        self._total_length = 0.0
+        self._free_slots: List[int] = []
+        self._sorted_terms: List[str] = []
+        self._terms_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def add(self, doc_id: str, fields: Dict[str, Any]) -> None:
+        if doc_id in self._slots:
+            self.remove(doc_id)
+
+        frequencies: Dict[str, float] = {}
+        for field, weight in self.weights.items():
+            for token in tokenize(str(fields.get(field) or "")):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        length = sum(frequencies.values())
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._doc_ids[slot] = doc_id
+            self._doc_terms[slot] = tuple(frequencies)
+            self._lengths[slot] = length
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._doc_terms.append(tuple(frequencies))
+            self._lengths.append(length)
+
+        self._slots[doc_id] = slot
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms_dirty = True
+            postings[slot] = frequency
+
+    def remove(self, doc_id: str) -> bool:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        for term in self._doc_terms[slot]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(slot, None)
+            if not postings:
+                del self._postings[term]
+                self._terms_dirty = True
+        self._total_length -= self._lengths[slot]
+        self._doc_ids[slot] = None
+        self._doc_terms[slot] = ()
+        self._lengths[slot] = 0.0
+        self._free_slots.append(slot)
+        return True
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        if self._terms_dirty:
+            self._sorted_terms = sorted(self._postings)
+            self._terms_dirty = False
+        terms: List[str] = []
+        position = bisect_left(self._sorted_terms, prefix)
+        while position < len(self._sorted_terms) and len(terms) < self.max_prefix_terms:
+            term = self._sorted_terms[position]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            position += 1
+        return terms
+
+    def _query_terms(self, query: str) -> Dict[str, float]:
+        tokens = tokenize(query)
+        terms: Dict[str, float] = {token: 1.0 for token in tokens}
+        if tokens:
+            # Prefix expansions rank below exact matches of the same token.
+            for term in self._prefix_terms(tokens[-1]):
+                terms.setdefault(term, 0.8)
+        return terms
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = 20, after: Optional[Tuple[float, str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Ranked (doc_id, score) pairs, best first; ties are ordered by doc_id.
+
+        ``after`` is the (score, doc_id) of the last hit on the previous page;
+        it replaces ``offset`` for deep pages so they cost the same as page one.
+        """
+        doc_count = len(self._slots)
+        if not doc_count or limit <= 0:
+            return []
+        average_length = self._total_length / doc_count or 1.0
+
+        scores: Dict[int, float] = {}
+        for term, boost in self._query_terms(query).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for slot, frequency in postings.items():
+                norm = self._saturation * (1 - self.b + self.b * self._lengths[slot] / average_length)
+                score = boost * idf * frequency * (self.k1 + 1) / (frequency + norm)
+                scores[slot] = scores.get(slot, 0.0) + score
+
+        ranked = ((score, self._doc_ids[slot]) for slot, score in scores.items())
+        if after is not None:
+            after_key = (-after[0], after[1])
+            ranked = (item for item in ranked if (-item[0], item[1]) > after_key)
+        top = heapq.nsmallest(offset + limit, ranked, key=lambda item: (-item[0], item[1]))
+        return [(doc_id, score) for score, doc_id in top[offset:]]
+
+
+class RegexSearchBackend:
+    name = "regex"
+
+    async def prepare(self, collection: AsyncIOMotorCollection) -> None:
+        return None
+
+    async def run(self, collection: AsyncIOMotorCollection) -> None:
+        await self.prepare(collection)
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """Called after a product write; only in-memory backends need it."""
+        return None
+
+    def remove(self, doc_id: str) -> bool:
+        return False
+
+    async def refresh_ids(self, collection: AsyncIOMotorCollection, doc_ids: Sequence[str]) -> None:
+        """Called when another worker changed these products."""
+        return None
+
+    async def search(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[SearchAfter] = None,
+        fields: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+    ) -> SearchPage:
+        pattern = re.escape(query)
+        criteria: Dict[str, Any] = {
+            "$or": [{field: {"$regex": pattern, "$options": "i"}} for field in SEARCH_FIELDS]
+        }
+        if category:
+            # Equality on the shard key prefix lets mongos target the category's shards.
+            criteria["category"] = category
+        if after is not None:
+            # Keyset on _id: the next page starts where the last one ended, no skip scan.
+            criteria["_id"] = {"$gt": ObjectId(after["id"])}
+            skip = 0
+        cursor = collection.find(criteria, build_projection(fields)).sort("_id", 1)
+        docs = await cursor.skip(skip).limit(limit).to_list(length=limit)
+        return docs, ({"id": str(docs[-1]["_id"])} if len(docs) == limit else None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class TextSearchBackend(RegexSearchBackend):
+    name = "text"
+
+    def __init__(self) -> None:
+        self.fallback_queries = 0
+
+    async def prepare(self, collection: AsyncIOMotorCollection) -> None:
+        try:
+            await collection.create_index(
+                [(field, TEXT) for field in SEARCH_FIELDS],
+                weights=FIELD_WEIGHTS,
+                name=TEXT_INDEX_NAME,
+                default_language="english",
+            )
+        except Exception as exc:
+            logger.warning("Text index creation failed: %s", exc)
+
+    async def search(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[SearchAfter] = None,
+        fields: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+    ) -> SearchPage:
+        if after is not None and "s" not in after:
+            # Cursor handed out by the regex fallback.
+            return await super().search(collection, query, skip, limit, after, fields, category)
+
+        match: Dict[str, Any] = {"$text": {"$search": query}}
+        if category:
+            match["category"] = category
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": match},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if after is not None:
+            # textScore cannot be filtered in find(), so keyset on (score, _id) in a pipeline.
+            after_id = ObjectId(after["id"])
+            pipeline.append(
+                {"$match": {"$or": [{"score": {"$lt": after["s"]}}, {"score": after["s"], "_id": {"$gt": after_id}}]}}
+            )
+        pipeline.append({"$sort": {"score": -1, "_id": 1}})
+        if skip and after is None:
+            pipeline.append({"$skip": skip})
+        pipeline.append({"$limit": limit})
+        projection = build_projection(fields)
+        if projection:
+            pipeline.append({"$project": {**projection, "score": 1}})
+
+        try:
+            docs = await collection.aggregate(pipeline).to_list(length=limit)
+        except OperationFailure as exc:
+            if exc.code != INDEX_NOT_FOUND:
+                raise
+            # The text index is still being built; keep serving with the slow path.
+            self.fallback_queries += 1
+            return await super().search(collection, query, skip, limit, None, fields, category)
+        if len(docs) < limit:
+            return docs, None
+        return docs, {"s": docs[-1]["score"], "id": str(docs[-1]["_id"])}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"backend": self.name, "fallback_queries": self.fallback_queries}
+
+
+class InvertedIndexSearchBackend(RegexSearchBackend):
+    """Serves unscoped searches from an in-memory BM25 index.
+
+    Each sync pulls products with ids above the last one seen. That misses
+    updates, deletes and inserts with older ids (imports that keep their
+    ObjectIds), so every ``full_refresh_seconds`` the index is rebuilt from
+    a full scan. Writes made through the gateway reach other workers sooner
+    through ``refresh_ids``.
+    """
+
+    name = "inverted"
+
+    def __init__(self, refresh_seconds: float = 30.0, batch_size: int = 2000, full_refresh_seconds: float = 600.0) -> None:
+        self.index = InvertedIndex()
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        self.batch_size = batch_size
+        self.ready = False
+        self.last_synced_id: Optional[ObjectId] = None
+        self.last_sync_at: Optional[float] = None
+        self.last_full_sync_at: Optional[float] = None
+        self.full_syncs = 0
+        # Changes made while a rebuild scans, replayed onto the new index.
+        self._replay: Optional[List[Tuple[str, Optional[Dict[str, Any]]]]] = None
+
+    async def prepare(self, collection: AsyncIOMotorCollection) -> None:
+        await self.sync(collection)
+        self.ready = True
+
+    async def run(self, collection: AsyncIOMotorCollection) -> None:
+        while True:
+            try:
+                await self.sync(collection)
+                self.ready = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Inverted index sync failed: %s", exc)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def _full_sync_due(self, now: float) -> bool:
+        if self.last_full_sync_at is None:
+            return True
+        return self.full_refresh_seconds > 0 and now - self.last_full_sync_at >= self.full_refresh_seconds
+
+    async def sync(self, collection: AsyncIOMotorCollection) -> int:
+        now = asyncio.get_running_loop().time()
+        if self._full_sync_due(now):
+            return await self.rebuild(collection)
+
+        # ObjectIds grow monotonically, so new inserts are picked up without rescanning.
+        query = {"_id": {"$gt": self.last_synced_id}} if self.last_synced_id else {}
+        added = await self._scan(collection, query, self.index)
+        self.last_sync_at = now
+        if added:
+            logger.info("Inverted index synced %s products (total %s)", added, len(self.index))
+        return added
+
+    async def rebuild(self, collection: AsyncIOMotorCollection) -> int:
+        """Re-indexes the whole collection into a fresh index, then swaps it in."""
+        index = InvertedIndex()
+        self._replay = []
+        try:
+            added = await self._scan(collection, {}, index)
+            for doc_id, doc in self._replay:
+                if doc is None:
+                    index.remove(doc_id)
+                else:
+                    index.add(doc_id, doc)
+        finally:
+            self._replay = None
+        self.index = index
+        self.last_sync_at = self.last_full_sync_at = asyncio.get_running_loop().time()
+        self.full_syncs += 1
+        logger.info("Inverted index rebuilt with %s products", added)
+        return added
+
+    async def _scan(self, collection: AsyncIOMotorCollection, query: Dict[str, Any], index: InvertedIndex) -> int:
+        projection = {field: 1 for field in SEARCH_FIELDS}
+        cursor = collection.find(query, projection).sort("_id", 1).batch_size(self.batch_size)
+        added = 0
+        async for doc in cursor:
+            index.add(str(doc["_id"]), doc)
+            self.last_synced_id = doc["_id"]
+            added += 1
+            if added % self.batch_size == 0:
+                await asyncio.sleep(0)
+        return added
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        doc_id = str(doc["_id"])
+        self.index.add(doc_id, doc)
+        if self._replay is not None:
+            self._replay.append((doc_id, doc))
+
+    def remove(self, doc_id: str) -> bool:
+        if self._replay is not None:
+            self._replay.append((doc_id, None))
+        return self.index.remove(doc_id)
+
+    async def refresh_ids(self, collection: AsyncIOMotorCollection, doc_ids: Sequence[str]) -> None:
+        oids = {}
+        for doc_id in doc_ids:
+            try:
+                oids[ObjectId(doc_id)] = doc_id
+            except (InvalidId, TypeError):
+                continue
+        if not oids:
+            return
+        projection = {field: 1 for field in SEARCH_FIELDS}
+        found = set()
+        async for doc in collection.find({"_id": {"$in": list(oids)}}, projection):
+            found.add(doc["_id"])
+            self.upsert(doc)
+        for oid, doc_id in oids.items():
+            if oid not in found:
+                self.remove(doc_id)
+
+    async def search(
+        self,
+        collection: AsyncIOMotorCollection,
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[SearchAfter] = None,
+        fields: Optional[Sequence[str]] = None,
+        category: Optional[str] = None,
+    ) -> SearchPage:
+        if not self.ready or category or (after is not None and "s" not in after):
+            # Category-scoped queries go to Mongo, where the shard key can target them.
+            return await super().search(collection, query, skip, limit, after, fields, category)
+
+        position = (after["s"], after["id"]) if after is not None else None
+        hits = self.index.search(query, offset=0 if position else skip, limit=limit, after=position)
+        if not hits:
+            return [], None
+        ranked_ids = [ObjectId(doc_id) for doc_id, _ in hits]
+        cursor = collection.find({"_id": {"$in": ranked_ids}}, build_projection(fields))
+        docs = await cursor.to_list(length=len(ranked_ids))
+        by_id = {doc["_id"]: doc for doc in docs}
+        page = [by_id[oid] for oid in ranked_ids if oid in by_id]
+        # The cursor follows the index ranking even if a hit was deleted from Mongo.
+        last_id, last_score = hits[-1]
+        return page, ({"s": last_score, "id": last_id} if len(hits) == limit else None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "ready": self.ready,
+            "documents": len(self.index),
+            "terms": self.index.vocabulary_size,
+            "full_syncs": self.full_syncs,
+        }
+
+
+def build_search_backend(name: str, refresh_seconds: float = 30.0, full_refresh_seconds: float = 600.0) -> RegexSearchBackend:
+    name = name.lower()
+    if name == "inverted":
+        return InvertedIndexSearchBackend(refresh_seconds=refresh_seconds, full_refresh_seconds=full_refresh_seconds)
+    if name == "regex":
+        return RegexSearchBackend()
+    return TextSearchBackend()
@@ -0,0 +1,160 @@
+"""Pre-fork launcher for running the gateway on several cores.
+
+The parent imports the app and loads the ML artifacts once, freezes the heap
+and binds the listening socket; each worker is then forked from it, so the
+model and imported modules are shared copy-on-write instead of loaded N
+times. Workers dump their metrics to ``METRICS_MULTIPROC_DIR`` (a temporary
+directory unless set) so ``/metrics`` reports all of them, whichever worker
+answers. Crashed workers are replaced; SIGTERM/SIGINT stop them all::
+
+    python -m backend.app.serve --workers 4 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import uvicorn
+
+from .metrics import clear_dumps, mark_process_dead
+
+logger = logging.getLogger("speedscale.serve")
+
+# A worker that dies sooner than this is crash-looping; respawn more slowly.
+MIN_WORKER_LIFETIME_SECONDS = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload(gateway: Any, load_model: bool = True) -> None:
+    """Does the once-per-deployment work in the parent, before any fork."""
+    if load_model:
+        gateway.ml_models.current.load()
+        gateway.startup.mark("model")
+    # Objects that exist now are never collected; keeping the collector off
+    # them stops it from writing to (and so copying) their shared pages.
+    gc.collect()
+    gc.freeze()
+
+
+class Supervisor:
+    def __init__(self, workers: int, target: Callable[[], None], metrics_dir: Optional[str] = None) -> None:
+        self.workers = workers
+        self.target = target
+        self.metrics_dir = metrics_dir
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        self.restarts = 0
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.target()
+            except BaseException:
+                logger.exception("Worker %s failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def stop(self, signum: int, frame: Any = None) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if self.metrics_dir:
+            clear_dumps(self.metrics_dir)
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info("Started %s workers: %s", self.workers, sorted(self.children))
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if self.metrics_dir and started is not None:
+                mark_process_dead(self.metrics_dir, pid)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %s exited with code %s; starting a replacement", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(MIN_WORKER_LIFETIME_SECONDS)
+            self.restarts += 1
+            self.spawn()
+        return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.serve", description="Run the gateway.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--proxy-headers", action="store_true")
+    parser.add_argument("--no-preload-model", action="store_true", help="let each worker load the ML artifacts itself")
+    parser.add_argument("--reload", action="store_true", help="development mode: one worker, restarted on code changes")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args(argv)
+
+    if args.reload:
+        uvicorn.run(f"{__package__}.main:app", host=args.host, port=args.port, reload=True, log_level=args.log_level)
+        return 0
+
+    metrics_dir = None
+    if args.workers > 1:
+        # Read by the gateway at import, so it has to be set first.
+        metrics_dir = os.environ.get("METRICS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="speedscale-metrics-")
+        os.makedirs(metrics_dir, exist_ok=True)
+        os.environ["METRICS_MULTIPROC_DIR"] = metrics_dir
+
+    from . import main as gateway
+
+    preload(gateway, load_model=not args.no_preload_model)
+    sock = bind_socket(args.host, args.port)
+
+    def serve() -> None:
+        if args.workers > 1:
+            gateway.after_fork()
+        config = uvicorn.Config(
+            gateway.app,
+            host=args.host,
+            port=args.port,
+            proxy_headers=args.proxy_headers,
+            log_level=args.log_level,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+
+    if args.workers <= 1:
+        serve()
+        return 0
+    return Supervisor(args.workers, serve, metrics_dir=metrics_dir).run()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import random
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+
+logger = logging.getLogger("speedscale.sharding")
+
+HASHED = "hashed"
+MAX_MEMO_ENTRIES = 1024
+
+ShardKey = List[Tuple[str, Any]]
+Chunk = Tuple[Dict[str, Any], Dict[str, Any], str]
+
+
+def parse_shard_key(spec: str) -> ShardKey:
+    """Parses ``"category:1,_id:hashed"`` into an ordered shard key pattern."""
+    key: ShardKey = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        field, _, kind = part.partition(":")
+        kind = kind.strip() or "1"
+        key.append((field.strip(), HASHED if kind == HASHED else int(kind)))
+    return key
+
+
+def _equality_values(query: Dict[str, Any], field: str) -> Optional[List[Any]]:
+    # Only equality and $in predicates let mongos narrow the shards.
+    if field not in query:
+        return None
+    value = query[field]
+    if isinstance(value, dict):
+        if "$eq" in value:
+            return [value["$eq"]]
+        if "$in" in value:
+            return list(value["$in"])
+        return None
+    return [value]
+
+
+class QueryPlan:
+    __slots__ = ("kind", "fan_out", "shards")
+
+    def __init__(self, kind: str, fan_out: int, shards: Sequence[str] = ()) -> None:
+        self.kind = kind
+        self.fan_out = fan_out
+        self.shards = list(shards)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "fan_out": self.fan_out, "shards": self.shards}
+
+
+class ShardLayout:
+    """Shard key and chunk ownership of one collection, as mongos sees it.
+
+    ``plan`` predicts how many shards a filter reaches: equality (or ``$in``)
+    on the leading ranged field of the key picks the shards owning those
+    chunk ranges, equality on a hashed field reaches one shard per value, and
+    anything else is broadcast to every shard.
+    """
+
+    def __init__(self, key: ShardKey, chunks: List[Chunk]) -> None:
+        self.key = key
+        self.chunks = chunks
+        self.shards = sorted({shard for _, _, shard in chunks})
+        self._memo: Dict[Any, List[str]] = {}
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.key) and bool(self.shards)
+
+    @classmethod
+    async def load(cls, client: AsyncIOMotorClient, namespace: str) -> "ShardLayout":
+        config = client["config"]
+        meta = await config.collections.find_one({"_id": namespace})
+        if not meta or meta.get("dropped"):
+            return cls([], [])
+        # Chunks are keyed by collection UUID since 5.0, by namespace before.
+        chunk_filter = {"uuid": meta["uuid"]} if "uuid" in meta else {"ns": namespace}
+        chunks = [
+            (chunk["min"], chunk["max"], chunk["shard"])
+            async for chunk in config.chunks.find(chunk_filter, {"min": 1, "max": 1, "shard": 1})
+        ]
+        return cls(list(meta["key"].items()), chunks)
+
+    def shards_for_prefix(self, value: Any) -> List[str]:
+        shards = self._memo.get(value)
+        if shards is not None:
+            return shards
+        field = self.key[0][0]
+        owners: Set[str] = set()
+        for low, high, shard in self.chunks:
+            try:
+                # Inclusive at both ends: with a compound key one prefix value can span chunk boundaries.
+                if low[field] <= value <= high[field]:
+                    owners.add(shard)
+            except TypeError:
+                owners.add(shard)
+        shards = sorted(owners)
+        if len(self._memo) >= MAX_MEMO_ENTRIES:
+            self._memo.clear()
+        self._memo[value] = shards
+        return shards
+
+    def plan(self, query: Dict[str, Any]) -> QueryPlan:
+        if not self.sharded:
+            return QueryPlan("unsharded", 1)
+
+        total = len(self.shards)
+        values = [_equality_values(query, field) for field, _ in self.key]
+        first_field, first_kind = self.key[0]
+
+        if values[0] is None:
+            return QueryPlan("broadcast", total, self.shards)
+
+        if first_kind == HASHED:
+            # Which shard owns a hash is mongos' business; one value, one shard.
+            fan_out = min(len(values[0]), total)
+            shards: List[str] = []
+        else:
+            owners: Set[str] = set()
+            for value in values[0]:
+                owners.update(self.shards_for_prefix(value))
+            shards = sorted(owners)
+            fan_out = len(shards)
+            if all(v is not None and len(v) == 1 for v in values):
+                # Full shard key equality always lands on exactly one chunk.
+                fan_out = min(fan_out, 1)
+
+        if fan_out <= 1:
+            return QueryPlan("single", 1, shards)
+        return QueryPlan("targeted" if fan_out < total else "broadcast", fan_out, shards)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "sharded": self.sharded,
+            "key": {field: kind for field, kind in self.key},
+            "shards": self.shards,
+            "chunks": len(self.chunks),
+        }
+
+
+def shards_from_explain(result: Dict[str, Any]) -> List[str]:
+    # find() explained through mongos lists the shards under the winning plan,
+    # aggregate() explain lists them at the top level; unsharded has neither.
+    if isinstance(result.get("shards"), dict):
+        return sorted(result["shards"])
+    winning = result.get("queryPlanner", {}).get("winningPlan", {})
+    return sorted({shard.get("shardName", "") for shard in winning.get("shards", [])})
+
+
+class _EndpointStats:
+    __slots__ = ("plans", "fan_out_total", "explained", "explained_fan_out_total", "explained_fan_out_max", "last_explain")
+
+    def __init__(self) -> None:
+        self.plans: Dict[str, int] = {}
+        self.fan_out_total = 0
+        self.explained = 0
+        self.explained_fan_out_total = 0
+        self.explained_fan_out_max = 0
+        self.last_explain: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        planned = sum(self.plans.values())
+        return {
+            "plans": dict(self.plans),
+            "avg_fan_out": round(self.fan_out_total / planned, 3) if planned else None,
+            "explained": self.explained,
+            "explained_avg_fan_out": (
+                round(self.explained_fan_out_total / self.explained, 3) if self.explained else None
+            ),
+            "explained_max_fan_out": self.explained_fan_out_max,
+            "last_explain": self.last_explain,
+        }
+
+
+class QueryPlanner:
+    """Tracks the shard layout and the shard fan-out of every gateway query.
+
+    Each read is planned against the cached layout (cheap, no I/O). With
+    ``explain_sample_rate`` > 0 a sample of them is also explained in the
+    background, so the prediction can be checked against what mongos
+    actually does.
+    """
+
+    def __init__(self, namespace: str, refresh_seconds: float = 60.0, explain_sample_rate: float = 0.0) -> None:
+        self.namespace = namespace
+        self.refresh_seconds = refresh_seconds
+        self.explain_sample_rate = explain_sample_rate
+        self.layout = ShardLayout([], [])
+        self.stats: Dict[str, _EndpointStats] = {}
+        self.refreshed_at: Optional[float] = None
+        self._explaining: Set[asyncio.Task] = set()
+
+    async def refresh(self, client: AsyncIOMotorClient) -> ShardLayout:
+        self.layout = await ShardLayout.load(client, self.namespace)
+        self.refreshed_at = asyncio.get_running_loop().time()
+        return self.layout
+
+    async def run(self, client: AsyncIOMotorClient) -> None:
+        while True:
+            try:
+                await self.refresh(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.debug("Shard layout refresh failed: %s", exc)
+            await asyncio.sleep(self.refresh_seconds)
+
+    def _endpoint(self, endpoint: str) -> _EndpointStats:
+        stats = self.stats.get(endpoint)
+        if stats is None:
+            stats = self.stats[endpoint] = _EndpointStats()
+        return stats
+
+    def plan(self, endpoint: str, query: Dict[str, Any]) -> QueryPlan:
+        plan = self.layout.plan(query)
+        stats = self._endpoint(endpoint)
+        stats.plans[plan.kind] = stats.plans.get(plan.kind, 0) + 1
+        stats.fan_out_total += plan.fan_out
+        return plan
+
+    def observe(self, endpoint: str, collection: AsyncIOMotorCollection, query: Dict[str, Any]) -> QueryPlan:
+        plan = self.plan(endpoint, query)
+        if self.explain_sample_rate > 0 and random.random() < self.explain_sample_rate:
+            task = asyncio.create_task(self._explain_sample(endpoint, collection, query))
+            self._explaining.add(task)
+            task.add_done_callback(self._explaining.discard)
+        return plan
+
+    async def _explain_sample(self, endpoint: str, collection: AsyncIOMotorCollection, query: Dict[str, Any]) -> None:
+        try:
+            result = await self.explain(collection, query)
+        except Exception as exc:
+            logger.debug("Explain sample failed: %s", exc)
+            return
+        stats = self._endpoint(endpoint)
+        stats.explained += 1
+        stats.explained_fan_out_total += result["fan_out"]
+        stats.explained_fan_out_max = max(stats.explained_fan_out_max, result["fan_out"])
+        stats.last_explain = result
+
+    async def explain(self, collection: AsyncIOMotorCollection, query: Dict[str, Any]) -> Dict[str, Any]:
+        # Only shard key predicates decide routing, so a plain find() with the
+        # routing filter reaches the same shards as the real query.
+        result = await collection.database.command(
+            {"explain": {"find": collection.name, "filter": query}, "verbosity": "queryPlanner"}
+        )
+        shards = shards_from_explain(result)
+        winning = result.get("queryPlanner", {}).get("winningPlan", {})
+        return {"stage": winning.get("stage"), "shards": shards, "fan_out": max(len(shards), 1)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "layout": self.layout.as_dict(),
+            "explain_sample_rate": self.explain_sample_rate,
+            "endpoints": {endpoint: stats.as_dict() for endpoint, stats in self.stats.items()},
+        }
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight task.
+
+    The shared task is shielded, so a caller that disconnects does not cancel
+    the work the other waiters depend on.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.refreshes = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._start(key, fn)
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def spawn(self, key: str, fn: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._calls:
+            return False
+        self.refreshes += 1
+        self._start(key, fn)
+        return True
+
+    def _start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark failures as retrieved; every waiter already got the exception.
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "early_refreshes": self.refreshes,
+        }
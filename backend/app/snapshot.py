@@ -0,0 +1,227 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from .codec import dumps_json, loads_json
+from .products import Product, products_from_docs
+
+logger = logging.getLogger("speedscale.snapshot")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots", "degraded.snap")
+MAGIC = b"SSNAP\x00\x01\x00"
+# magic, index offset, index length
+HEADER = struct.Struct("<8sQQ")
+
+
+def write_snapshot(path: str, products: Sequence[Product], searches: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Writes products and search results to ``path``, replacing it atomically.
+
+    Layout: header, every product's JSON back to back, then a JSON index of
+    ``id -> [offset, length, category, lowercased name]`` and
+    ``query -> [ids]``. Only the index is parsed on open; product bodies are
+    read straight out of the mapping.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    index: Dict[str, Any] = {"built_at": time.time(), "products": {}, "search": searches}
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, 0, 0))
+            offset = HEADER.size
+            for product in products:
+                body = dumps_json(product)
+                f.write(body)
+                index["products"][product.id] = [offset, len(body), product.category, product.name.lower()]
+                offset += len(body)
+            raw_index = dumps_json(index)
+            f.write(raw_index)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, offset, len(raw_index)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return {"products": len(index["products"]), "queries": len(searches), "bytes": offset + len(raw_index)}
+
+
+class DegradedSnapshot:
+    """Read side of the offline snapshot, memory-mapped.
+
+    Serves real (if slightly stale) products, search results and similar
+    lists while Mongo is down. Pages come from the OS page cache, so
+    workers on one host share a single copy. ``reload`` picks up a file
+    rewritten by any worker.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+        self.built_at: Optional[float] = None
+        self._map: Optional[mmap.mmap] = None
+        self._products: Dict[str, List[Any]] = {}
+        self._search: Dict[str, List[str]] = {}
+        self._by_category: Dict[str, List[str]] = {}
+        self._stat: Optional[Tuple[int, int]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.builds = 0
+        self.last_build: Optional[Dict[str, Any]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._map is not None
+
+    def reload(self) -> bool:
+        """Maps the file again if it changed on disk; returns True if it did."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._stat:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_offset, index_length = HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                raise ValueError("not a snapshot file")
+            index = loads_json(mapped[index_offset : index_offset + index_length])
+        except (OSError, ValueError, struct.error) as exc:
+            logger.warning("Ignoring unreadable snapshot %s: %s", self.path, exc)
+            return False
+
+        by_category: Dict[str, List[str]] = {}
+        for product_id, entry in index["products"].items():
+            by_category.setdefault(entry[2], []).append(product_id)
+        # Swapped in one go; readers holding the old mapping keep valid bytes.
+        self._map, self._products, self._search = mapped, index["products"], index["search"]
+        self._by_category = by_category
+        self.built_at = index.get("built_at")
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        self.loads += 1
+        logger.info("Loaded degraded-mode snapshot: %s products, %s queries", len(self._products), len(self._search))
+        return True
+
+    def _body(self, product_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._products.get(product_id)
+        if entry is None or self._map is None:
+            return None
+        offset, length = entry[0], entry[1]
+        return loads_json(self._map[offset : offset + length])
+
+    def _bodies(self, product_ids: Iterable[str], limit: int) -> List[Dict[str, Any]]:
+        found: List[Dict[str, Any]] = []
+        for product_id in product_ids:
+            body = self._body(product_id)
+            if body is not None:
+                found.append(body)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def _count(self, found: bool) -> None:
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        body = self._body(product_id)
+        self._count(body is not None)
+        return body
+
+    def search(self, query: str, skip: int = 0, limit: int = 20, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recorded results for a snapshotted query, else a name match over the snapshot."""
+        term = " ".join(query.lower().split())
+        candidates: Iterable[str] = self._search.get(term, ())
+        if not candidates:
+            tokens = term.split()
+            candidates = [
+                product_id
+                for product_id, entry in self._products.items()
+                if all(token in entry[3] for token in tokens)
+            ]
+        if category:
+            candidates = [product_id for product_id in candidates if self._products.get(product_id, [0, 0, None])[2] == category]
+        found = self._bodies(list(candidates)[skip:], limit)
+        self._count(bool(found))
+        return found
+
+    def similar(self, product_id: str, neighbors: Sequence[str] = (), limit: int = 4) -> List[Dict[str, Any]]:
+        """Model neighbours that made it into the snapshot, else same-category products."""
+        found = self._bodies(neighbors, limit)
+        entry = self._products.get(product_id)
+        if len(found) < limit and entry is not None:
+            seen = {product_id, *(body["_id"] for body in found)}
+            found += self._bodies(
+                (other for other in self._by_category.get(entry[2], ()) if other not in seen), limit - len(found)
+            )
+        self._count(bool(found))
+        return found
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "ready": self.ready,
+            "built_at": self.built_at,
+            "age_seconds": round(time.time() - self.built_at, 1) if self.built_at else None,
+            "products": len(self._products),
+            "queries": len(self._search),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "builds": self.builds,
+            "last_build": self.last_build,
+        }
+
+
+async def collect_snapshot(
+    collection: AsyncIOMotorCollection,
+    search_backend: Any,
+    hot_queries: Sequence[str],
+    hot_ids: Sequence[str],
+    max_products: int,
+    page_size: int,
+) -> Tuple[List[Product], Dict[str, List[str]]]:
+    """Reads the hottest queries' first pages and products, topped up from the catalog."""
+    docs: Dict[Any, Dict[str, Any]] = {}
+    searches: Dict[str, List[str]] = {}
+    for query in hot_queries:
+        results, _ = await search_backend.search(collection, query, skip=0, limit=page_size)
+        searches[query] = [str(doc["_id"]) for doc in results]
+        for doc in results:
+            docs.setdefault(doc["_id"], doc)
+
+    oids = []
+    for product_id in hot_ids:
+        try:
+            oids.append(ObjectId(product_id))
+        except InvalidId:
+            continue
+    wanted = [oid for oid in oids if oid not in docs][: max(max_products - len(docs), 0)]
+    if wanted:
+        async for doc in collection.find({"_id": {"$in": wanted}}):
+            docs.setdefault(doc["_id"], doc)
+    if len(docs) < max_products:
+        # Cold start: no traffic yet, so any real products beat none.
+        async for doc in collection.find({}).limit(max_products):
+            if len(docs) >= max_products:
+                break
+            docs.setdefault(doc["_id"], doc)
+
+    return products_from_docs(list(docs.values())[:max_products]), searches
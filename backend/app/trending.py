@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+
+logger = logging.getLogger("speedscale.trending")
+
+
+class TrendRecorder:
+    """Time-decayed search popularity shared by every worker.
+
+    Requests only bump an in-process counter; a background task flushes the
+    buffer as one pipelined batch of ZINCRBYs into a Redis sorted set, so
+    counts from all workers merge on the server.
+
+    Decay uses a forward-decay landmark: a query at time ``t`` adds
+    ``2 ** ((t - landmark) / half_life)``, so older hits weigh relatively less
+    without ever rewriting existing scores. Every ``landmark_half_lives``
+    half-lives the set is carried into a new landmark key, scaled down once.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Awaitable[Optional[Redis]]],
+        key: str = "trending:searches",
+        half_life_seconds: float = 3600.0,
+        flush_seconds: float = 1.0,
+        max_buffer: int = 5000,
+        max_terms: int = 10000,
+        landmark_half_lives: int = 16,
+        top_cache_seconds: float = 2.0,
+    ) -> None:
+        self.get_client = get_client
+        self.key = key
+        self.half_life = max(half_life_seconds, 1.0)
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self.max_terms = max_terms
+        self.landmark_period = int(self.half_life * landmark_half_lives)
+        self.top_cache_seconds = top_cache_seconds
+        self._buffer: Dict[str, float] = {}
+        self._buffer_landmark = self.landmark()
+        self._buffer_full = asyncio.Event()
+        self._top: Optional[Tuple[float, int, List[Tuple[str, float]]]] = None
+        self._carried_landmark: Optional[int] = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    def landmark(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return int(now // self.landmark_period * self.landmark_period)
+
+    def zset_key(self, landmark: int) -> str:
+        return f"{self.key}:{landmark}"
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())[:100]
+
+    def _rebase(self, landmark: int) -> None:
+        # Buffered weights are relative to the landmark they were recorded under.
+        if landmark != self._buffer_landmark:
+            scale = 2 ** (-(landmark - self._buffer_landmark) / self.half_life)
+            self._buffer = {term: score * scale for term, score in self._buffer.items()}
+            self._buffer_landmark = landmark
+
+    def record(self, query: str, now: Optional[float] = None) -> None:
+        term = self.normalize(query)
+        if not term:
+            return
+        now = time.time() if now is None else now
+        landmark = self.landmark(now)
+        self._rebase(landmark)
+        weight = 2 ** ((now - landmark) / self.half_life)
+        if term not in self._buffer and len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            self._buffer_full.set()
+            return
+        self._buffer[term] = self._buffer.get(term, 0.0) + weight
+        self.recorded += 1
+
+    async def flush(self) -> int:
+        if not self._buffer:
+            return 0
+        client = await self.get_client()
+        if client is None:
+            return 0
+
+        landmark = self.landmark()
+        self._rebase(landmark)
+        batch, self._buffer = self._buffer, {}
+        key = self.zset_key(landmark)
+        ttl = int(self.landmark_period * 2)
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                if self._carried_landmark != landmark:
+                    # First flush in this landmark: carry the previous set over, scaled to the new base.
+                    # Re-running it from several workers is harmless, the union replays the same scaling.
+                    previous = self.zset_key(landmark - self.landmark_period)
+                    scale = 2 ** (-self.landmark_period / self.half_life)
+                    pipe.zunionstore(key, {key: 1.0, previous: scale}, aggregate="MAX")
+                for term, score in batch.items():
+                    pipe.zincrby(key, score, term)
+                pipe.zremrangebyrank(key, 0, -(self.max_terms + 1))
+                pipe.expire(key, ttl)
+                await pipe.execute()
+            self._carried_landmark = landmark
+            self.flushes += 1
+            return len(batch)
+        except Exception as exc:
+            self.flush_errors += 1
+            logger.debug("Trend flush failed: %s", exc)
+            # Keep the counts for the next attempt, within the buffer bound.
+            for term, score in batch.items():
+                if term in self._buffer or len(self._buffer) < self.max_buffer:
+                    self._buffer[term] = self._buffer.get(term, 0.0) + score
+            return 0
+
+    async def run(self) -> None:
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._buffer_full.wait(), timeout=self.flush_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._buffer_full.clear()
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    async def top(self, limit: int = 10) -> List[Tuple[str, float]]:
+        cached = self._top
+        if cached is not None and cached[0] > time.monotonic() and cached[1] >= limit:
+            return cached[2][:limit]
+
+        client = await self.get_client()
+        if client is None:
+            return []
+        landmark = self.landmark()
+        rows = await client.zrevrange(self.zset_key(landmark), 0, limit - 1, withscores=True)
+        if not rows:
+            # Nothing flushed since the landmark rolled over yet.
+            landmark -= self.landmark_period
+            rows = await client.zrevrange(self.zset_key(landmark), 0, limit - 1, withscores=True)
+        # Report scores as decayed hit counts as of now.
+        scale = 2 ** (-(time.time() - landmark) / self.half_life)
+        top = [
+            (term.decode() if isinstance(term, bytes) else term, round(score * scale, 3))
+            for term, score in rows
+            if math.isfinite(score)
+        ]
+        self._top = (time.monotonic() + self.top_cache_seconds, limit, top)
+        return top
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "buffered_terms": len(self._buffer),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "half_life_seconds": self.half_life,
+        }
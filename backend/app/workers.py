@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from redis.asyncio import Redis
+
+from .codec import dumps_json, loads_json
+
+logger = logging.getLogger("speedscale.workers")
+
+# Only the owner may extend or drop a lease; a worker that stalled past its
+# TTL must not delete the lock another worker has since taken.
+RENEW_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+  return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+  return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def process_age_seconds() -> Optional[float]:
+    """Seconds since this process started (or was forked), so imports count too."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22.
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """Duration of each startup phase of one worker process.
+
+    Each ``mark`` closes the phase that began at the previous mark. In a
+    pre-forked worker the parent's phases (imports, model load) are kept as
+    ``preloaded`` and the worker's own clock restarts at the fork.
+    """
+
+    def __init__(self, mode: str = "single") -> None:
+        self.mode = mode
+        self.started = time.perf_counter() - (process_age_seconds() or 0.0)
+        self.last = self.started
+        self.phases: Dict[str, float] = {}
+        self.preloaded: Dict[str, float] = {}
+        self.ready_seconds: Optional[float] = None
+
+    def mark(self, phase: str) -> float:
+        now = time.perf_counter()
+        elapsed = self.phases[phase] = round(now - self.last, 4)
+        self.last = now
+        return elapsed
+
+    def ready(self) -> float:
+        self.mark("lifespan")
+        self.ready_seconds = round(self.last - self.started, 4)
+        return self.ready_seconds
+
+    def forked(self) -> None:
+        self.mode = "prefork"
+        self.preloaded = dict(self.phases)
+        self.phases = {}
+        self.ready_seconds = None
+        self.started = self.last = time.perf_counter()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "ready_seconds": self.ready_seconds,
+            "phases": dict(self.phases),
+            "preloaded": dict(self.preloaded),
+        }
+
+
+class RedisLock:
+    """A lease on ``key`` shared by every worker through Redis.
+
+    The holder renews the lease while it works, so a crashed holder frees
+    the lock within ``ttl_seconds``.
+    """
+
+    def __init__(self, client: Redis, key: str, owner: str, ttl_seconds: float = 30.0) -> None:
+        self.client = client
+        self.key = key
+        self.owner = owner
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    async def acquire(self) -> bool:
+        return bool(await self.client.set(self.key, self.owner, nx=True, px=self.ttl_ms))
+
+    async def renew(self) -> bool:
+        return bool(await self.client.eval(RENEW_LUA, 1, self.key, self.owner, self.ttl_ms))
+
+    async def release(self) -> bool:
+        return bool(await self.client.eval(RELEASE_LUA, 1, self.key, self.owner))
+
+    async def owner_of(self) -> Optional[str]:
+        owner = await self.client.get(self.key)
+        return owner.decode() if isinstance(owner, bytes) else owner
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_ms / 3000)
+            try:
+                if not await self.renew():
+                    logger.warning("Lost lock %s", self.key)
+                    return
+            except Exception as exc:
+                logger.debug("Lock renewal failed for %s: %s", self.key, exc)
+
+    @asynccontextmanager
+    async def held(self) -> AsyncIterator[None]:
+        """Renews the (already acquired) lease in the background and releases it on exit."""
+        renewer = asyncio.ensure_future(self._keep_alive())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            try:
+                await renewer
+            except asyncio.CancelledError:
+                pass
+            try:
+                await self.release()
+            except Exception as exc:
+                logger.debug("Lock release failed for %s: %s", self.key, exc)
+
+
+class WorkerRegistry:
+    """Every worker's health, heartbeated into one Redis hash.
+
+    Any worker can then report the whole deployment. Entries older than three
+    heartbeats belong to dead workers and are dropped on read.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Awaitable[Optional[Redis]]],
+        key: str,
+        worker_id: str,
+        collect: Callable[[], Dict[str, Any]],
+        interval_seconds: float = 5.0,
+    ) -> None:
+        self.get_client = get_client
+        self.key = key
+        self.worker_id = worker_id
+        self.collect = collect
+        self.interval_seconds = interval_seconds
+        self.published = 0
+        self.failures = 0
+
+    async def publish(self) -> bool:
+        client = await self.get_client()
+        if client is None:
+            return False
+        try:
+            await client.hset(self.key, self.worker_id, dumps_json({"seen": time.time(), **self.collect()}))
+        except Exception as exc:
+            self.failures += 1
+            logger.debug("Worker heartbeat failed: %s", exc)
+            return False
+        self.published += 1
+        return True
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self.publish()
+                await asyncio.sleep(self.interval_seconds)
+        finally:
+            # Clean shutdown: leave the hash right away instead of aging out.
+            client = await self.get_client()
+            if client is not None:
+                try:
+                    await client.hdel(self.key, self.worker_id)
+                except Exception:
+                    pass
+
+    async def read(self) -> Dict[str, Dict[str, Any]]:
+        client = await self.get_client()
+        if client is None:
+            return {}
+        try:
+            entries = await client.hgetall(self.key)
+        except Exception as exc:
+            logger.debug("Worker registry read failed: %s", exc)
+            return {}
+
+        cutoff = time.time() - self.interval_seconds * 3
+        workers: Dict[str, Dict[str, Any]] = {}
+        stale = []
+        for worker, raw in entries.items():
+            worker = worker.decode() if isinstance(worker, bytes) else worker
+            try:
+                state = loads_json(raw)
+            except ValueError:
+                stale.append(worker)
+                continue
+            if state.get("seen", 0) < cutoff:
+                stale.append(worker)
+            else:
+                workers[worker] = state
+        if stale:
+            try:
+                await client.hdel(self.key, *stale)
+            except Exception:
+                pass
+        return dict(sorted(workers.items()))
+
+    async def snapshot(self) -> Dict[str, Any]:
+        workers = await self.read()
+        return {
+            "workers": len(workers),
+            "mongo_up": sum(1 for state in workers.values() if state.get("mongo")),
+            "redis_up": sum(1 for state in workers.values() if state.get("redis")),
+            "seeded": any(state.get("seed_completed") for state in workers.values()),
+            "by_worker": workers,
+        }
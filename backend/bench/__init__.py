@@ -0,0 +1,11 @@
+"""Load benchmark for the gateway's read endpoints.
+
+Drives /api/search, /api/products/{id} and /api/products/{id}/similar with a
+Zipf-distributed key mix against in-process Mongo/Redis stand-ins (mongomock
+and fakeredis with injected latency), and records RPS, latency percentiles
+and cache hit ratio as JSON so runs can be compared::
+
+    python -m backend.bench run --concurrency 64 --output base.json
+    python -m backend.bench run --concurrency 64 --output new.json
+    python -m backend.bench compare base.json new.json --threshold 0.1
+"""
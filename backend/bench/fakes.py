@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Optional
+
+import fakeredis
+from fakeredis.aioredis import FakeAsyncRedisConnection
+
+CURSOR_CHAIN = {"sort", "skip", "limit", "batch_size", "hint", "max_time_ms"}
+
+
+def latency_redis(latency: float, server: Optional[fakeredis.FakeServer] = None) -> fakeredis.FakeAsyncRedis:
+    """fakeredis client that pays ``latency`` seconds per round trip.
+
+    The delay is added where a real client writes to the socket, so a
+    pipeline costs one round trip no matter how many commands it carries.
+    """
+
+    class LatencyConnection(FakeAsyncRedisConnection):
+        async def send_packed_command(self, command: Any, check_health: bool = True) -> None:
+            if latency > 0:
+                await asyncio.sleep(latency)
+            await super().send_packed_command(command, check_health)
+
+    return fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer(), connection_class=LatencyConnection)
+
+
+class LatencyCursor:
+    def __init__(self, cursor: Any, latency: float) -> None:
+        self._cursor = cursor
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._cursor, name)
+        if name in CURSOR_CHAIN:
+            return lambda *args, **kwargs: LatencyCursor(attr(*args, **kwargs), self._latency)
+        return attr
+
+    async def to_list(self, length: Optional[int] = None) -> Any:
+        await asyncio.sleep(self._latency)
+        return await self._cursor.to_list(length=length)
+
+    async def __aiter__(self):
+        # One round trip per batch would be more faithful; one per scan is close enough here.
+        await asyncio.sleep(self._latency)
+        async for doc in self._cursor:
+            yield doc
+
+
+class LatencyCollection:
+    """Wraps a mongomock-motor collection so every query pays ``latency``.
+
+    Coroutine methods sleep once before running; ``find``/``aggregate``
+    return cursors that sleep when fetched. Everything else passes through.
+    """
+
+    def __init__(self, collection: Any, latency: float) -> None:
+        self._collection = collection
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._collection, name)
+        if name in {"find", "aggregate"}:
+            return lambda *args, **kwargs: LatencyCursor(attr(*args, **kwargs), self._latency)
+        if not callable(attr) or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def delayed(*args: Any, **kwargs: Any) -> Any:
+            await asyncio.sleep(self._latency)
+            return await attr(*args, **kwargs)
+
+        return delayed
+
+    def with_options(self, **kwargs: Any) -> "LatencyCollection":
+        return self
@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import accumulate
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RESULT_VERSION = 1
+ENDPOINTS = ("search", "product", "similar")
+# Metrics compared by `compare`; True means higher is better.
+COMPARED = {"rps": True, "p50_ms": False, "p99_ms": False, "cache_hit_ratio": True}
+
+Request = Tuple[str, str, str]  # endpoint, path, query string
+Fetch = Callable[[str, str], Awaitable[Tuple[int, bytes]]]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        endpoint, _, weight = part.partition("=")
+        endpoint = endpoint.strip()
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {endpoint!r} in mix")
+        mix[endpoint] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix needs at least one positive weight")
+    return mix
+
+
+class ZipfKeys:
+    """Draws keys with P(rank k) proportional to 1 / k**s (rank 1 = hottest)."""
+
+    def __init__(self, keys: Sequence[Any], s: float, rng: random.Random) -> None:
+        self.keys = list(keys)
+        self.rng = rng
+        self.cum_weights = list(accumulate(1.0 / (rank ** s) for rank in range(1, len(self.keys) + 1)))
+
+    def sample(self, k: int) -> List[Any]:
+        return self.rng.choices(self.keys, cum_weights=self.cum_weights, k=k)
+
+
+def build_workload(
+    product_ids: Sequence[str], terms: Sequence[str], mix: Dict[str, float], total: int, zipf_s: float, seed: int
+) -> List[Request]:
+    rng = random.Random(seed)
+    # Popularity rank is independent of insertion order.
+    ids = list(product_ids)
+    rng.shuffle(ids)
+    id_keys = ZipfKeys(ids, zipf_s, rng)
+    term_keys = ZipfKeys(terms, zipf_s, rng)
+    endpoints = rng.choices(list(mix), weights=list(mix.values()), k=total)
+    keys = id_keys.sample(total)
+    queries = term_keys.sample(total)
+
+    workload: List[Request] = []
+    for endpoint, product_id, term in zip(endpoints, keys, queries):
+        if endpoint == "search":
+            workload.append((endpoint, "/api/search", f"query={term}"))
+        elif endpoint == "product":
+            workload.append((endpoint, f"/api/products/{product_id}", ""))
+        else:
+            workload.append((endpoint, f"/api/products/{product_id}/similar", ""))
+    return workload
+
+
+def asgi_fetcher(app: Any) -> Fetch:
+    # Calls the ASGI app directly: no sockets or HTTP client in the measured path.
+    async def fetch(path: str, query_string: str) -> Tuple[int, bytes]:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        status = 0
+        chunks: List[bytes] = []
+
+        async def receive() -> Dict[str, Any]:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await app(scope, receive, send)
+        return status, b"".join(chunks)
+
+    return fetch
+
+
+def http_fetcher(base_url: str, concurrency: int) -> Tuple[Fetch, Callable[[], Awaitable[None]]]:
+    import httpx
+
+    client = httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=concurrency), timeout=30)
+
+    async def fetch(path: str, query_string: str) -> Tuple[int, bytes]:
+        response = await client.get(f"{path}?{query_string}" if query_string else path)
+        return response.status_code, response.content
+
+    return fetch, client.aclose
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.cached = 0
+        self.sources: Dict[str, int] = {}
+
+    def record(self, elapsed: float, status: int, body: bytes) -> None:
+        self.latencies.append(elapsed)
+        if status >= 500 or status == 429:
+            self.errors += 1
+            return
+        head = body[:160]
+        if b'"cached":true' in head:
+            self.cached += 1
+        start = head.find(b'"source":"')
+        if start >= 0:
+            end = head.find(b'"', start + 10)
+            # Strip emoji/suffixes: "MONGODB_DISK 🐢 (Python)" -> "MONGODB_DISK".
+            source = head[start + 10 : end].decode(errors="ignore").split(" ")[0]
+            self.sources[source] = self.sources.get(source, 0) + 1
+
+    def summary(self, seconds: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        if not count:
+            return {"requests": 0}
+        millis = np.asarray(self.latencies) * 1000
+        p50, p90, p99 = np.percentile(millis, [50, 90, 99])
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "rps": round(count / seconds, 1),
+            "mean_ms": round(float(millis.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(millis.max()), 3),
+            "cache_hit_ratio": round(self.cached / max(count - self.errors, 1), 4),
+            "sources": dict(sorted(self.sources.items())),
+        }
+
+
+async def drive(fetch: Fetch, workload: List[Request], concurrency: int) -> Tuple[Dict[str, EndpointStats], float]:
+    stats = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+    position = 0
+
+    async def worker() -> None:
+        nonlocal position
+        while position < len(workload):
+            endpoint, path, query_string = workload[position]
+            position += 1
+            started = time.perf_counter()
+            try:
+                status, body = await fetch(path, query_string)
+            except Exception:
+                status, body = 599, b""
+            stats[endpoint].record(time.perf_counter() - started, status, body)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.perf_counter() - started
+
+
+def summarize(stats: Dict[str, EndpointStats], seconds: float) -> Dict[str, Any]:
+    overall = EndpointStats()
+    for endpoint_stats in stats.values():
+        overall.latencies.extend(endpoint_stats.latencies)
+        overall.errors += endpoint_stats.errors
+        overall.cached += endpoint_stats.cached
+        for source, count in endpoint_stats.sources.items():
+            overall.sources[source] = overall.sources.get(source, 0) + count
+    return {
+        "seconds": round(seconds, 3),
+        "overall": overall.summary(seconds),
+        "endpoints": {endpoint: s.summary(seconds) for endpoint, s in stats.items() if s.latencies},
+    }
+
+
+def train_bench_model(docs: List[Dict[str, Any]], mode: str, directory: str) -> Any:
+    import mongomock
+
+    from ..app.ml.recommender import ProductRecommender
+    from ..app.ml.train import train
+
+    collection = mongomock.MongoClient().bench.products
+    collection.insert_many([dict(doc) for doc in docs])
+    # "precomputed" stores neighbour lists; "live" answers every miss through the batched executor.
+    train(collection, output=directory, workers=1, batch_size=5000, neighbors_k=4 if mode == "precomputed" else 0)
+    return ProductRecommender(artifacts_path=directory)
+
+
+async def setup_gateway(args: argparse.Namespace, workdir: str):
+    """Points the gateway's globals at in-process Mongo/Redis stand-ins."""
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+
+    from ..app import main as gateway
+    from ..app.bulk_load import generate_products
+    from ..app.ratelimit import parse_rate_limits
+    from ..app.search import build_search_backend
+    from .fakes import LatencyCollection, latency_redis
+
+    docs = generate_products(args.products, seed=args.seed)
+    for doc in docs:
+        doc["_id"] = ObjectId()
+    raw = AsyncMongoMockClient()[gateway.MONGO_DB][gateway.MONGO_COLLECTION]
+    await raw.insert_many([dict(doc) for doc in docs])
+
+    redis_server = __import__("fakeredis").FakeServer()
+    gateway.build_redis_client = lambda: latency_redis(args.redis_latency_ms / 1000, redis_server)
+    gateway.redis_client = None
+    gateway.mongo_client = None
+    gateway.mongo_collection = LatencyCollection(raw, args.mongo_latency_ms / 1000)
+    gateway.mongo_reads.clear()
+    gateway.db_status.update(mongo=True, redis=True)
+    # The benchmark is one client; per-client limits would only measure 429s.
+    gateway.rate_limits.rules = parse_rate_limits("default=1000000000/1")
+    gateway.l1_cache.clear()
+    if args.no_l1:
+        gateway.l1_cache.max_entries = 0
+    gateway.search_backend = build_search_backend(args.search_backend)
+    await gateway.search_backend.prepare(gateway.mongo_collection)
+    if args.ml != "none":
+        gateway.ml_models.current = await asyncio.to_thread(train_bench_model, docs, args.ml, workdir)
+    gateway.ml_executor.start()
+
+    terms = sorted({word.lower().strip(".,") for doc in docs for word in doc["name"].split() if len(word) > 3})
+    return gateway, [str(doc["_id"]) for doc in docs], terms
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    config = {key: value for key, value in vars(args).items() if key not in {"command", "output", "func"}}
+    cleanup: Optional[Callable[[], Awaitable[None]]] = None
+
+    with tempfile.TemporaryDirectory(prefix="speedscale-bench-") as workdir:
+        gateway = None
+        if args.url:
+            fetch, cleanup = http_fetcher(args.url, args.concurrency)
+            product_ids, terms = await discover_live_keys(fetch, args.products)
+        else:
+            gateway, product_ids, terms = await setup_gateway(args, workdir)
+            fetch = asgi_fetcher(gateway.app)
+
+        try:
+            if args.warmup:
+                warmup = build_workload(product_ids, terms, mix, args.warmup, args.zipf, args.seed + 1)
+                await drive(fetch, warmup, args.concurrency)
+            workload = build_workload(product_ids, terms, mix, args.requests, args.zipf, args.seed)
+            stats, seconds = await drive(fetch, workload, args.concurrency)
+        finally:
+            if gateway is not None:
+                await gateway.ml_executor.stop()
+                await gateway.reset_redis_client()
+            if cleanup is not None:
+                await cleanup()
+
+    return {
+        "version": RESULT_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "config": config,
+        "results": summarize(stats, seconds),
+    }
+
+
+async def discover_live_keys(fetch: Fetch, limit: int) -> Tuple[List[str], List[str]]:
+    # Against a live gateway, take ids and terms from a few broad searches.
+    ids: Dict[str, None] = {}
+    terms: Dict[str, None] = {}
+    for query in ("a", "e", "o", "pro", "smart"):
+        status, body = await fetch("/api/search", f"query={query}&limit=100")
+        if status != 200:
+            continue
+        for item in json.loads(body).get("data", []):
+            ids[item["_id"]] = None
+            for word in item.get("name", "").split():
+                if len(word) > 3:
+                    terms[word.lower().strip(".,")] = None
+    if not ids:
+        raise SystemExit("No products found on the target gateway")
+    return list(ids)[:limit], list(terms) or ["laptop"]
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> Tuple[List[str], List[str]]:
+    """Returns report lines and the regressions worse than ``threshold`` (a fraction)."""
+    lines = [f"{'scope':<10} {'metric':<16} {'baseline':>12} {'candidate':>12} {'change':>9}"]
+    regressions: List[str] = []
+    scopes = {"overall": (baseline["results"]["overall"], candidate["results"]["overall"])}
+    for endpoint in ENDPOINTS:
+        before = baseline["results"]["endpoints"].get(endpoint)
+        after = candidate["results"]["endpoints"].get(endpoint)
+        if before and after:
+            scopes[endpoint] = (before, after)
+
+    for scope, (before, after) in scopes.items():
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{scope} {metric}: {old} -> {new}")
+            lines.append(f"{scope:<10} {metric:<16} {old:>12} {new:>12} {change:>+8.1%}{flag}")
+    return lines, regressions
+
+
+def print_summary(result: Dict[str, Any]) -> None:
+    results = result["results"]
+    print(f"{'endpoint':<10} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'hit %':>7} {'errors':>7}")
+    for name, row in [("overall", results["overall"]), *results["endpoints"].items()]:
+        print(
+            f"{name:<10} {row['requests']:>9} {row['rps']:>9} {row['p50_ms']:>9} {row['p90_ms']:>9} "
+            f"{row['p99_ms']:>9} {row['cache_hit_ratio'] * 100:>6.1f}% {row['errors']:>7}"
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.bench", description="Benchmark the gateway read endpoints.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="drive the gateway and record a result file")
+    run_parser.add_argument("--requests", type=int, default=20000)
+    run_parser.add_argument("--warmup", type=int, default=2000, help="requests sent before measuring")
+    run_parser.add_argument("--concurrency", type=int, default=64)
+    run_parser.add_argument("--mix", default="search=0.3,product=0.5,similar=0.2")
+    run_parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the key popularity")
+    run_parser.add_argument("--products", type=int, default=1000)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    run_parser.add_argument("--redis-latency-ms", type=float, default=0.3)
+    run_parser.add_argument("--search-backend", default="regex", choices=["regex", "inverted"])
+    run_parser.add_argument("--ml", default="precomputed", choices=["precomputed", "live", "none"])
+    run_parser.add_argument("--no-l1", action="store_true", help="disable the in-process L1 cache")
+    run_parser.add_argument("--url", help="benchmark a running gateway instead of the in-process one")
+    run_parser.add_argument("--output", help="write the result JSON here")
+
+    compare_parser = commands.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        lines, regressions = compare(baseline, candidate, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+        return 0
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    result = asyncio.run(run(args))
+    print_summary(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved {args.output}")
+    return 0
@@ -0,0 +1,55 @@
+import numpy as np
+
+from backend.app.ml.ann import IVFIndex
+from backend.app.ml.benchmark_ann import brute_force, synthetic_matrix
+from backend.app.ml.neighbors import block_rows, build_neighbor_table
+
+
+def test_ivf_recall_against_brute_force() -> None:
+    matrix = synthetic_matrix(rows=3000, dims=800, seed=7)
+    index = IVFIndex(n_components=128, n_probe=16, rerank=100).fit(matrix)
+
+    hits = 0
+    queries = range(0, 3000, 60)
+    for row in queries:
+        expected = set(brute_force(matrix, matrix[row], 5).tolist())
+        distances, found = index.kneighbors(matrix[row], n_neighbors=5)
+        hits += len(expected & set(found[0].tolist()))
+        assert np.all(np.diff(distances[0]) >= -1e-6)
+
+    assert hits / (len(queries) * 5) >= 0.8
+
+
+def test_ivf_returns_itself_first_with_exact_distance() -> None:
+    matrix = synthetic_matrix(rows=500, dims=300, seed=3)
+    index = IVFIndex(n_components=16, n_probe=4).fit(matrix)
+    distances, found = index.kneighbors(matrix[[10, 20]], n_neighbors=3)
+    assert found[:, 0].tolist() == [10, 20]
+    assert np.allclose(distances[:, 0], 0.0, atol=1e-5)
+
+
+def test_neighbor_table_excludes_self_and_matches_brute_force() -> None:
+    matrix = synthetic_matrix(rows=400, dims=300, seed=5)
+    table = build_neighbor_table(matrix, k=4, batch_size=64)
+    assert table.shape == (400, 4)
+    for row in (0, 123, 399):
+        assert row not in table[row]
+        expected = brute_force(matrix, matrix[row], 5).tolist()
+        assert table[row].tolist() == [idx for idx in expected if idx != row][:4]
+
+
+def test_exact_block_shrinks_with_catalog_size() -> None:
+    budget = 256 * 1024 * 1024
+    sizes = [block_rows(rows, 1024, budget) for rows in (1_000, 100_000, 1_000_000, 3_000_000, 10**9)]
+    assert sizes[0] == 1024
+    assert sizes == sorted(sizes, reverse=True) and sizes[1] > sizes[3]
+    assert sizes[-1] == 1
+    # A block's dense scores stay inside the budget.
+    assert sizes[3] * 3_000_000 * 16 <= budget
+
+    # Small budgets still produce the same table, just in more blocks.
+    matrix = synthetic_matrix(rows=300, dims=200, seed=9)
+    assert np.array_equal(
+        build_neighbor_table(matrix, k=3, memory_budget_bytes=300 * 16 * 7),
+        build_neighbor_table(matrix, k=3),
+    )
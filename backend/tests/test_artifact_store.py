@@ -0,0 +1,101 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend.app.ml.artifact_store import (
+    ArtifactError,
+    RecommenderArtifacts,
+    encode_product_ids,
+    load_artifacts,
+    save_artifacts,
+)
+from backend.app.ml.recommender import ProductRecommender
+
+TEXTS = [
+    "wireless gaming laptop with rgb keyboard",
+    "ergonomic office chair with lumbar support",
+    "gaming mouse with wireless receiver",
+    "standing desk for the home office",
+]
+IDS = ["65a000000000000000000003", "65a000000000000000000001", "65a000000000000000000004", "65a000000000000000000002"]
+
+
+def build(tmp_path) -> TfidfVectorizer:
+    vectorizer = TfidfVectorizer(stop_words="english")
+    matrix = vectorizer.fit_transform(TEXTS)
+    artifacts = RecommenderArtifacts(
+        vocabulary=vectorizer.get_feature_names_out().tolist(),
+        idf=vectorizer.idf_,
+        matrix=matrix,
+        product_ids=encode_product_ids(IDS),
+        neighbors=np.array([[2, 1], [3, 0], [0, 1], [1, 0]]),
+    )
+    save_artifacts(str(tmp_path), artifacts)
+    return vectorizer
+
+
+def test_round_trip_is_memory_mapped_and_vectorizes_identically(tmp_path) -> None:
+    original = build(tmp_path)
+    loaded = load_artifacts(str(tmp_path))
+
+    assert isinstance(np.load(tmp_path / loaded.manifest["files"]["matrix_data"], mmap_mode="r"), np.memmap)
+    assert not loaded.matrix.data.flags.writeable
+    rebuilt = loaded.build_vectorizer()
+    query = ["wireless office keyboard"]
+    assert np.allclose(original.transform(query).toarray(), rebuilt.transform(query).toarray())
+
+
+def test_recommender_lookups(tmp_path) -> None:
+    build(tmp_path)
+    recommender = ProductRecommender(lazy=True, artifacts_path=str(tmp_path))
+    assert not recommender.ready
+    assert recommender.find_similar_products("gaming") == []
+
+    recommender.load_in_background().join(5)
+    assert recommender.ready
+    assert recommender.row_for(IDS[2]) == 2
+    assert recommender.row_for("65a0000000000000000000ff") is None
+    assert recommender.precomputed_neighbors(IDS[0], limit=1) == [IDS[2]]
+    assert recommender.find_similar_products("wireless gaming mouse", limit=1)[0] == IDS[2]
+
+
+def test_new_build_replaces_old_and_rejects_unknown_versions(tmp_path) -> None:
+    build(tmp_path)
+    first = json.loads((tmp_path / "manifest.json").read_text())["build_id"]
+    build(tmp_path)
+    build(tmp_path)
+    remaining = {path.name.split(".")[1] for path in tmp_path.glob("matrix_data.*.npy")}
+    assert first not in remaining and len(remaining) == 2
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["version"] = 99
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ArtifactError):
+        load_artifacts(str(tmp_path))
+
+
+def test_extended_recommender_covers_new_products_without_touching_base(tmp_path) -> None:
+    build(tmp_path)
+    base = ProductRecommender(artifacts_path=str(tmp_path))
+    new_id = "65a000000000000000000009"
+    extended = base.extended([new_id], ["compact wireless gaming keyboard"])
+
+    assert base.row_for(new_id) is None
+    assert extended.row_for(new_id) == len(IDS)
+    assert extended.latest_product_id() == new_id
+    assert extended.version == f"{base.build_id}+1"
+    assert extended.precomputed_neighbors(new_id) is None
+    assert extended.precomputed_neighbors(IDS[0], limit=1) == [IDS[2]]
+    assert new_id in extended.find_similar_products("wireless gaming keyboard", limit=2)
+    # The base rows stay shared (memory-mapped); only the delta is new.
+    assert extended.matrix is base.matrix and extended.index is base.index
+    assert extended.size == len(IDS) + 1 and extended.delta_matrix.shape[0] == 1
+
+    newer_id = "65a00000000000000000000a"
+    newer = extended.extended([newer_id], ["ergonomic office chair"])
+    assert newer.matrix is base.matrix and newer.delta_matrix.shape[0] == 2
+    assert newer.row_for(new_id) == len(IDS) and newer.row_for(newer_id) == len(IDS) + 1
+    assert newer.latest_product_id() == newer_id and newer.version == f"{base.build_id}+2"
+    assert newer.find_similar_products("ergonomic office chair", limit=1)[0] == newer_id
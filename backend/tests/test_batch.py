@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+
+def test_batch_endpoints_share_cache_with_single_lookups(monkeypatch) -> None:
+    pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    httpx = pytest.importorskip("httpx")
+    from mongomock_motor import AsyncMongoMockClient
+
+    from backend.app import main as gateway
+
+    collection = AsyncMongoMockClient()["speedscale"]["products"]
+    monkeypatch.setattr(gateway, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(gateway, "mongo_collection", collection)
+    monkeypatch.setattr(gateway, "mongo_reads", {})
+    monkeypatch.setitem(gateway.db_status, "mongo", True)
+    gateway.l1_cache.clear()
+
+    async def scenario() -> None:
+        result = await collection.insert_many(
+            [{"name": f"Desk {i}", "category": "Office", "price": 10 + i} for i in range(6)]
+        )
+        ids = [str(oid) for oid in result.inserted_ids]
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert (await client.get(f"/api/products/{ids[0]}")).json()["cached"] is False
+
+            response = await client.post("/api/products:batch", json={"ids": [*ids[:3], "nope", ids[1]]})
+            body = response.json()
+            assert response.status_code == 200
+            assert [product["_id"] for product in body["data"]] == ids[:3]
+            assert body["missing"] == ["nope"] and body["cache_hits"] == 1 and body["cached"] is False
+
+            # Backfilled entries serve the single-id endpoint too.
+            assert (await client.get(f"/api/products/{ids[2]}")).json()["cached"] is True
+
+            similar = (await client.post("/api/products/similar:batch", json={"ids": ids[:2]})).json()
+            assert set(similar["data"]) == set(ids[:2])
+            assert all(len(products) == 4 for products in similar["data"].values())
+
+            too_many = await client.post("/api/products:batch", json={"ids": ["x"] * (gateway.BATCH_MAX_IDS + 1)})
+            assert too_many.status_code == 422
+
+    asyncio.run(scenario())
+    gateway.l1_cache.clear()
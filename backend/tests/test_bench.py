@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import random
+
+import pytest
+
+from backend.bench.runner import ZipfKeys, build_workload, compare, parse_mix
+
+
+def test_zipf_workload_favours_hot_keys() -> None:
+    keys = ZipfKeys(list(range(100)), 1.2, random.Random(1)).sample(5000)
+    assert keys.count(0) > keys.count(1) > keys.count(50)
+
+    workload = build_workload(["a", "b"], ["desk"], parse_mix("search=1,similar=1"), 200, 1.1, seed=7)
+    assert workload == build_workload(["a", "b"], ["desk"], parse_mix("search=1,similar=1"), 200, 1.1, seed=7)
+    assert {endpoint for endpoint, _, _ in workload} == {"search", "similar"}
+    with pytest.raises(ValueError):
+        parse_mix("checkout=1")
+
+
+def test_smoke_run_reports_latency_and_hits(monkeypatch) -> None:
+    pytest.importorskip("mongomock_motor")
+    pytest.importorskip("fakeredis")
+    from backend.app import main as gateway
+    from backend.bench.runner import run
+
+    # The run rewires the gateway's globals; put them back afterwards.
+    for name in ("build_redis_client", "redis_client", "mongo_client", "mongo_collection", "search_backend"):
+        monkeypatch.setattr(gateway, name, getattr(gateway, name))
+    monkeypatch.setattr(gateway.rate_limits, "rules", gateway.rate_limits.rules)
+    monkeypatch.setitem(gateway.db_status, "mongo", gateway.db_status["mongo"])
+    monkeypatch.setitem(gateway.db_status, "redis", gateway.db_status["redis"])
+
+    args = argparse.Namespace(
+        requests=300, warmup=0, concurrency=4, mix="search=0.3,product=0.5,similar=0.2", zipf=1.1,
+        products=60, seed=5, mongo_latency_ms=0.0, redis_latency_ms=0.0, search_backend="inverted",
+        ml="none", no_l1=False, url=None, output=None,
+    )
+    result = asyncio.run(run(args))
+
+    overall = result["results"]["overall"]
+    assert result["version"] == 1 and result["config"]["products"] == 60
+    assert overall["requests"] == 300 and overall["errors"] == 0
+    assert overall["p50_ms"] <= overall["p99_ms"] <= overall["max_ms"]
+    assert overall["cache_hit_ratio"] > 0.3
+    assert set(result["results"]["endpoints"]) == {"search", "product", "similar"}
+
+
+def test_compare_flags_regressions_beyond_threshold() -> None:
+    def result(rps: float, p99: float) -> dict:
+        row = {"rps": rps, "p50_ms": 1.0, "p99_ms": p99, "cache_hit_ratio": 0.9}
+        return {"results": {"overall": row, "endpoints": {"product": row}}}
+
+    _, regressions = compare(result(1000, 5.0), result(950, 5.2), threshold=0.1)
+    assert regressions == []
+
+    _, regressions = compare(result(1000, 5.0), result(700, 5.0), threshold=0.1)
+    assert regressions == ["overall rps: 1000 -> 700", "product rps: 1000 -> 700"]
@@ -0,0 +1,47 @@
+import asyncio
+
+from backend.app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def test_breaker_trips_on_outages_and_recovers_through_probe() -> None:
+    healthy = False
+    transitions = []
+
+    async def probe() -> None:
+        if not healthy:
+            raise ConnectionError("still down")
+
+    async def scenario():
+        nonlocal healthy
+        breaker = CircuitBreaker(
+            "mongo",
+            probe,
+            trip_on=(ConnectionError,),
+            failure_threshold=2,
+            open_seconds=0.01,
+            max_open_seconds=0.04,
+            on_change=lambda name, state: transitions.append(state),
+        )
+        # Query errors are not outages.
+        assert not breaker.record_failure(ValueError("bad filter"))
+        assert not breaker.record_failure(ConnectionError("refused"))
+        breaker.record_success()
+        assert not breaker.record_failure(ConnectionError("refused"))
+        assert breaker.record_failure(ConnectionError("refused"))
+        assert breaker.state == OPEN and not breaker.allow()
+
+        assert not await breaker.probe_once()
+        assert breaker.snapshot()["next_probe_seconds"] == 0.02
+
+        task = asyncio.create_task(breaker.run())
+        await asyncio.sleep(0.05)
+        assert breaker.state == OPEN and breaker.probe_failures >= 2
+        healthy = True
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.trips == 1 and breaker.rejected == 1
+    assert transitions[:3] == [OPEN, HALF_OPEN, OPEN] and transitions[-1] == CLOSED
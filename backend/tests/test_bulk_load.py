@@ -0,0 +1,79 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.app.bulk_load import BulkLoader, generate_products, generated_batches, iter_file_batches, threaded_batches
+
+
+def test_generated_products_are_reproducible() -> None:
+    batch = generate_products(50, seed=3)
+
+    assert len(batch) == 50
+    assert [doc["name"] for doc in batch] == [doc["name"] for doc in generate_products(50, seed=3)]
+    assert {"name", "price", "category", "brand", "inStock", "createdAt"} <= set(batch[0])
+
+
+def test_file_batches_parse_csv_and_extended_json(tmp_path) -> None:
+    csv_path = tmp_path / "products.csv"
+    csv_path.write_text("name,price,inStock,createdAt\nDesk,99.5,yes,2024-01-01T00:00:00\nChair,,0,\n")
+    ndjson_path = tmp_path / "products.ndjson"
+    ndjson_path.write_text(
+        "\n".join(
+            json.dumps({"_id": {"$oid": f"65a00000000000000000000{i}"}, "name": f"p{i}", "createdAt": "2024-01-02"})
+            for i in range(5)
+        )
+    )
+
+    (rows,) = list(iter_file_batches(str(csv_path), 10))
+    assert rows == [
+        {"name": "Desk", "price": 99.5, "inStock": True, "createdAt": datetime(2024, 1, 1)},
+        {"name": "Chair", "inStock": False},
+    ]
+
+    batches = list(iter_file_batches(str(ndjson_path), 2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert str(batches[0][0]["_id"]) == "65a000000000000000000000"
+    assert batches[0][0]["createdAt"] == datetime(2024, 1, 2)
+
+
+def test_bulk_loader_counts_duplicates_and_keeps_going(tmp_path) -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    path = tmp_path / "products.ndjson"
+    path.write_text(
+        "\n".join(json.dumps({"_id": {"$oid": f"65a00000000000000000000{i % 4}"}, "name": str(i)}) for i in range(6))
+    )
+
+    async def scenario():
+        collection = mongomock_motor.AsyncMongoMockClient().speedscale.products
+        loader = BulkLoader(collection, concurrency=2)
+        imported = await loader.load(threaded_batches(iter_file_batches(str(path), 2)))
+        generated = await BulkLoader(collection, concurrency=3).load(generated_batches(250, 40, seed=1))
+        return imported, generated, await collection.count_documents({})
+
+    imported, generated, total = asyncio.run(scenario())
+
+    assert imported["inserted"] == 4 and imported["duplicates"] == 2 and not imported["running"]
+    assert generated["inserted"] == 250 and generated["batches"] == 7
+    assert total == 254
+
+
+def test_seed_script_runs_end_to_end(monkeypatch) -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    from backend.app import bulk_load
+    from backend.scripts import seed as seed_script
+
+    mongo = mongomock_motor.AsyncMongoMockClient()
+    redis = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(bulk_load, "AsyncIOMotorClient", lambda *args, **kwargs: mongo)
+    monkeypatch.setattr(bulk_load.Redis, "from_url", lambda *args, **kwargs: redis)
+    monkeypatch.setattr(seed_script, "TOTAL", 120)
+    monkeypatch.setattr(seed_script, "BATCH_SIZE", 50)
+    monkeypatch.setattr(seed_script, "WORKERS", 1)
+
+    seed_script.seed()
+
+    products = mongo[seed_script.MONGO_DB][seed_script.MONGO_COLLECTION]
+    assert asyncio.run(products.count_documents({})) == 120
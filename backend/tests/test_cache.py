@@ -0,0 +1,39 @@
+import time
+
+from backend.app.cache import LocalCache
+
+
+def test_local_cache_hit_miss_and_lru_eviction() -> None:
+    cache = LocalCache(max_entries=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+    assert cache.stats.hits == 3
+    assert cache.stats.misses == 1
+
+
+def test_local_cache_expiry_and_ttl_cap() -> None:
+    cache = LocalCache(max_entries=4, ttl_cap=0.01)
+    cache.set("a", 1, 300)
+    assert cache.remaining_ttl("a") <= 0.01
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats.expirations == 1
+
+
+def test_local_cache_invalidate() -> None:
+    cache = LocalCache(max_entries=4)
+    cache.set("product:1", {"_id": "1"}, 60)
+    assert cache.invalidate("product:1")
+    assert not cache.invalidate("product:1")
+    assert cache.get("product:1") is None
+
+    disabled = LocalCache(max_entries=0)
+    disabled.set("a", 1, 60)
+    assert disabled.get("a") is None
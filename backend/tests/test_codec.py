@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from backend.app.codec import CacheCodec
+
+PAYLOAD = {"page": 1, "count": 2, "data": [{"_id": "a", "name": "Laptop ⚡", "price": 10.5}] * 50}
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compress_min_bytes", [0, 256])
+def test_round_trip_and_json_body(name: str, compress_min_bytes: int) -> None:
+    codec = CacheCodec(name, compress_min_bytes=compress_min_bytes)
+    packed = codec.pack(PAYLOAD)
+
+    assert codec.loads(packed) == PAYLOAD
+    assert json.loads(codec.to_json(packed)) == PAYLOAD
+    assert (packed[1:2] == b"z") == bool(compress_min_bytes)
+    if compress_min_bytes:
+        assert len(packed) < len(json.dumps(PAYLOAD))
+
+
+def test_reads_untagged_json_and_values_from_other_codecs() -> None:
+    legacy = json.dumps(PAYLOAD).encode()
+    json_codec = CacheCodec("json")
+    assert json_codec.loads(legacy) == PAYLOAD
+    assert json_codec.to_json(legacy) == legacy
+    assert json_codec.loads(CacheCodec("msgpack", compress_min_bytes=1).pack(PAYLOAD)) == PAYLOAD
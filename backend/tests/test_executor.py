@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from typing import List
+
+import pytest
+
+from backend.app.ml.executor import QueueFullError, RecommendationExecutor
+
+
+class BlockingRecommender:
+    """Holds every inference call until ``release`` is set."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.calls = 0
+
+    def find_similar_batch(self, texts: List[str], limit: int) -> List[List[str]]:
+        self.calls += 1
+        self.release.wait(5)
+        return [[f"{text}-match"] for text in texts]
+
+
+def test_saturated_executor_sheds_load_instead_of_queueing_in_the_pool() -> None:
+    recommender = BlockingRecommender()
+    executor = RecommendationExecutor(lambda: recommender, max_batch_size=2, max_wait_ms=1, max_queue=3, workers=1)
+
+    async def scenario() -> None:
+        first = [asyncio.ensure_future(executor.find_similar(f"q{i}")) for i in range(2)]
+        # Let the only worker pick up the first batch and block on it.
+        for _ in range(50):
+            await asyncio.sleep(0.005)
+            if recommender.calls:
+                break
+        assert recommender.calls == 1
+
+        waiting = [asyncio.ensure_future(executor.find_similar(f"w{i}")) for i in range(3)]
+        await asyncio.sleep(0.02)
+        # No free worker, so the queue is not drained into the thread pool.
+        assert executor.snapshot()["queue_depth"] == 3
+        with pytest.raises(QueueFullError):
+            await executor.find_similar("overflow")
+        assert executor.rejected == 1
+
+        recommender.release.set()
+        assert await asyncio.gather(*first) == [["q0-match"], ["q1-match"]]
+        assert [result[0] for result in await asyncio.gather(*waiting)] == ["w0-match", "w1-match", "w2-match"]
+        await executor.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from backend.app.existence import BloomFilter, ExistenceFilter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    members = [str(ObjectId()) for _ in range(2000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    strangers = [f"missing-{i}" for i in range(5000)]
+    false_positives = sum(1 for stranger in strangers if stranger in bloom)
+    assert false_positives < 5000 * 0.03
+    assert bloom.snapshot()["items"] == 2000 and bloom.hashes == 7
+
+
+def test_existence_filter_only_rejects_ids_older_than_its_scan() -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["speedscale"]["products"]
+    day_ago = datetime.utcnow() - timedelta(days=1)
+
+    async def scenario() -> None:
+        stored = ObjectId.from_datetime(day_ago)
+        await collection.insert_one({"_id": stored, "name": "Desk"})
+        existence = ExistenceFilter(batch_size=100)
+        assert not existence.definitely_missing(str(ObjectId.from_datetime(day_ago - timedelta(hours=1))))
+
+        assert await existence.rebuild(collection) == 1
+        assert not existence.definitely_missing(str(stored))
+        assert existence.definitely_missing(str(ObjectId.from_datetime(day_ago - timedelta(hours=1))))
+        # Minted after the scan began, possibly inserted by another worker.
+        assert not existence.definitely_missing(str(ObjectId()))
+        assert not existence.definitely_missing("not-an-object-id")
+        assert existence.snapshot()["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_missing_products_are_answered_without_mongo(monkeypatch) -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    httpx = pytest.importorskip("httpx")
+
+    from backend.app import main as gateway
+
+    collection = mongomock_motor.AsyncMongoMockClient()["speedscale"]["products"]
+    lookups = []
+    find_one = collection.find_one
+
+    async def counting_find_one(*args, **kwargs):
+        lookups.append(args[0])
+        return await find_one(*args, **kwargs)
+
+    monkeypatch.setattr(collection, "find_one", counting_find_one)
+    monkeypatch.setattr(gateway, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(gateway, "mongo_collection", collection)
+    monkeypatch.setattr(gateway, "mongo_reads", {})
+    monkeypatch.setattr(gateway, "existence", ExistenceFilter())
+    monkeypatch.setitem(gateway.db_status, "mongo", True)
+    gateway.l1_cache.clear()
+    missing = str(ObjectId.from_datetime(datetime.utcnow() - timedelta(days=2)))
+
+    async def scenario() -> None:
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/api/products/nope", "/api/products/nope/similar"):
+                assert (await client.get(path)).status_code == 404
+            assert lookups == []
+
+            assert (await client.get(f"/api/products/{missing}")).status_code == 404
+            assert len(lookups) == 1
+            # Negative entry in L1, then in Redis once L1 is gone.
+            assert (await client.get(f"/api/products/{missing}/similar")).status_code == 404
+            gateway.l1_cache.clear()
+            assert (await client.get(f"/api/products/{missing}")).status_code == 404
+            assert len(lookups) == 1
+
+            await collection.insert_one({"name": "Desk", "category": "Office"})
+            await gateway.existence.rebuild(collection)
+            older = str(ObjectId.from_datetime(datetime.utcnow() - timedelta(days=1)))
+            assert (await client.get(f"/api/products/{older}")).status_code == 404
+            assert len(lookups) == 1 and gateway.existence.rejected == 1
+
+    asyncio.run(scenario())
+    gateway.l1_cache.clear()
+
+
+def test_imported_old_ids_are_served_once_the_load_is_announced(monkeypatch, tmp_path) -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    httpx = pytest.importorskip("httpx")
+    from bson import json_util
+
+    from backend.app import main as gateway
+    from backend.app.bulk_load import CATALOG_RELOAD, BulkLoader, iter_file_batches, notify_catalog_reload, threaded_batches
+
+    redis = fakeredis.FakeAsyncRedis()
+    collection = mongomock_motor.AsyncMongoMockClient()["speedscale"]["products"]
+    monkeypatch.setattr(gateway, "redis_client", redis)
+    monkeypatch.setattr(gateway, "mongo_collection", collection)
+    monkeypatch.setattr(gateway, "mongo_reads", {})
+    monkeypatch.setattr(gateway, "existence", ExistenceFilter())
+    monkeypatch.setitem(gateway.db_status, "mongo", True)
+    gateway.l1_cache.clear()
+    # An export from another deployment: ids minted long before this filter's scan.
+    exported = ObjectId.from_datetime(datetime.utcnow() - timedelta(days=30))
+    path = tmp_path / "products.ndjson"
+    path.write_text(json_util.dumps({"_id": exported, "name": "Old Desk", "category": "Office", "price": 90}) + "\n")
+
+    async def scenario() -> None:
+        await gateway.existence.rebuild(collection)
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await BulkLoader(collection).load(threaded_batches(iter_file_batches(str(path), 10)))
+            # Until the loader reports in, the filter still vouches for its absence,
+            # and a lookup that raced the import may have left a negative marker.
+            assert (await client.get(f"/api/products/{exported}")).status_code == 404
+            await gateway.remember_missing([str(exported)])
+
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(gateway.CATALOG_CHANGES_CHANNEL)
+            assert await notify_catalog_reload(redis, gateway.CATALOG_CHANGES_CHANNEL) == 1
+            # The first read may only consume the subscribe confirmation.
+            message = await pubsub.get_message(timeout=1) or await pubsub.get_message(timeout=1)
+            origin, product_id = message["data"].decode().split("|", 1)
+            assert product_id == CATALOG_RELOAD
+            await pubsub.aclose()
+            await gateway.apply_catalog_change(origin, product_id)
+
+            found = await client.get(f"/api/products/{exported}")
+            assert found.status_code == 200 and found.json()["data"]["name"] == "Old Desk"
+            assert not await redis.exists(gateway.negative_key(str(exported)))
+            assert gateway.existence.rebuilds == 2
+
+    asyncio.run(scenario())
+    gateway.l1_cache.clear()
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from backend.app.invalidation import payload_product_ids, search_key_matches
+from backend.app.products import Product
+
+
+def test_search_key_matching_is_a_loose_superset() -> None:
+    lamp = Product.from_doc({"_id": ObjectId(), "name": "Gaming Desk Lamp", "category": "Home", "brand": "Lumo"})
+
+    assert search_key_matches("search:desk:20:*:*:p1", lamp)
+    assert search_key_matches("search:lamps:20:name:Home:p2", lamp)
+    assert search_key_matches("search:game:20:*:*:cabc", lamp)
+    assert not search_key_matches("search:desk:20:*:Office:p1", lamp)
+    assert not search_key_matches("search:chair:20:*:*:p1", lamp)
+    # Queries may contain colons; only the trailing fields are split off.
+    assert search_key_matches("search:lumo: lamp:20:*:*:p1", lamp)
+
+    assert payload_product_ids({"data": [lamp, {"_id": "abc", "name": "x"}]}) == [lamp.id, "abc"]
+    assert payload_product_ids({"data": {"_id": "abc"}}) == []
+
+
+def test_writes_invalidate_every_entry_that_lists_the_product(monkeypatch) -> None:
+    pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    httpx = pytest.importorskip("httpx")
+    from mongomock_motor import AsyncMongoMockClient
+
+    from backend.app import main as gateway
+
+    redis = fakeredis.FakeAsyncRedis()
+    collection = AsyncMongoMockClient()["speedscale"]["products"]
+    monkeypatch.setattr(gateway, "redis_client", redis)
+    monkeypatch.setattr(gateway, "mongo_collection", collection)
+    monkeypatch.setattr(gateway, "mongo_reads", {})
+    monkeypatch.setattr(gateway, "search_backend", gateway.build_search_backend("regex"))
+    monkeypatch.setitem(gateway.db_status, "mongo", True)
+    monkeypatch.setattr(gateway, "ADMIN_TOKEN", "")
+    gateway.l1_cache.clear()
+
+    async def scenario() -> None:
+        result = await collection.insert_many(
+            [{"name": f"Desk {i}", "category": "Office", "price": 10 + i} for i in range(4)]
+            + [{"name": "Bookshelf", "category": "Office", "price": 80}]
+        )
+        ids = [str(oid) for oid in result.inserted_ids]
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Writes stay closed until a token is configured, then require it.
+            assert (await client.post("/api/products", json={"name": "Lamp", "price": 5})).status_code == 403
+            monkeypatch.setattr(gateway, "ADMIN_TOKEN", "secret")
+            assert (await client.post("/api/products", json={"name": "Lamp", "price": 5})).status_code == 403
+            client.headers["x-admin-token"] = "secret"
+
+            await client.get("/api/search", params={"query": "desk"})
+            await client.get("/api/search", params={"query": "shelf"})
+            await client.get(f"/api/products/{ids[0]}")
+            assert await redis.smembers(f"refs:product:{ids[0]}") == {b"search:desk:20:*:*:p1"}
+
+            updated = await client.patch(f"/api/products/{ids[0]}", json={"name": "Standing Desk", "price": 250})
+            assert updated.status_code == 200 and updated.json()["invalidated"] == 1
+            assert not await redis.exists("search:desk:20:*:*:p1")
+            assert await redis.exists("search:shelf:20:*:*:p1")
+            # product:{id} is written through rather than dropped.
+            product = (await client.get(f"/api/products/{ids[0]}")).json()
+            assert product["cached"] is True and product["data"]["price"] == 250.0
+
+            created = await client.post("/api/products", json={"name": "Shelf Bracket", "price": 5, "category": "Office"})
+            assert created.status_code == 201 and created.json()["invalidated"] == 1
+            shelves = (await client.get("/api/search", params={"query": "shelf"})).json()
+            assert shelves["cached"] is False and shelves["count"] == 2
+
+            deleted = await client.delete(f"/api/products/{ids[0]}")
+            assert deleted.status_code == 200
+            assert (await client.get(f"/api/products/{ids[0]}")).status_code == 404
+            assert (await client.delete(f"/api/products/{ids[0]}")).status_code == 404
+            assert (await client.patch(f"/api/products/{ids[1]}", json={})).status_code == 400
+
+            stats = (await client.get("/api/cache/stats")).json()
+            assert stats["invalidation"] == gateway.L1_INVALIDATION
+            assert stats["write_invalidation"]["invalidations"] == 3
+
+    asyncio.run(scenario())
+    gateway.l1_cache.clear()
+
+
+def test_fills_that_straddle_a_write_are_dropped_and_refills_read_the_primary(monkeypatch) -> None:
+    pytest.importorskip("mongomock_motor")
+    fakeredis = pytest.importorskip("fakeredis")
+    httpx = pytest.importorskip("httpx")
+    from mongomock_motor import AsyncMongoMockClient
+
+    from backend.app import main as gateway
+
+    redis = fakeredis.FakeAsyncRedis()
+    primary = AsyncMongoMockClient()["speedscale"]["products"]
+    # A secondary that has not replicated the write yet.
+    lagging = AsyncMongoMockClient()["speedscale"]["products"]
+    monkeypatch.setattr(gateway, "redis_client", redis)
+    monkeypatch.setattr(gateway, "mongo_collection", primary)
+    monkeypatch.setattr(gateway, "mongo_reads", {"search": lagging, "similar": lagging})
+    monkeypatch.setattr(gateway, "search_backend", gateway.build_search_backend("regex"))
+    monkeypatch.setattr(gateway, "ADMIN_TOKEN", "secret")
+    monkeypatch.setitem(gateway.db_status, "mongo", True)
+    gateway.l1_cache.clear()
+
+    async def scenario() -> None:
+        doc = {"name": "Desk Lamp", "category": "Home", "price": 20}
+        product_id = str((await primary.insert_one(dict(doc))).inserted_id)
+        await lagging.insert_one({**doc, "_id": gateway.ObjectId(product_id)})
+        transport = httpx.ASGITransport(app=gateway.app, raise_app_exceptions=True)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers={"x-admin-token": "secret"}) as client:
+            # Misses whose loads are still running when the write lands.
+            in_flight = {}
+            for key in (f"similar:{product_id}", "search:light:20:*:*:p1"):
+                body, _, tombstone = await gateway.read_cache_entry(key)
+                assert body is None and tombstone == b""
+                in_flight[key] = tombstone
+
+            renamed = await client.patch(f"/api/products/{product_id}", json={"name": "Desk Light"})
+            assert renamed.status_code == 200
+
+            dropped = gateway.cache_index.stale_fills
+            for key, tombstone in in_flight.items():
+                await gateway.write_cache(key, {"data": []}, ttl_seconds=60, tombstone=tombstone)
+                assert not await redis.exists(key) and gateway.l1_cache.get(key) is None
+            assert gateway.cache_index.stale_fills == dropped + 2
+
+            # The lagging secondary still says "Lamp"; the refill reads the primary and is kept.
+            first = (await client.get("/api/search", params={"query": "light"})).json()
+            assert first["cached"] is False and first["count"] == 1
+            second = (await client.get("/api/search", params={"query": "light"})).json()
+            assert second["cached"] is True and second["count"] == 1
+
+    asyncio.run(scenario())
+    gateway.l1_cache.clear()
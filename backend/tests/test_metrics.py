@@ -0,0 +1,78 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from backend.app.metrics import MetricsMiddleware, MetricsRegistry
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry(prefix="t_")
+    latency = registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.01, 0.1))
+    errors = registry.counter("errors_total", "Errors.", ("backend",))
+    registry.gauge("queue_depth", "Depth.", lambda: [((), 3)])
+
+    for value in (0.005, 0.05, 0.05, 2.0):
+        latency.observe(value, "mongo")
+    errors.inc('re"dis')
+
+    lines = registry.render().splitlines()
+    assert "# TYPE t_stage_seconds histogram" in lines
+    assert 't_stage_seconds_bucket{stage="mongo",le="0.01"} 1' in lines
+    assert 't_stage_seconds_bucket{stage="mongo",le="0.1"} 3' in lines
+    assert 't_stage_seconds_bucket{stage="mongo",le="+Inf"} 4' in lines
+    assert 't_stage_seconds_count{stage="mongo"} 4' in lines
+    assert 't_errors_total{backend="re\\"dis"} 1' in lines
+    assert "t_queue_depth 3" in lines
+    assert latency.quantile(0.5, "mongo") == 0.1 and latency.quantile(0.99, "mongo") == float("inf")
+
+
+def test_middleware_labels_requests_by_route_template() -> None:
+    registry = MetricsRegistry()
+    latency = registry.histogram("request_seconds", "Latency.", ("route", "method", "status"))
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, histogram=latency)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            for item_id in ("a", "b"):
+                await client.get(f"/items/{item_id}")
+            await client.get("/missing")
+
+    asyncio.run(scenario())
+    assert latency.count("/items/{item_id}", "GET", "200") == 2
+    assert latency.count("unmatched", "GET", "404") == 1
+
+
+def test_workers_are_merged_from_their_dumps(tmp_path) -> None:
+    from backend.app.metrics import clear_dumps, mark_process_dead
+
+    def worker(hits: int, latency: float, depth: int) -> MetricsRegistry:
+        registry = MetricsRegistry(prefix="t_")
+        registry.counter("hits_total", "Hits.", ("tier",)).inc("l1", amount=hits)
+        registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.01, 0.1)).observe(latency, "mongo")
+        registry.gauge("queue_depth", "Depth.", lambda: [((), depth)])
+        return registry
+
+    first, second = worker(3, 0.005, 2), worker(4, 0.05, 5)
+    first.dump(str(tmp_path), pid=101)
+    second.dump(str(tmp_path), pid=102)
+
+    lines = first.render_merged(str(tmp_path)).splitlines()
+    assert 't_hits_total{tier="l1"} 7' in lines
+    assert 't_stage_seconds_bucket{stage="mongo",le="0.01"} 1' in lines
+    assert 't_stage_seconds_count{stage="mongo"} 2' in lines
+    assert 't_queue_depth{pid="101"} 2' in lines and 't_queue_depth{pid="102"} 5' in lines
+
+    # A dead worker's totals stay, its gauges go.
+    mark_process_dead(str(tmp_path), 102)
+    lines = first.render_merged(str(tmp_path)).splitlines()
+    assert 't_hits_total{tier="l1"} 7' in lines and 't_queue_depth{pid="102"} 5' not in lines
+
+    clear_dumps(str(tmp_path))
+    assert 't_hits_total{tier="l1"} 7' not in first.render_merged(str(tmp_path)).splitlines()
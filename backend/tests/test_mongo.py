@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from backend.app.mongo import PoolMetrics, parse_read_preferences
+
+
+def test_parse_read_preferences() -> None:
+    preferences = parse_read_preferences("search=secondaryPreferred:120, similar=nearest:30,product=primary:90,bad=sideways")
+
+    assert preferences["search"] == SecondaryPreferred(max_staleness=120)
+    # Below the server minimum: raised instead of failing every query.
+    assert preferences["similar"].max_staleness == 90
+    assert preferences["product"] == Primary()
+    assert "bad" not in preferences
+
+
+def test_pool_metrics_track_waits_and_timeouts() -> None:
+    metrics = PoolMetrics()
+    address = ("shard1", 27017)
+    for ms in (1, 2, 3, 40):
+        metrics.connection_created(SimpleNamespace(address=address))
+        metrics.connection_checked_out(SimpleNamespace(address=address, duration=ms / 1000))
+    metrics.connection_checked_in(SimpleNamespace(address=address))
+    metrics.connection_check_out_failed(
+        SimpleNamespace(address=address, reason=monitoring.ConnectionCheckOutFailedReason.TIMEOUT)
+    )
+
+    stats = metrics.snapshot()["shard1:27017"]
+    assert stats["connections"] == 4 and stats["checked_out"] == 3
+    assert stats["checkouts"] == 4 and stats["timeouts"] == 1
+    assert stats["wait_ms"]["max"] == 40 and stats["wait_ms"]["p50"] == 3
@@ -0,0 +1,57 @@
+import json
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from backend.app import codec
+from backend.app.codec import CacheCodec, dumps_json
+from backend.app.products import Product, products_from_docs
+
+
+def test_bulk_conversion_matches_api_shape() -> None:
+    created = datetime(2024, 5, 1, 12, 30)
+    docs = [
+        {"_id": ObjectId(), "name": f"Lamp {i}", "price": 10 + i, "category": "Home", "createdAt": created}
+        for i in range(3)
+    ]
+    products = products_from_docs(docs)
+
+    assert all(isinstance(product, Product) for product in products)
+    first = products[0].as_dict()
+    assert first == {
+        "_id": str(docs[0]["_id"]),
+        "name": "Lamp 0",
+        "price": 10.0,
+        "description": "",
+        "category": "Home",
+        "brand": "",
+        "inStock": True,
+        "rating": 0.0,
+        "imageUrl": "https://picsum.photos/seed/placeholder/400/300",
+        "createdAt": "2024-05-01T12:30:00",
+    }
+    # The timestamp is formatted once per batch.
+    assert products[1].created_at is products[2].created_at
+
+    assert products_from_docs(docs[:1], ("name",)) == [{"_id": str(docs[0]["_id"]), "name": "Lamp 0"}]
+
+
+def test_missing_created_at_comes_from_object_id() -> None:
+    oid = ObjectId.from_datetime(datetime(2023, 3, 4, 5, 6, 7))
+    assert Product.from_doc({"_id": oid}).created_at == "2023-03-04T05:06:07"
+    assert Product.from_doc({"_id": "legacy"}).created_at == ""
+
+
+def test_products_encode_like_dicts(monkeypatch) -> None:
+    product = Product.from_doc({"_id": ObjectId(), "name": "Desk", "createdAt": "2024-01-01"})
+    expected = dumps_json({"data": [product.as_dict()]})
+
+    assert dumps_json({"data": [product]}) == expected
+    monkeypatch.setattr(codec, "orjson", None)
+    assert json.loads(dumps_json({"data": [product]})) == json.loads(expected)
+
+    if codec.msgpack is None:
+        pytest.skip("msgpack not installed")
+    packed = CacheCodec("msgpack").pack({"data": [product]})
+    assert CacheCodec("msgpack").loads(packed) == {"data": [product.as_dict()]}
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from backend.app.ratelimit import RateLimiter, parse_rate_limits
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+def run_checks(limiter: RateLimiter, scope: str, count: int, pause: float = 0.0):
+    async def go():
+        results = []
+        for _ in range(count):
+            results.append(await limiter.check(scope, "10.0.0.1"))
+            if pause:
+                await asyncio.sleep(pause)
+        return results
+
+    return asyncio.run(go())
+
+
+def redis_getter():
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_client():
+        return client
+
+    return get_client
+
+
+def test_parse_rate_limits_defaults_and_bad_entries() -> None:
+    rules = parse_rate_limits("search=10/30, broken=abc, product=5")
+    assert (rules["search"].limit, rules["search"].window_seconds) == (10, 30)
+    assert rules["product"].window_seconds == 60
+    assert "broken" not in rules and rules["default"].limit == 60
+
+
+def test_sliding_window_enforces_limit_atomically() -> None:
+    limiter = RateLimiter(redis_getter(), parse_rate_limits("search=5/60"))
+    decisions = run_checks(limiter, "search", 8)
+    assert [d.allowed for d in decisions] == [True] * 5 + [False] * 3
+    assert decisions[-1].retry_after > 0
+    assert limiter.redis_calls == 8
+
+
+def test_local_lease_skips_redis_and_refunds_unspent_tokens() -> None:
+    limiter = RateLimiter(redis_getter(), parse_rate_limits("search=20/60"), lease_size=5)
+    assert all(d.allowed for d in run_checks(limiter, "search", 20))
+    assert limiter.redis_calls == 4 and limiter.local_grants == 16
+    assert not run_checks(limiter, "search", 1)[0].allowed
+
+    sparse = RateLimiter(redis_getter(), parse_rate_limits("search=10/60"), lease_size=5, lease_seconds=0.01)
+    # One request per lease: without refunds the client would be cut off after two.
+    assert all(d.allowed for d in run_checks(sparse, "search", 6, pause=0.02))
+
+
+def test_falls_back_to_local_token_bucket_without_redis() -> None:
+    async def no_client():
+        return None
+
+    limiter = RateLimiter(no_client, parse_rate_limits("search=3/60"))
+    assert [d.allowed for d in run_checks(limiter, "search", 5)] == [True, True, True, False, False]
+    assert limiter.fallbacks == 5
@@ -0,0 +1,112 @@
+import pytest
+
+from backend.app.search import InvertedIndex, decode_cursor, encode_cursor
+
+
+def build_index() -> InvertedIndex:
+    index = InvertedIndex()
+    index.add("1", {"name": "Gaming Laptop Pro", "category": "Computers", "brand": "ApexWare"})
+    index.add("2", {"name": "Office Chair", "category": "Home Office", "brand": "Northwind"})
+    index.add("3", {"name": "Laptop Stand", "category": "Accessories", "brand": "ApexWare"})
+    index.add("4", {"name": "Wireless Headset", "category": "Audio", "brand": "Laptopia"})
+    return index
+
+
+def test_ranks_name_matches_above_brand_matches() -> None:
+    index = build_index()
+    ids = [doc_id for doc_id, _ in index.search("laptop")]
+    assert set(ids[:2]) == {"1", "3"}
+    assert "4" in ids
+    assert "2" not in ids
+
+
+def test_prefix_match_on_last_token_and_pagination() -> None:
+    index = build_index()
+    assert {doc_id for doc_id, _ in index.search("lap")} == {"1", "3", "4"}
+    first_page = index.search("apexware", offset=0, limit=1)
+    second_page = index.search("apexware", offset=1, limit=1)
+    assert len(first_page) == len(second_page) == 1
+    assert first_page[0][0] != second_page[0][0]
+
+
+def test_incremental_update_and_removal() -> None:
+    index = build_index()
+    index.add("2", {"name": "Laptop Desk", "category": "Home Office", "brand": "Northwind"})
+    assert "2" in {doc_id for doc_id, _ in index.search("laptop")}
+    assert index.search("chair") == []
+
+    assert index.remove("1")
+    assert not index.remove("1")
+    assert "1" not in {doc_id for doc_id, _ in index.search("gaming laptop")}
+    index.add("5", {"name": "Gaming Mouse", "category": "Gaming", "brand": "ApexWare"})
+    assert len(index) == 4
+    assert index.search("mouse")[0][0] == "5"
+
+
+def test_keyset_pages_match_offset_pages() -> None:
+    index = build_index()
+    for doc_id in range(5, 30):
+        index.add(str(doc_id), {"name": f"ApexWare Laptop {doc_id}", "brand": "ApexWare"})
+    expected = index.search("apexware laptop", limit=100)
+
+    pages, after = [], None
+    while True:
+        page = index.search("apexware laptop", limit=4, after=after)
+        if not page:
+            break
+        pages.extend(page)
+        doc_id, score = page[-1]
+        after = (score, doc_id)
+    assert pages == expected
+
+
+def test_cursor_round_trip_and_validation() -> None:
+    after = {"s": 1.2345678901234567, "id": "65a000000000000000000003"}
+    assert decode_cursor(encode_cursor(after)) == after
+    for bad in ("not-a-cursor", encode_cursor({"id": "nope"}), encode_cursor({"s": "x", "id": after["id"]})):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_inverted_backend_picks_up_updates_deletes_and_old_ids() -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import asyncio
+
+    from bson import ObjectId
+
+    from backend.app.search import InvertedIndexSearchBackend
+
+    collection = mongomock_motor.AsyncMongoMockClient()["speedscale"]["products"]
+    backend = InvertedIndexSearchBackend(full_refresh_seconds=3600)
+
+    async def names(query: str) -> list:
+        docs, _ = await backend.search(collection, query)
+        return [doc["name"] for doc in docs]
+
+    async def scenario() -> None:
+        chair, lamp = ObjectId(), ObjectId()
+        await collection.insert_many([{"_id": chair, "name": "Office Chair"}, {"_id": lamp, "name": "Desk Lamp"}])
+        await backend.prepare(collection)
+        assert await names("chair") == ["Office Chair"]
+
+        # Changed behind the gateway's back, plus an import that kept an old id.
+        await collection.update_one({"_id": chair}, {"$set": {"name": "Gaming Stool"}})
+        await collection.insert_one({"_id": ObjectId.from_datetime(chair.generation_time.replace(year=2020)), "name": "Old Stool"})
+        await backend.sync(collection)
+        # Incremental syncs only see new ids: the index is still stale.
+        assert await names("chair") == ["Gaming Stool"]
+        assert await names("stool") == []
+
+        backend.full_refresh_seconds = 1e-9
+        await backend.sync(collection)
+        assert await names("chair") == []
+        assert sorted(await names("stool")) == ["Gaming Stool", "Old Stool"]
+        assert backend.full_syncs == 2
+
+        # Fan-out from another worker: re-read the ids, dropping deleted ones.
+        await collection.delete_one({"_id": lamp})
+        await collection.update_one({"_id": chair}, {"$set": {"name": "Reading Lamp"}})
+        await backend.refresh_ids(collection, [str(lamp), str(chair), "junk"])
+        assert await names("lamp") == ["Reading Lamp"]
+
+    asyncio.run(scenario())
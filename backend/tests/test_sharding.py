@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+
+from backend.app.sharding import QueryPlanner, ShardLayout, parse_shard_key, shards_from_explain
+
+COMPOUND_CHUNKS = [
+    ({"category": MinKey(), "_id": MinKey()}, {"category": "Audio", "_id": 0}, "shardA"),
+    ({"category": "Audio", "_id": 0}, {"category": "Gaming", "_id": MinKey()}, "shardB"),
+    ({"category": "Gaming", "_id": MinKey()}, {"category": MaxKey(), "_id": MaxKey()}, "shardC"),
+]
+
+
+def test_compound_key_targets_category_shards() -> None:
+    layout = ShardLayout(parse_shard_key("category:1,_id:hashed"), COMPOUND_CHUNKS)
+
+    assert layout.plan({"category": "Electronics"}).as_dict() == {"kind": "single", "fan_out": 1, "shards": ["shardB"]}
+    # "Audio" straddles a chunk boundary, so both owners are asked.
+    assert layout.plan({"category": "Audio", "_id": {"$ne": 1}}).shards == ["shardA", "shardB"]
+    assert layout.plan({"category": "Audio", "_id": ObjectId()}).kind == "single"
+    assert layout.plan({"_id": ObjectId()}).kind == "broadcast"
+    assert layout.plan({"category": {"$in": ["Accessories", "Computers", "Toys"]}}).fan_out == 3
+
+
+def test_hashed_id_key_plans() -> None:
+    chunks = [({"_id": MinKey()}, {"_id": 0}, "shardA"), ({"_id": 0}, {"_id": MaxKey()}, "shardB")]
+    layout = ShardLayout(parse_shard_key("_id:hashed"), chunks)
+
+    assert layout.plan({"_id": ObjectId()}).kind == "single"
+    assert layout.plan({"_id": {"$in": [ObjectId() for _ in range(4)]}}).fan_out == 2
+    assert layout.plan({"category": "Audio"}).as_dict() == {"kind": "broadcast", "fan_out": 2, "shards": ["shardA", "shardB"]}
+    assert ShardLayout([], []).plan({}).kind == "unsharded"
+
+
+def test_layout_loads_from_config_database_and_planner_counts() -> None:
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    client = mongomock_motor.AsyncMongoMockClient()
+
+    async def scenario():
+        await client.config.collections.insert_one({"_id": "speedscale.products", "key": {"_id": "hashed"}, "uuid": "u1"})
+        await client.config.chunks.insert_many(
+            [
+                {"uuid": "u1", "min": {"_id": MinKey()}, "max": {"_id": 0}, "shard": "shard1ReplSet"},
+                {"uuid": "u1", "min": {"_id": 0}, "max": {"_id": MaxKey()}, "shard": "shard2ReplSet"},
+            ]
+        )
+        planner = QueryPlanner("speedscale.products")
+        await planner.refresh(client)
+        planner.plan("product", {"_id": ObjectId()})
+        planner.plan("search", {})
+        return planner.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["layout"] == {
+        "sharded": True,
+        "key": {"_id": "hashed"},
+        "shards": ["shard1ReplSet", "shard2ReplSet"],
+        "chunks": 2,
+    }
+    assert snapshot["endpoints"]["product"]["plans"] == {"single": 1}
+    assert snapshot["endpoints"]["search"]["avg_fan_out"] == 2
+
+
+def test_shards_from_explain() -> None:
+    find_explain = {"queryPlanner": {"winningPlan": {"stage": "SHARD_MERGE", "shards": [{"shardName": "b"}, {"shardName": "a"}]}}}
+    assert shards_from_explain(find_explain) == ["a", "b"]
+    assert shards_from_explain({"shards": {"a": {}}}) == ["a"]
+    assert shards_from_explain({"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}) == []
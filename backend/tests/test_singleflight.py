@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from backend.app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation() -> None:
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run() -> None:
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("search:laptop", compute) for _ in range(10)))
+        assert results == ["value"] * 10
+        assert calls == 1
+        assert flights.leaders == 1 and flights.followers == 9
+        assert len(flights) == 0
+
+    asyncio.run(run())
+
+
+def test_errors_propagate_to_every_waiter() -> None:
+    async def fail() -> None:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run() -> None:
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            await flights.do("k", fail)
+
+    asyncio.run(run())
+
+
+def test_spawn_skips_keys_already_in_flight() -> None:
+    async def compute() -> int:
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def run() -> None:
+        flights = SingleFlight()
+        assert flights.spawn("k", compute)
+        assert not flights.spawn("k", compute)
+        assert await flights.do("k", compute) == 1
+        assert flights.refreshes == 1
+
+    asyncio.run(run())
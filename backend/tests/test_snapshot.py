@@ -0,0 +1,63 @@
+import os
+
+from bson import ObjectId
+
+from backend.app.products import products_from_docs
+from backend.app.snapshot import DegradedSnapshot, write_snapshot
+
+
+def make_products(count: int):
+    docs = [
+        {"_id": ObjectId(), "name": f"Desk Lamp {i}", "category": "Home" if i % 2 else "Office", "price": i}
+        for i in range(count)
+    ]
+    return products_from_docs(docs)
+
+
+def test_roundtrip_search_and_similar(tmp_path) -> None:
+    products = make_products(6)
+    ids = [product.id for product in products]
+    path = str(tmp_path / "snapshots" / "degraded.snap")
+    info = write_snapshot(path, products, {"lamp": [ids[3], ids[1]]})
+    assert info["products"] == 6 and info["queries"] == 1
+
+    snapshot = DegradedSnapshot(path)
+    assert not snapshot.ready
+    assert snapshot.reload() and snapshot.ready
+    assert snapshot.product(ids[2]) == products[2].as_dict()
+    assert snapshot.product("missing") is None
+
+    # Recorded queries keep their original order; others match on name.
+    assert [p["_id"] for p in snapshot.search("  LAMP ")] == [ids[3], ids[1]]
+    assert [p["_id"] for p in snapshot.search("desk lamp", skip=1, limit=2)] == ids[1:3]
+    assert [p["_id"] for p in snapshot.search("desk", category="Home")] == [ids[1], ids[3], ids[5]]
+    assert snapshot.search("chair") == []
+
+    similar = snapshot.similar(ids[0], neighbors=[ids[5], "gone"], limit=3)
+    assert [p["_id"] for p in similar] == [ids[5], ids[2], ids[4]]
+    assert snapshot.hits == 5 and snapshot.misses == 2
+
+
+def test_reload_picks_up_rewrites_only(tmp_path) -> None:
+    path = str(tmp_path / "degraded.snap")
+    snapshot = DegradedSnapshot(path)
+    assert not snapshot.reload()
+
+    write_snapshot(path, make_products(2), {})
+    assert snapshot.reload()
+    assert not snapshot.reload()
+
+    replacement = make_products(3)
+    write_snapshot(path, replacement, {})
+    assert snapshot.reload()
+    assert snapshot.snapshot()["products"] == 3 and snapshot.loads == 2
+    assert snapshot.product(replacement[0].id)["name"] == "Desk Lamp 0"
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".snapshot-")]
+
+
+def test_unreadable_file_is_ignored(tmp_path) -> None:
+    path = tmp_path / "degraded.snap"
+    path.write_bytes(b"not a snapshot at all, just some bytes")
+    snapshot = DegradedSnapshot(str(path))
+    assert not snapshot.reload()
+    assert not snapshot.ready and snapshot.product("x") is None
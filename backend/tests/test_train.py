@@ -0,0 +1,47 @@
+import mongomock
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from backend.app.ml.artifact_store import load_artifacts
+from backend.app.ml.recommender import product_text
+from backend.app.ml.train import train
+
+WORDS = "wireless gaming laptop office chair desk mouse keyboard monitor audio speaker cable the and with".split()
+
+
+def catalog(rows: int = 300):
+    rng = np.random.default_rng(7)
+    collection = mongomock.MongoClient().speedscale.products
+    collection.insert_many(
+        [
+            {
+                "name": " ".join(rng.choice(WORDS, 3)),
+                "description": " ".join(rng.choice(WORDS, 12)),
+                "category": None if i % 10 == 0 else str(rng.choice(WORDS)),
+            }
+            for i in range(rows)
+        ]
+    )
+    return collection
+
+
+def test_streaming_training_matches_tfidf_vectorizer(tmp_path) -> None:
+    collection = catalog()
+    docs = list(collection.find().sort("_id", 1))
+    reference = TfidfVectorizer(stop_words="english", max_features=5000)
+    expected = reference.fit_transform([product_text(doc) for doc in docs])
+
+    for workers in (1, 2):
+        output = tmp_path / str(workers)
+        report = train(collection, output=str(output), workers=workers, batch_size=64, neighbors_k=3)
+        artifacts = load_artifacts(str(output))
+
+        assert report["products"] == len(docs) and report["batches"] == 5
+        assert report["peak_rss_mb"]["parent"] > 0
+        assert artifacts.manifest["training"]["workers"] == workers
+        assert artifacts.vocabulary == reference.get_feature_names_out().tolist()
+        assert np.allclose(artifacts.idf, reference.idf_)
+        assert abs(artifacts.matrix - expected).max() < 1e-6
+        assert [product_id.decode() for product_id in artifacts.product_ids] == [str(doc["_id"]) for doc in docs]
+        assert artifacts.neighbors.shape == (len(docs), 3)
+        assert not list(output.glob(".train-*"))
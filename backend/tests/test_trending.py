@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from backend.app.trending import TrendRecorder
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def recorder(**kwargs) -> TrendRecorder:
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_client():
+        return client
+
+    return TrendRecorder(get_client, top_cache_seconds=0, **kwargs)
+
+
+def test_buffered_counts_flush_in_one_batch_and_rank_by_popularity() -> None:
+    async def go():
+        trends = recorder()
+        for query in ["Laptop", "laptop ", "mouse", "LAPTOP", "mouse", "chair"]:
+            trends.record(query)
+        assert await trends.top(3) == []
+        assert await trends.flush() == 3
+        top = await trends.top(2)
+        assert [term for term, _ in top] == ["laptop", "mouse"]
+        assert top[0][1] == pytest.approx(3, rel=0.01)
+        assert trends.flushes == 1 and trends.snapshot()["buffered_terms"] == 0
+
+    asyncio.run(go())
+
+
+def test_older_queries_decay_and_survive_landmark_rollover() -> None:
+    async def go():
+        trends = recorder(half_life_seconds=60, landmark_half_lives=4)
+        start = trends.landmark() - trends.landmark_period
+        for _ in range(8):
+            trends.record("old favourite", now=start + 1)
+        # Recorded two half-lives later: 3 recent hits beat 8 hits that decayed to 2.
+        for _ in range(3):
+            trends.record("new favourite", now=start + 121)
+        await trends.flush()
+        ranked = await trends.top(2)
+        assert [term for term, _ in ranked] == ["new favourite", "old favourite"]
+
+    asyncio.run(go())
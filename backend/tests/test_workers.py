@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.workers import RedisLock, StartupTimer, WorkerRegistry
+
+
+def test_startup_timer_keeps_parent_phases_after_fork() -> None:
+    timer = StartupTimer()
+    timer.mark("import")
+    timer.mark("model")
+    timer.forked()
+    timer.mark("connect")
+    ready = timer.ready()
+
+    snapshot = timer.snapshot()
+    assert snapshot["mode"] == "prefork"
+    assert set(snapshot["preloaded"]) == {"import", "model"}
+    assert set(snapshot["phases"]) == {"connect", "lifespan"}
+    assert snapshot["ready_seconds"] == ready >= 0
+
+
+def test_redis_lock_is_exclusive_and_owner_checked() -> None:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    async def scenario() -> None:
+        client = fakeredis.FakeAsyncRedis()
+        first = RedisLock(client, "seed-lock", "worker-a", ttl_seconds=0.3)
+        second = RedisLock(client, "seed-lock", "worker-b", ttl_seconds=0.3)
+
+        assert await first.acquire()
+        assert not await second.acquire()
+        assert not await second.release()
+        async with first.held():
+            # Renewed past its original TTL while held.
+            await asyncio.sleep(0.45)
+            assert await first.owner_of() == "worker-a"
+        assert await first.owner_of() is None
+        assert await second.acquire()
+
+    asyncio.run(scenario())
+
+
+def test_worker_registry_reports_live_workers_only() -> None:
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario() -> None:
+        client = fakeredis.FakeAsyncRedis()
+
+        async def get_client():
+            return client
+
+        registries = [
+            WorkerRegistry(get_client, "workers", f"w{i}", lambda i=i: {"mongo": True, "redis": i == 0}, interval_seconds=1)
+            for i in range(2)
+        ]
+        for registry in registries:
+            assert await registry.publish()
+        await client.hset("workers", "dead", b'{"seen": %d}' % (time.time() - 60))
+
+        snapshot = await registries[0].snapshot()
+        assert snapshot["workers"] == 2 and list(snapshot["by_worker"]) == ["w0", "w1"]
+        assert snapshot["mongo_up"] == 2 and snapshot["redis_up"] == 1
+        assert not await client.hexists("workers", "dead")
+
+    asyncio.run(scenario())
@@ -91,18 +91,46 @@ sh.enableSharding("speedscale");
 # STEP 6: Shard the Products Collection
 # ================================
 echo ""
-echo "📌 Step 6: Sharding the 'products' collection..."
-mongosh --host mongos:27017 --eval '
+# SHARD_KEY=hashed_id (default): { _id: "hashed" }, even spread, but every
+#   category or search query is broadcast to all shards.
+# SHARD_KEY=category: { category: 1, _id: "hashed" }, category-scoped queries
+#   only reach the shards owning that category; lookups by _id alone broadcast.
+# CATEGORY_ZONES (category key only) pins categories to shards, e.g.
+#   "shard1ReplSet=Audio,Computers;shard2ReplSet=Electronics,Gaming"
+SHARD_KEY="${SHARD_KEY:-hashed_id}"
+CATEGORY_ZONES="${CATEGORY_ZONES:-}"
+echo "📌 Step 6: Sharding the 'products' collection (shard key: ${SHARD_KEY})..."
+mongosh --host mongos:27017 --eval "const shardKeyMode = '${SHARD_KEY}'; const categoryZones = '${CATEGORY_ZONES}';"'
 use speedscale;
 
 // Create indexes for sharding
-db.products.createIndex({ _id: "hashed" });
 db.products.createIndex({ category: 1 });
 db.products.createIndex({ name: 1 });
 db.products.createIndex({ brand: 1 });
 
-// Shard the collection on _id (hashed for even distribution)
-sh.shardCollection("speedscale.products", { _id: "hashed" });
+if (shardKeyMode === "category") {
+  db.products.createIndex({ category: 1, _id: "hashed" });
+  sh.shardCollection("speedscale.products", { category: 1, _id: "hashed" });
+
+  categoryZones.split(";").filter(Boolean).forEach(function (entry) {
+    const [shard, categories] = entry.split("=");
+    const zone = "zone-" + shard;
+    sh.addShardToZone(shard, zone);
+    categories.split(",").filter(Boolean).forEach(function (category) {
+      // Prefix range covering every _id hash within the category.
+      sh.updateZoneKeyRange(
+        "speedscale.products",
+        { category: category, _id: MinKey },
+        { category: category, _id: MaxKey },
+        zone
+      );
+    });
+  });
+} else {
+  db.products.createIndex({ _id: "hashed" });
+  // Shard the collection on _id (hashed for even distribution)
+  sh.shardCollection("speedscale.products", { _id: "hashed" });
+}
 '
 
 sleep 5